@@ -4,16 +4,81 @@ import pygame
 from pygame.math import Vector2
 from .settings import *
 
-# --- Bullet Class (No changes needed) ---
+# --- SpritePool ---
+class SpritePool:
+    """
+    Recycles bullet sprites so shooting doesn't allocate a sprite and a Surface per shot.
+
+    `acquire(...)` hands out a free instance re-initialised through its `reset(...)`
+    (or builds a new one), and every pooled sprite shares one pre-rendered image
+    from `sprite_cls.make_image()`. A pooled sprite returns to the pool when it is
+    killed while still in a group; up to `max_free` instances are kept.
+    """
+    def __init__(self, sprite_cls, max_free=BULLET_POOL_MAX_FREE):
+        self.sprite_cls = sprite_cls
+        self.max_free = max_free
+        self._free = []
+        self._image = None
+        self.created = 0
+        self.reused = 0
+
+    @property
+    def image(self):
+        """ The shared image, rendered on first use (after pygame is initialised). """
+        if self._image is None:
+            self._image = self.sprite_cls.make_image()
+        return self._image
+
+    def acquire(self, *args, **kwargs):
+        if self._free:
+            sprite = self._free.pop()
+            sprite.reset(*args, **kwargs)
+            self.reused += 1
+        else:
+            sprite = self.sprite_cls(*args, image=self.image, **kwargs)
+            sprite.pool = self
+            self.created += 1
+        return sprite
+
+    def release(self, sprite):
+        if len(self._free) < self.max_free:
+            self._free.append(sprite)
+
+    def free_count(self):
+        return len(self._free)
+
+    def clear(self):
+        """ Drops the free instances and the shared image (e.g. after the display mode changes). """
+        self._free.clear()
+        self._image = None
+
+
+# --- Bullet Class ---
 class Bullet(pygame.sprite.Sprite):
     """ Represents a bullet fired by the player. """
-    def __init__(self, x, y):
+    pool = None # Set on instances handed out by a SpritePool
+
+    def __init__(self, x, y, image=None):
         super().__init__()
-        self.image = pygame.Surface((BULLET_WIDTH, BULLET_HEIGHT))
-        self.image.fill(YELLOW)
+        self.image = image if image is not None else self.make_image()
+        self.reset(x, y)
+
+    @staticmethod
+    def make_image():
+        image = pygame.Surface((BULLET_WIDTH, BULLET_HEIGHT))
+        image.fill(YELLOW)
+        return image
+
+    def reset(self, x, y):
         self.rect = self.image.get_rect(center=(x, y))
         self.speedy = -BULLET_SPEED
 
+    def kill(self):
+        was_alive = self.alive()
+        super().kill()
+        if was_alive and self.pool is not None: # Only once per trip through the groups
+            self.pool.release(self)
+
     def update(self):
         self.rect.y += self.speedy
         if self.rect.bottom < 0:
@@ -22,16 +87,26 @@ class Bullet(pygame.sprite.Sprite):
 # --- EnemyBullet Class (MODIFIED) ---
 class EnemyBullet(pygame.sprite.Sprite):
     """ Represents a bullet fired by an enemy (straight or angled). """
+    pool = None # Set on instances handed out by a SpritePool
+
     # *** MODIFIED __init__ signature ***
-    def __init__(self, x, y, direction=None): # Added optional direction vector
+    def __init__(self, x, y, direction=None, image=None): # Added optional direction vector
         super().__init__()
-        self.image = pygame.Surface((ENEMY_BULLET_WIDTH, ENEMY_BULLET_HEIGHT))
-        self.image.fill(ENEMY_BULLET_COLOR)
+        self.image = image if image is not None else self.make_image()
+        self.speed = ENEMY_BULLET_SPEED_Y # Base speed
+        self.reset(x, y, direction)
+
+    @staticmethod
+    def make_image():
+        image = pygame.Surface((ENEMY_BULLET_WIDTH, ENEMY_BULLET_HEIGHT))
+        image.fill(ENEMY_BULLET_COLOR)
+        return image
+
+    def reset(self, x, y, direction=None):
         self.rect = self.image.get_rect(centerx=x, top=y)
 
         # Use Vector2 for float-precision movement
         self.pos = Vector2(self.rect.center)
-        self.speed = ENEMY_BULLET_SPEED_Y # Base speed
 
         if direction is None:
             # straight down
@@ -40,6 +115,12 @@ class EnemyBullet(pygame.sprite.Sprite):
             # angled shot (direction must be normalized)
             self.velocity = direction * self.speed
 
+    def kill(self):
+        was_alive = self.alive()
+        super().kill()
+        if was_alive and self.pool is not None:
+            self.pool.release(self)
+
     # *** MODIFIED update method ***
     def update(self):
         """ Move the bullet based on its velocity. """
@@ -62,4 +143,8 @@ class EnemyBullet(pygame.sprite.Sprite):
                 self.kill()
                 return
         except TypeError:
-            pass
\ No newline at end of file
+            pass
+
+# --- Shared pools (Player.shoot / EnemyBoss.shoot) ---
+player_bullet_pool = SpritePool(Bullet)
+enemy_bullet_pool = SpritePool(EnemyBullet)
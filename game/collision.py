@@ -0,0 +1,145 @@
+"""Uniform-grid spatial hash used as the collision broadphase in run_game.
+
+`pygame.sprite.groupcollide` / `spritecollide` test every sprite of one group
+against every sprite of the other, which is O(enemies x bullets) per frame.
+`SpatialHash` buckets sprites by the grid cells their rects overlap, so a query
+only rect-tests the sprites sharing a cell with the query rect.
+
+Its `spritecollide` and `groupcollide` methods are drop-in replacements for the
+pygame functions (rect collision only): same arguments, same return values,
+same kill semantics and the same result order. The hash is rebuilt once per
+frame after sprites have moved; sprites killed by an earlier check that frame
+are skipped because every candidate is also checked for membership in the
+queried group.
+"""
+# /Users/junluo/Desktop/桌面文件/PlaneWar_Sever/game/collision.py
+from .settings import SPATIAL_HASH_CELL_SIZE
+
+
+class SpatialHash:
+    """ Grid of `cell_size` px cells mapping (col, row) to the sprites whose rects overlap it. """
+    def __init__(self, cell_size=SPATIAL_HASH_CELL_SIZE):
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self.cell_size = cell_size
+        self._cells = {}
+        # sprite -> insertion index, so results come back in group order like pygame's
+        self._order = {}
+
+    def __len__(self):
+        return len(self._order)
+
+    def clear(self):
+        self._cells.clear()
+        self._order.clear()
+
+    def _span(self, rect):
+        size = self.cell_size
+        x, y, w, h = rect
+        # right/bottom are exclusive in pygame.Rect, hence the -1
+        return x // size, y // size, (x + w - 1) // size, (y + h - 1) // size
+
+    def _index(self, sprite, left, top, right, bottom):
+        cells = self._cells
+        for col in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                bucket = cells.get((col, row))
+                if bucket is None:
+                    cells[(col, row)] = [sprite]
+                else:
+                    bucket.append(sprite)
+
+    def insert(self, sprite):
+        """ Indexes `sprite` under every cell its current rect overlaps. """
+        if sprite in self._order:
+            return
+        self._order[sprite] = len(self._order)
+        self._index(sprite, *self._span(sprite.rect))
+
+    def build(self, *groups):
+        """ Clears the grid and indexes every sprite of `groups` at its current position. """
+        self.clear()
+        # insert() inlined, with a fast path for rects inside one cell (most bullets):
+        # this runs for every projectile every frame
+        cells, order, size = self._cells, self._order, self.cell_size
+        for group in groups:
+            for sprite in group:
+                if sprite in order:
+                    continue
+                order[sprite] = len(order)
+                x, y, w, h = sprite.rect
+                left, top = x // size, y // size
+                right, bottom = (x + w - 1) // size, (y + h - 1) // size
+                if left == right and top == bottom:
+                    bucket = cells.get((left, top))
+                    if bucket is None:
+                        cells[(left, top)] = [sprite]
+                    else:
+                        bucket.append(sprite)
+                else:
+                    self._index(sprite, left, top, right, bottom)
+
+    def _candidates(self, rect):
+        """ Contents of the cells `rect` overlaps, plus whether sprites may repeat (several cells). """
+        cells = self._cells
+        left, top, right, bottom = self._span(rect)
+        if left == right and top == bottom:
+            return cells.get((left, top), ()), False
+        found = []
+        for col in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                bucket = cells.get((col, row))
+                if bucket:
+                    found.extend(bucket)
+        return found, True
+
+    def _in_order(self, sprites):
+        return sorted(dict.fromkeys(sprites), key=self._order.__getitem__)
+
+    def query(self, rect):
+        """
+        Candidate sprites for `rect`: everything indexed in a cell `rect` overlaps.
+
+        Returns:
+            list: Distinct sprites, in insertion order. Not yet rect-tested.
+        """
+        candidates, may_repeat = self._candidates(rect)
+        return self._in_order(candidates) if may_repeat else list(candidates)
+
+    def spritecollide(self, sprite, group, dokill):
+        """
+        Same as `pygame.sprite.spritecollide(sprite, group, dokill)`, for sprites of `group` in the grid.
+
+        Returns:
+            list: The sprites of `group` whose rects overlap `sprite.rect` (killed first if `dokill`).
+        """
+        rect = sprite.rect
+        candidates, may_repeat = self._candidates(rect)
+        if not candidates:
+            return []
+        # Rect-test first (in C), then filter the few hits: cheaper than filtering every candidate
+        is_member = group.has_internal # `in group` goes through Group.has(*sprites); this is a dict lookup
+        hits = [candidates[i] for i in rect.collidelistall([s.rect for s in candidates])
+                if is_member(candidates[i])]
+        if may_repeat and len(hits) > 1:
+            hits = self._in_order(hits)
+        if dokill:
+            for s in hits:
+                s.kill()
+        return hits
+
+    def groupcollide(self, groupa, groupb, dokilla, dokillb):
+        """
+        Same as `pygame.sprite.groupcollide(groupa, groupb, dokilla, dokillb)`, with `groupb` in the grid.
+
+        Returns:
+            dict: Each colliding sprite of `groupa` mapped to the list of `groupb` sprites it hit.
+        """
+        crashed = {}
+        for sprite in groupa.sprites():
+            hits = self.spritecollide(sprite, groupb, dokillb)
+            if hits:
+                crashed[sprite] = hits
+                if dokilla:
+                    sprite.kill()
+        return crashed
@@ -4,7 +4,7 @@ import pygame
 import random
 from pygame.math import Vector2
 from .settings import *
-from .bullet import EnemyBullet
+from .bullet import enemy_bullet_pool
 import math
 
 class Enemy(pygame.sprite.Sprite):
@@ -38,7 +38,7 @@ class Enemy(pygame.sprite.Sprite):
 class EnemyBoss(pygame.sprite.Sprite):
     """Big boss: enters, patrols,智能预判射击，承受伤害。"""
     def __init__(self, boss_img, shoot_sound, all_sprites_group, enemy_bullets_group,
-                 target_player=False, player_ref=None):
+                 target_player=False, player_ref=None, projectiles=None):
         super().__init__()
         # 基本属性...
         self.image = boss_img.copy()
@@ -59,6 +59,9 @@ class EnemyBoss(pygame.sprite.Sprite):
         self.target_player = target_player
         self.player_ref = player_ref if target_player else None
 
+        # Optional ProjectileManager; bullets are pooled sprites otherwise
+        self.projectiles = projectiles
+
         self.all_sprites.add(self)
 
     def update(self):
@@ -116,8 +119,11 @@ class EnemyBoss(pygame.sprite.Sprite):
                 shoot_pos, tp, tv, ENEMY_BULLET_SPEED_Y
             )
         # 发射子弹
-        bullet = EnemyBullet(shoot_pos.x, shoot_pos.y, direction=direction)
-        self.all_sprites.add(bullet); self.enemy_bullets.add(bullet)
+        if self.projectiles is not None:
+            self.projectiles.fire_enemy(shoot_pos.x, shoot_pos.y, direction=direction)
+        else:
+            bullet = enemy_bullet_pool.acquire(shoot_pos.x, shoot_pos.y, direction=direction)
+            self.all_sprites.add(bullet); self.enemy_bullets.add(bullet)
         # 播放音效
         if self.shoot_sound:
             try: self.shoot_sound.play()
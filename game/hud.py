@@ -0,0 +1,96 @@
+"""In-game HUD (score, bombs, level) drawn from cached text surfaces.
+
+Rasterizing text with `Font.render` is one of the most expensive calls in a
+frame, and the HUD text rarely changes. `TextCache` keeps rendered surfaces
+keyed by (text, color); `CounterText` draws "<label><number>" from the cached
+label plus one cached glyph per digit, so a new score value never touches the
+font, and its layout is only rebuilt when the value changes.
+"""
+# /Users/junluo/Desktop/桌面文件/PlaneWar_Sever/game/hud.py
+from collections import OrderedDict
+
+from .settings import *
+
+
+class TextCache:
+    """ Surfaces rendered with one font, keyed by (text, color); least recently used entries are evicted. """
+    def __init__(self, font, antialias=True, max_entries=HUD_TEXT_CACHE_SIZE):
+        self.font = font
+        self.antialias = antialias
+        self.max_entries = max_entries
+        self._surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._surfaces)
+
+    def render(self, text, color):
+        """ Same as `font.render(text, antialias, color)`, rendered once per (text, color). """
+        key = (text, tuple(color))
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = self.font.render(text, self.antialias, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self._surfaces.clear()
+
+
+class CounterText:
+    """ "<label><value>" laid out from cached pieces: the label once, then one glyph per character of the value. """
+    def __init__(self, cache, label, color):
+        self.cache = cache
+        self.label = label
+        self.color = color
+        self.value = None
+        self.size = (0, 0)
+        self._pieces = [] # (surface, x offset)
+
+    def set(self, value):
+        """ Rebuilds the layout if `value` changed; returns True if it did. """
+        if value == self.value and self._pieces:
+            return False
+        self.value = value
+        label = self.cache.render(self.label, self.color)
+        pieces = [(label, 0)]
+        x = label.get_width()
+        for char in str(value):
+            glyph = self.cache.render(char, self.color)
+            pieces.append((glyph, x))
+            x += glyph.get_width()
+        self._pieces = pieces
+        self.size = (x, max(surface.get_height() for surface, _ in pieces))
+        return True
+
+    def draw(self, surface, topleft=None, topright=None):
+        """ Blits the text with its top-left (or top-right) corner at the given point. """
+        if topright is not None:
+            x, y = topright[0] - self.size[0], topright[1]
+        else:
+            x, y = topleft or (0, 0)
+        surface.blits([(piece, (x + dx, y)) for piece, dx in self._pieces], doreturn=False)
+
+
+class HUD:
+    """ Score and bombs (top left) and level (top right), as run_game has always drawn them. """
+    def __init__(self, font):
+        self.cache = TextCache(font)
+        self.score = CounterText(self.cache, "Score: ", WHITE)
+        self.bombs = CounterText(self.cache, "Bombs: ", ORANGE)
+        self.level = CounterText(self.cache, "Level: ", WHITE)
+
+    def draw(self, surface, score, bombs, level):
+        self.score.set(score)
+        self.bombs.set(bombs)
+        self.level.set(level)
+        self.score.draw(surface, topleft=(10, 10))
+        self.bombs.draw(surface, topleft=(10, 40))
+        self.level.draw(surface, topright=(SCREEN_WIDTH - 10, 10))
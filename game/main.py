@@ -17,6 +17,9 @@ from .player import Player
 from .enemy import Enemy, EnemyBoss
 from .powerup import PowerUp
 from .background import Background
+from .hud import HUD
+from .collision import SpatialHash
+from .projectiles import NUMPY_AVAILABLE, ProjectileManager
 # --- Helper/Management Modules ---
 from . import utils         # For loading helpers
 from . import ui            # For screen displays (Import the whole module)
@@ -56,6 +59,7 @@ def run_game(screen_surf, clock_obj, fonts, images, sounds, level_data, backgrou
 
     # --- Resources ---
     font_score = fonts.get('score') or pygame.font.SysFont(None, FONT_SIZE_SCORE) # Fallback if needed
+    hud = HUD(font_score) # Caches rendered text; only new values are laid out again
     player_img = images.get('player')
     boss_img = images.get('boss')
     powerup_images_dict = images.get('powerups', {})
@@ -75,6 +79,13 @@ def run_game(screen_surf, clock_obj, fonts, images, sounds, level_data, backgrou
     enemy_bullets = pygame.sprite.Group()
     powerups = pygame.sprite.Group()
     boss_group = pygame.sprite.GroupSingle() # Use GroupSingle for the boss
+    collision_grid = SpatialHash() # Broadphase for all collision checks, rebuilt every frame
+    projectiles = None # NumPy projectiles replace the bullet sprites/groups when enabled
+    if USE_NUMPY_PROJECTILES:
+        if NUMPY_AVAILABLE:
+            projectiles = ProjectileManager()
+        else:
+            print("Warning: USE_NUMPY_PROJECTILES is set but numpy is not installed. Using bullet sprites.")
 
     if not isinstance(player_img, pygame.Surface): # Check if player image (or fallback) exists
         print("CRITICAL ERROR: Player image not available. Exiting.")
@@ -121,12 +132,16 @@ def run_game(screen_surf, clock_obj, fonts, images, sounds, level_data, backgrou
                 if event.key == BOMB_KEY and not game_over_local and player.bomb_count > 0:
                     killed_by_bomb = player.use_bomb(enemies, enemy_bullets) # Pass both groups
                     player.score += killed_by_bomb # Add score for bomb kills
+                    if projectiles:
+                        projectiles.clear_enemy_shots()
 
         # --- Game Logic Update (only if player is alive and level not passed) ---
         if not game_over_local and not level_passed:
 
             # Update all sprites (player movement, bullets, enemies, powerups, boss)
             all_sprites.update() # update() methods handle movement, timers, etc.
+            if projectiles:
+                projectiles.update() # Move + cull every projectile in one vectorized pass
 
             # Update background scrolling position
             background.update()
@@ -135,7 +150,7 @@ def run_game(screen_surf, clock_obj, fonts, images, sounds, level_data, backgrou
             keys = pygame.key.get_pressed()
             mouse_buttons = pygame.mouse.get_pressed()
             if keys[pygame.K_SPACE] or mouse_buttons[0]:
-                new_player_bullets = player.shoot()
+                new_player_bullets = player.shoot(projectiles)
                 if new_player_bullets:
                     all_sprites.add(new_player_bullets)
                     bullets.add(new_player_bullets)
@@ -155,7 +170,8 @@ def run_game(screen_surf, clock_obj, fonts, images, sounds, level_data, backgrou
                              all_sprites,      # Group for adding bullets
                              enemy_bullets,    # Group for adding bullets
                              target_player=boss_targets_player_flag, # Pass the flag
-                             player_ref=player       # Pass the player object
+                             player_ref=player,      # Pass the player object
+                             projectiles=projectiles
                          )
                          boss_group.add(boss_instance) # Add to the single group for collision
                          boss_active = True
@@ -184,7 +200,12 @@ def run_game(screen_surf, clock_obj, fonts, images, sounds, level_data, backgrou
                     powerups.add(powerup)
 
             # --- Collisions ---
-            enemy_hits = pygame.sprite.groupcollide(enemies, bullets, True, True)
+            # Index everything that can be hit once, after this frame's movement and spawns
+            collision_grid.build(bullets, enemies, enemy_bullets, powerups, boss_group)
+            if projectiles:
+                enemy_hits = projectiles.collide_enemies(enemies)
+            else:
+                enemy_hits = collision_grid.groupcollide(enemies, bullets, True, True)
             for hit_enemy in enemy_hits: # Iterate through hit enemies if needed later
                 player.score += 1
                 if sounds.get('enemy_explode'):
@@ -192,12 +213,15 @@ def run_game(screen_surf, clock_obj, fonts, images, sounds, level_data, backgrou
                     except pygame.error as e: print(f"Warning: Could not play enemy explode sound: {e}")
 
             if boss_active and boss_instance:
-                bullets_hitting_boss = pygame.sprite.spritecollide(boss_instance, bullets, True)
+                if projectiles:
+                    bullets_hitting_boss = projectiles.collide_sprite(boss_instance)
+                else:
+                    bullets_hitting_boss = len(collision_grid.spritecollide(boss_instance, bullets, True))
                 if bullets_hitting_boss:
                     if sounds.get('boss_hit'):
                         try: sounds.get('boss_hit').play()
                         except pygame.error as e: print(f"Warning: Could not play boss hit sound: {e}")
-                    boss_instance.health -= len(bullets_hitting_boss)
+                    boss_instance.health -= bullets_hitting_boss
                     if boss_instance.health <= 0:
                         if sounds.get('boss_explode'):
                             try: sounds.get('boss_explode').play()
@@ -213,7 +237,7 @@ def run_game(screen_surf, clock_obj, fonts, images, sounds, level_data, backgrou
                         boss_instance = None
                         level_passed = True # Mark level as passed
 
-            powerup_hits = pygame.sprite.spritecollide(player, powerups, True)
+            powerup_hits = collision_grid.spritecollide(player, powerups, True)
             for hit_powerup in powerup_hits:
                 player.activate_powerup(hit_powerup.type)
 
@@ -222,9 +246,12 @@ def run_game(screen_surf, clock_obj, fonts, images, sounds, level_data, backgrou
             if now - level_start_time > STARTUP_GRACE_PERIOD: # Use grace period from settings
                  # Check only if player is alive and shield is NOT active
                  if player.alive() and not player.shield_active:
-                    player_enemy_hits = pygame.sprite.spritecollide(player, enemies, True) # Kill enemies on collision
-                    player_boss_collision = pygame.sprite.spritecollide(player, boss_group, False) # Don't kill boss on collision
-                    enemy_bullet_hits = pygame.sprite.spritecollide(player, enemy_bullets, True) # Kill bullets on collision
+                    player_enemy_hits = collision_grid.spritecollide(player, enemies, True) # Kill enemies on collision
+                    player_boss_collision = collision_grid.spritecollide(player, boss_group, False) # Don't kill boss on collision
+                    if projectiles:
+                        enemy_bullet_hits = projectiles.hits_player(player)
+                    else:
+                        enemy_bullet_hits = collision_grid.spritecollide(player, enemy_bullets, True) # Kill bullets on collision
 
                     if player_enemy_hits or player_boss_collision or enemy_bullet_hits:
                         reason = "Enemy" if player_enemy_hits else ("Boss Collision" if player_boss_collision else "Enemy Bullet")
@@ -239,16 +266,12 @@ def run_game(screen_surf, clock_obj, fonts, images, sounds, level_data, backgrou
         # --- Drawing ---
         background.draw(screen_surf)
         all_sprites.draw(screen_surf)
+        if projectiles:
+            projectiles.draw(screen_surf) # One Surface.blits call per projectile type
 
         # Draw UI
         try:
-            score_text = font_score.render(f"Score: {player.score}", True, WHITE)
-            screen_surf.blit(score_text, (10, 10))
-            bomb_text = font_score.render(f"Bombs: {player.bomb_count}", True, ORANGE)
-            screen_surf.blit(bomb_text, (10, 40))
-            level_text_surf = font_score.render(f"Level: {level_num}", True, WHITE)
-            level_rect = level_text_surf.get_rect(topright=(SCREEN_WIDTH - 10, 10))
-            screen_surf.blit(level_text_surf, level_rect)
+            hud.draw(screen_surf, player.score, player.bomb_count, level_num)
         except Exception as e:
             print(f"Error rendering UI text: {e}")
 
@@ -418,6 +441,7 @@ def main():
 
     last_login_message = None
     last_submission_status = None # Stores message from last submission attempt
+    pending_submission = None # SubmissionTicket for a score still being sent in the background
 
     # --- Main Game Loop ---
     while app_running:
@@ -459,6 +483,7 @@ def main():
             final_score_this_run = 0 # Reset score for new run
             last_level_played = 0 # Reset last level played
             last_submission_status = None # Reset submission status
+            pending_submission = None
             game_state = 'LEVEL_START'
 
         # --- State: LEVEL_START ---
@@ -515,11 +540,12 @@ def main():
                 is_logged_in_now, current_username_local = network.check_login_status()
 
                 if is_logged_in_now:
-                    print(f"Attempting to submit score {final_score_this_run} for level {level_to_submit} (User: {current_username_local})")
-                    success, msg = network.api_submit_score(final_score_this_run, level_to_submit)
-                    submission_msg = msg
-                    print(f"Submission result: Success={success}, Message='{msg}'")
-                    last_submission_status = submission_msg # Store for end screen
+                    # Queue the submission on the network worker so the window never freezes;
+                    # the end screen polls the ticket and shows the result when it arrives.
+                    print(f"Queueing score {final_score_this_run} for level {level_to_submit} (User: {current_username_local})")
+                    pending_submission = network.submit_score_async(final_score_this_run, level_to_submit)
+                    submission_msg = "Submitting score..."
+                    last_submission_status = submission_msg # Replaced by the result on the end screen
                 else:
                     # Handle local high score saving if user is not logged in
                     print("User not logged in when level ended. Checking local high score.")
@@ -529,6 +555,7 @@ def main():
                         high_score = final_score_this_run
                     submission_msg = "Not logged in. Score saved locally (if new high)."
                     last_submission_status = submission_msg # Store for end screen
+                    pending_submission = None
             # --- END MOVED SCORE SUBMISSION LOGIC ---
 
             # --- Now determine the next game state ---
@@ -570,13 +597,16 @@ def main():
         elif game_state == 'END_SCREEN':
             # Display end screen with result, final score, and submission status
             player_choice = ui.show_end_screen(
-                screen, clock, fonts, game_result_for_screen, final_score_this_run, last_submission_status
+                screen, clock, fonts, game_result_for_screen, final_score_this_run, last_submission_status,
+                pending_submission=pending_submission
             )
+            pending_submission = None
             if player_choice == 'QUIT':
                  # Optional: Attempt logout before quitting if logged in
                 is_logged_in_now, _ = network.check_login_status()
                 if is_logged_in_now:
                       print("Main: Logging out before quit...")
+                      network.shutdown_submission_worker() # Let queued scores go out first
                       network.api_logout_user() # Attempt logout, ignore result for now
                 app_running = False
             elif player_choice == 'REPLAY':
@@ -584,6 +614,8 @@ def main():
 
     # --- Game Exit ---
     print("Exiting PlaneWar.")
+    # Give queued score submissions a moment to finish before logging out
+    network.shutdown_submission_worker()
     # Attempt logout if still logged in when exiting main loop (e.g., via QUIT)
     is_logged_in_now, _ = network.check_login_status()
     if is_logged_in_now:
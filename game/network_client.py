@@ -1,25 +1,143 @@
 """Handles network communication between the game client and the server API.
 
-Provides a class (`NetworkClient`) with methods to interact with the Flask server's
-API endpoints, such as user login, score submission, and potentially fetching
-leaderboard data. Uses the 'requests' library for HTTP calls.
+Provides functions to interact with the Flask server's API endpoints, such as
+user login, score submission, and fetching leaderboard data. Uses the 'requests'
+library for HTTP calls. Score submission can also run on a background worker
+thread (`submit_score_async`) so the Pygame loop never waits on the network;
+scores that cannot be delivered are kept in a local outbox and replayed later.
 """
 # /Users/junluo/Desktop/桌面文件/PlaneWar_Sever/game/network_client.py
 import requests
 import json
+import queue
+import random
+import threading
+import time
 # Assume settings.py is in the same directory or adjust import path
-from .settings import SERVER_API_URL # Use the correct URL from your settings
+from .settings import SERVER_API_URL, OUTBOX_FILE_PATH # Use the correct URL from your settings
+from .outbox import ScoreOutbox
 
 # --- Create the persistent session object at the module level ---
+# Used from the game's main thread only: requests.Session is not thread-safe
 api_session = requests.Session()
 # -------------------------------------------------------------
 
 # --- Store login status within this module ---
 # Other modules can import and call check_login_status if needed
+# The score worker thread reads these too: assign them only while holding _auth_lock
+_auth_lock = threading.Lock()
 _current_username = None
 _is_logged_in = False
+_auth_token = None # Signed bearer token from /api/login (None: rely on the session cookie)
+_auth_expires_at = None # time.monotonic() when _auth_token expires, if the server said
+_auth_epoch = 0 # Bumped on every login and logout, so snapshots can tell logins apart
 # --------------------------------------------
 
+# Renew the bearer token when it has less than this many seconds left
+TOKEN_REFRESH_MARGIN = 300.0
+
+def _set_auth(username, token, expires_in=None):
+    """Records a successful login."""
+    global _current_username, _is_logged_in, _auth_token, _auth_expires_at, _auth_epoch
+    with _auth_lock:
+        _is_logged_in = True
+        _current_username = username
+        _auth_token = token
+        _auth_expires_at = None if expires_in is None else time.monotonic() + expires_in
+        _auth_epoch += 1
+
+def _clear_auth(credentials=None):
+    """
+    Forgets the current login.
+
+    Args:
+        credentials (tuple, optional): A snapshot from _snapshot_auth(). When given,
+            the login is only cleared if it is still the one the snapshot was taken
+            from, so a 401 for an old request can't log out a user who logged in since.
+    """
+    global _current_username, _is_logged_in, _auth_token, _auth_expires_at, _auth_epoch
+    with _auth_lock:
+        if credentials is not None and not _is_current_auth(credentials):
+            return
+        _is_logged_in = False
+        _current_username = None
+        _auth_token = None
+        _auth_expires_at = None
+        _auth_epoch += 1
+
+def _is_current_auth(credentials):
+    """True if `credentials` still describe the current login (call with _auth_lock held)."""
+    return _is_logged_in and credentials is not None and credentials[3] == _auth_epoch
+
+def _snapshot_auth():
+    """
+    Captures the current login for a request that runs later on the worker thread.
+    Call from the main thread, which owns api_session and its cookies.
+
+    Returns:
+        tuple | None: (username, token, cookies, epoch) or None if not logged in. `cookies`
+                      is a dict of the session cookies when there is no bearer token.
+    """
+    with _auth_lock:
+        if not _is_logged_in:
+            return None
+        cookies = getattr(api_session, "cookies", None)
+        if _auth_token or cookies is None:
+            return _current_username, _auth_token, {}, _auth_epoch
+        return _current_username, _auth_token, requests.utils.dict_from_cookiejar(cookies), _auth_epoch
+
+def _auth_headers(headers=None, token=None):
+    """Returns `headers` plus the bearer token, when the server issued one."""
+    headers = dict(headers or {})
+    if token:
+        headers['Authorization'] = f"Bearer {token}"
+    return headers
+
+def _refresh_token(token, session):
+    """
+    Exchanges a still-valid bearer token for a new one via /api/token/refresh.
+
+    Returns:
+        tuple | None: (str: token, int|None: expires_in), or None if the server refused
+                      (expired token, deleted account) or could not be reached.
+    """
+    try:
+        response = session.post(
+            f"{SERVER_API_URL}/token/refresh",
+            headers=_auth_headers(None, token),
+            timeout=10
+        )
+        data = response.json() if response.status_code == 200 else {}
+    except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+        print(f"Network Client: Token refresh failed ({e})")
+        return None
+    if not data.get("success") or not data.get("token"):
+        return None
+    return data["token"], data.get("expires_in")
+
+def _fresh_token(credentials, session):
+    """
+    Returns the bearer token to send for `credentials`, renewing it first when it is
+    about to expire. Only the current login's token is renewed and shared: a snapshot
+    of an earlier login keeps its own token, so it is never sent as another user.
+    """
+    global _auth_token, _auth_expires_at
+    with _auth_lock:
+        if not _is_current_auth(credentials):
+            return credentials[1]
+        token, expires_at = _auth_token, _auth_expires_at
+    if not token or expires_at is None or time.monotonic() < expires_at - TOKEN_REFRESH_MARGIN:
+        return token
+    refreshed = _refresh_token(token, session)
+    if refreshed is None:
+        return token # Still valid for now, or the request gets a 401 and the user logs in again
+    token, expires_in = refreshed
+    with _auth_lock:
+        if _is_current_auth(credentials):
+            _auth_token = token
+            _auth_expires_at = None if expires_in is None else time.monotonic() + expires_in
+    return token
+
 def api_login_user(username, password):
     """
     Attempts to log in via the server API using the persistent session.
@@ -28,9 +146,7 @@ def api_login_user(username, password):
         tuple: (bool: success, str|None: username, str: message)
                Username is returned on success, None otherwise.
     """
-    # --- FIX: Declare globals at the beginning of the function ---
-    global _current_username, _is_logged_in
-    # -----------------------------------------------------------
+    _clear_auth() # Never send a previous user's token
     login_url = f"{SERVER_API_URL}/login" # Ensure this endpoint matches your Flask API blueprint
     payload = {"username": username, "password": password}
 
@@ -46,18 +162,25 @@ def api_login_user(username, password):
 
         data = response.json()
         if data.get("success"):
-            _is_logged_in = True # Now modifying the global variable correctly
-            _current_username = data.get("username") # Store username from successful login
-            print(f"Network Client: Login successful for {_current_username}")
-            return True, _current_username, data.get("message", "Login successful")
+            logged_in_as = data.get("username") # Store username from successful login
+            token = data.get("token") # Lets later calls authenticate without the cookie
+            if token:
+                # Stateless mode: the server checks the token's signature instead of
+                # loading a session user, so the session cookie is no longer needed
+                cookies = getattr(api_session, "cookies", None)
+                if cookies is not None:
+                    cookies.clear()
+            _set_auth(logged_in_as, token, data.get("expires_in") if token else None)
+            print(f"Network Client: Login successful for {logged_in_as}")
+            schedule_outbox_replay() # Resend scores that could not be delivered earlier
+            return True, logged_in_as, data.get("message", "Login successful")
         else:
-            _is_logged_in = False # Modifying global variable
-            _current_username = None # Modifying global variable
+            _clear_auth()
             return False, None, data.get("message", "Login failed (Unknown reason)")
 
     # Keep detailed error handling
     except requests.exceptions.HTTPError as http_err:
-        _is_logged_in = False; _current_username = None # Modifying global variables
+        _clear_auth()
         status_code = http_err.response.status_code
         error_message = f"HTTP Error {status_code}"
         try: error_message = http_err.response.json().get("message", error_message)
@@ -65,23 +188,23 @@ def api_login_user(username, password):
         print(f"Network Client: Login failed ({error_message})")
         return False, None, error_message
     except requests.exceptions.Timeout:
-        _is_logged_in = False; _current_username = None # Modifying global variables
+        _clear_auth()
         print("Network Client: Login Timeout.")
         return False, None, "Network Error: Timeout"
     except requests.exceptions.ConnectionError:
-        _is_logged_in = False; _current_username = None # Modifying global variables
+        _clear_auth()
         print("Network Client: Login Connection Failed.")
         return False, None, "Network Error: Connection Failed"
     except requests.exceptions.RequestException as e:
-        _is_logged_in = False; _current_username = None # Modifying global variables
+        _clear_auth()
         print(f"Network Client: Login Request Error: {e}")
         return False, None, f"Network Error: {e}"
     except json.JSONDecodeError:
-        _is_logged_in = False; _current_username = None # Modifying global variables
+        _clear_auth()
         print("Network Client: Error decoding server response during login.")
         return False, None, "Invalid server response"
 
-def api_submit_score(score, level_completed):
+def api_submit_score(score, level_completed, submission_id=None):
     """
     Submits the score to the server API using the persistent session.
     The server identifies the user via the session cookie.
@@ -89,28 +212,46 @@ def api_submit_score(score, level_completed):
     Args:
         score (int): The score to submit.
         level_completed (int): The level on which the score was achieved.
+        submission_id (str, optional): Client-generated id sent as the Idempotency-Key
+            header; the server ignores a retry carrying a key it has already stored.
 
     Returns:
         tuple: (bool: success, str: message)
     """
-    # --- FIX: Declare globals at the beginning if they might be modified (e.g., on 401 error) ---
-    global _is_logged_in, _current_username
-    # --------------------------------------------------------------------------------------
-    if not _is_logged_in: # Reading global is fine without declaration if not assigned locally
+    success, message, _ = _post_score(score, level_completed, submission_id, _snapshot_auth(), api_session)
+    return success, message
+
+def _post_score(score, level_completed, submission_id, credentials, session):
+    """
+    Does the work of api_submit_score.
+
+    Args:
+        credentials (tuple | None): Login snapshot from _snapshot_auth() to submit as.
+        session (requests.Session): api_session on the main thread, the worker's own session otherwise.
+
+    Returns:
+        tuple: (bool: success, str: message, bool: retryable). `retryable` is True when
+               the score was not stored for a transient reason (network error, 5xx,
+               expired session) and should stay in the outbox.
+    """
+    if credentials is None:
          print("Network Client: Cannot submit score, user not logged in.")
-         return False, "Not logged in"
+         return False, "Not logged in", True
 
     submit_url = f"{SERVER_API_URL}/submit_score" # Ensure endpoint matches Flask API
     payload = {
         "score": score,
         "level": level_completed
     }
+    headers = _auth_headers({'Content-Type': 'application/json'}, _fresh_token(credentials, session))
+    if submission_id is not None:
+        headers['Idempotency-Key'] = submission_id # Makes timeouts safe to retry
 
     try:
-        response = api_session.post(
+        response = session.post(
             submit_url,
             json=payload,
-            headers={'Content-Type': 'application/json'},
+            headers=headers,
             timeout=10
         )
         response.raise_for_status()
@@ -118,10 +259,10 @@ def api_submit_score(score, level_completed):
         data = response.json()
         if data.get("success"):
             print(f"Network Client: Score {score} for level {level_completed} submitted successfully.")
-            return True, data.get("message", "Score submitted")
+            return True, data.get("message", "Score submitted"), False
         else:
             print(f"Network Client: Failed to submit score - {data.get('message')}")
-            return False, data.get("message", "Score submission failed")
+            return False, data.get("message", "Score submission failed"), False
 
     except requests.exceptions.HTTPError as http_err:
         status_code = http_err.response.status_code
@@ -130,30 +271,68 @@ def api_submit_score(score, level_completed):
         except Exception: pass
 
         if status_code == 401: # Unauthorized
-            # Modifying globals here
-            _is_logged_in = False
-            _current_username = None
+            _clear_auth(credentials) # Expired or revoked token
             error_message = "Not logged in or session expired"
             print(f"Network Client: Score submission failed ({error_message})")
-            return False, error_message
+            return False, error_message, True
         elif status_code == 400:
              print(f"Network Client: Score submission failed - Invalid data ({error_message})")
-             return False, f"Invalid data: {error_message}"
+             return False, f"Invalid data: {error_message}", False
         else:
             print(f"Network Client: Score submission failed ({error_message})")
-            return False, error_message
+            return False, error_message, status_code >= 500 or status_code in (408, 409, 429)
     except requests.exceptions.Timeout:
         print("Network Client: Score Submission Timeout.")
-        return False, "Network Error: Timeout"
+        return False, "Network Error: Timeout", True
     except requests.exceptions.ConnectionError:
         print("Network Client: Score Submission Connection Failed.")
-        return False, "Network Error: Connection Failed"
+        return False, "Network Error: Connection Failed", True
     except requests.exceptions.RequestException as e:
         print(f"Network Client: Score Submission Request Error: {e}")
-        return False, f"Network Error: {e}"
+        return False, f"Network Error: {e}", True
     except json.JSONDecodeError:
          print("Network Client: Error decoding server response during score submission.")
-         return False, "Invalid server response"
+         return False, "Invalid server response", True
+
+def api_submit_scores(entries):
+    """
+    Submits several scores in one request (used to replay the offline outbox).
+
+    Args:
+        entries (list[dict]): Items with "score", "level" and optionally "submission_id".
+
+    Returns:
+        list[dict] | None: The server's per-entry results (same order as `entries`),
+                           or None if the request failed and should be retried later.
+    """
+    return _post_scores(entries, _snapshot_auth(), api_session)
+
+def _post_scores(entries, credentials, session):
+    """Does the work of api_submit_scores, as `credentials` and over `session` (see _post_score)."""
+    if credentials is None:
+        return None
+    try:
+        response = session.post(
+            f"{SERVER_API_URL}/submit_scores",
+            json={"scores": entries},
+            headers=_auth_headers({'Content-Type': 'application/json'}, _fresh_token(credentials, session)),
+            timeout=10
+        )
+        if response.status_code == 401:
+            _clear_auth(credentials)
+            print("Network Client: Batch submission failed (session expired)")
+            return None
+        if response.status_code >= 500 or response.status_code in (408, 409, 429):
+            print(f"Network Client: Batch submission failed (HTTP Error {response.status_code})")
+            return None
+        # 201/207 and the all-invalid 400 all carry per-entry results
+        return response.json().get("results", [])
+    except requests.exceptions.RequestException as e:
+        print(f"Network Client: Batch submission failed ({e})")
+        return None
+    except (json.JSONDecodeError, AttributeError):
+        print("Network Client: Error decoding server response during batch submission.")
+        return None
 
 
 def api_get_leaderboard(limit=10):
@@ -178,7 +357,11 @@ def api_get_leaderboard(limit=10):
             timeout=10
         )
         response.raise_for_status()
-        return response.json()
+        data = response.json()
+        # The server wraps the rows with pagination info: {"leaderboard": [...], "next_cursor": ...}
+        if isinstance(data, dict):
+            return data.get("leaderboard", [])
+        return data
     except requests.exceptions.RequestException as e:
         print(f"Network Client: Error fetching leaderboard: {e}")
         return None
@@ -188,14 +371,18 @@ def api_get_leaderboard(limit=10):
 
 def check_login_status():
     """Returns the current login status and username stored in this module."""
-    # This function only READS globals, no 'global' needed.
-    return _is_logged_in, _current_username
+    with _auth_lock:
+        return _is_logged_in, _current_username
 
 def api_logout_user():
     """Attempts to log out via the server API using the persistent session."""
-    # --- FIX: Declare globals at the beginning of the function ---
-    global _is_logged_in, _current_username
-    # -----------------------------------------------------------
+    with _auth_lock:
+        token_mode = _auth_token is not None
+    if token_mode:
+        # Token sessions are stateless on the server: logging out means forgetting the token
+        _clear_auth()
+        print("Network Client: Logout successful.")
+        return True, "Logout successful"
     logout_url = f"{SERVER_API_URL}/logout" # Ensure you have this API endpoint
     try:
         response = api_session.post(logout_url, timeout=10) # Use session
@@ -203,22 +390,259 @@ def api_logout_user():
         data = response.json()
         if data.get("success"):
             print("Network Client: Logout successful.")
-            _is_logged_in = False # Modifying global
-            _current_username = None # Modifying global
+            _clear_auth()
             return True, "Logout successful"
         else:
             print(f"Network Client: Logout failed on server - {data.get('message')}")
             # Still clear client state even if server had an issue
-            _is_logged_in = False # Modifying global
-            _current_username = None # Modifying global
+            _clear_auth()
             return False, data.get("message", "Logout failed on server.")
     except requests.exceptions.RequestException as e:
         print(f"Network Client: Network error during logout: {e}")
         # Clear client state on network error too
-        _is_logged_in = False # Modifying global
-        _current_username = None # Modifying global
+        _clear_auth()
         return False, f"Network error: {e}"
     except json.JSONDecodeError:
-        _is_logged_in = False; _current_username = None # Modifying global
+        _clear_auth()
         print("Network Client: Error decoding server response during logout.")
-        return False, "Invalid server response"
\ No newline at end of file
+        return False, "Invalid server response"
+
+
+# ==============================================================================
+# --- Background Score Submission ---
+# ==============================================================================
+# The game loop must never block on HTTP. submit_score_async() hands the work to a
+# single daemon thread and returns a ticket the caller polls once per frame.
+# Every score is first written to the local outbox (see outbox.py); it is only
+# removed once the server has stored it, so scores that could not be sent are
+# replayed in batches, with exponential backoff, after the next successful login.
+# The worker has its own requests.Session. Each ticket or replay request carries
+# the login snapshot taken when it was queued, so a score is always sent with the
+# credentials of the user who owns it; the worker only reads the login globals to
+# pick up (or perform) a token refresh for that same login (see _fresh_token).
+
+# Entries per /api/submit_scores request (the server accepts at most 50)
+OUTBOX_REPLAY_BATCH_SIZE = 50
+# Replay backoff: BASE * 2**attempt seconds, capped at MAX, with jitter
+OUTBOX_RETRY_BASE_DELAY = 2.0
+OUTBOX_RETRY_MAX_DELAY = 300.0
+
+_outbox = None
+_outbox_lock = threading.Lock()
+_worker_session = requests.Session() # Used by the score-submitter thread only
+
+def get_outbox():
+    """Returns the process-wide outbox, opening OUTBOX_FILE_PATH on first use."""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = ScoreOutbox(OUTBOX_FILE_PATH)
+        return _outbox
+
+
+class SubmissionTicket:
+    """Handle for a queued score submission; poll() never blocks."""
+
+    def __init__(self, score, level, submission_id=None, credentials=None):
+        self.score = score
+        self.level = level
+        self.submission_id = submission_id
+        self.credentials = credentials # _snapshot_auth() when the score was queued
+        self._done = threading.Event()
+        self._result = None # (bool: success, str: message) once finished
+
+    def poll(self):
+        """Returns (success, message) once the submission finished, otherwise None."""
+        return self._result if self._done.is_set() else None
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Blocks up to `timeout` seconds for the result (for shutdown, not the game loop)."""
+        self._done.wait(timeout)
+        return self.poll()
+
+    def _finish(self, success, message):
+        self._result = (success, message)
+        self._done.set()
+
+
+_submission_queue = queue.Queue()
+_submission_thread = None
+_submission_lock = threading.Lock()
+_STOP = object() # Sentinel telling the worker to exit
+_REPLAY = object() # Queued as (_REPLAY, credentials) to ask the worker to resend the outbox
+
+
+def _retry_delay(attempt):
+    """Seconds to wait before replay attempt number `attempt` (0-based)."""
+    delay = min(OUTBOX_RETRY_MAX_DELAY, OUTBOX_RETRY_BASE_DELAY * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.0) # Jitter so many clients don't retry in lockstep
+
+
+def _worker_session_for(credentials):
+    """Loads the snapshot's cookies into the worker's session, dropping any earlier user's."""
+    cookies = _worker_session.cookies
+    cookies.clear()
+    if credentials is not None:
+        cookies.update(credentials[2])
+    return _worker_session
+
+
+def _send_ticket(ticket):
+    """
+    Sends one queued score, as the user who was logged in when it was queued, and settles its outbox entry.
+
+    Returns:
+        bool: False if the score was kept in the outbox for a later retry.
+    """
+    try:
+        success, message, retryable = _post_score(ticket.score, ticket.level, ticket.submission_id,
+                                                  ticket.credentials, _worker_session_for(ticket.credentials))
+    except Exception as e: # Never let one failure kill the worker
+        success, message, retryable = False, f"Submission error: {e}", False
+    if ticket.submission_id is not None:
+        if success or not retryable:
+            get_outbox().ack([ticket.submission_id])
+        else:
+            message = f"{message} (saved offline, will retry)"
+    ticket._finish(success, message)
+    return success or not retryable
+
+
+def _replay_outbox(credentials):
+    """
+    Resends the unsent scores of the user `credentials` belong to, in batches, as that user.
+
+    Returns:
+        bool: False if a batch failed transiently and the rest should be retried later.
+    """
+    if not _login_unchanged(credentials):
+        return False
+    outbox = get_outbox()
+    entries = outbox.pending(username=credentials[0])
+    session = _worker_session_for(credentials)
+    for start in range(0, len(entries), OUTBOX_REPLAY_BATCH_SIZE):
+        chunk = entries[start:start + OUTBOX_REPLAY_BATCH_SIZE]
+        results = _post_scores([
+            {"score": e["score"], "level": e["level"], "submission_id": e["id"],
+             "client_timestamp": e.get("created_at")}
+            for e in chunk
+        ], credentials, session)
+        if results is None or len(results) != len(chunk):
+            return False
+        # Stored, duplicate or permanently invalid: either way, never send it again
+        outbox.ack([entry["id"] for entry, _ in zip(chunk, results)])
+        print(f"Network Client: Replayed {len(results)} offline score(s).")
+    return True
+
+
+def _login_unchanged(credentials):
+    """True if `credentials` (a snapshot, or None) is still the current login."""
+    with _auth_lock:
+        return _is_current_auth(credentials)
+
+
+def _submission_worker():
+    """Runs queued submissions one at a time on the worker's own session."""
+    retry_at = None # time.monotonic() of the next outbox replay, if one is scheduled
+    attempt = 0
+    credentials = None # Login snapshot of the last ticket or replay request
+    while True:
+        timeout = None if retry_at is None else max(0.0, retry_at - time.monotonic())
+        try:
+            item = _submission_queue.get(timeout=timeout)
+            from_queue = True
+        except queue.Empty:
+            item, from_queue = (_REPLAY, credentials), False
+        try:
+            if item is _STOP:
+                return
+            if isinstance(item, SubmissionTicket):
+                credentials = item.credentials
+                delivered = _send_ticket(item)
+            else:
+                credentials = item[1]
+                delivered = _replay_outbox(credentials)
+            has_backlog = credentials is not None and \
+                len(get_outbox().pending(username=credentials[0])) > 0
+            if not _login_unchanged(credentials) or not has_backlog:
+                retry_at, attempt = None, 0 # Nothing to do until the next login / submission
+            elif delivered:
+                retry_at, attempt = time.monotonic(), 0 # Connection works again: flush older entries now
+            else:
+                retry_at = time.monotonic() + _retry_delay(attempt)
+                attempt += 1
+        except Exception as e:
+            print(f"Network Client: Score worker error: {e}")
+        finally:
+            if from_queue:
+                _submission_queue.task_done()
+
+
+def _ensure_submission_worker():
+    global _submission_thread
+    with _submission_lock:
+        if _submission_thread is None or not _submission_thread.is_alive():
+            _submission_thread = threading.Thread(
+                target=_submission_worker, name="score-submitter", daemon=True
+            )
+            _submission_thread.start()
+
+
+def submit_score_async(score, level_completed):
+    """
+    Records the score in the outbox, queues its submission and returns immediately.
+
+    Args:
+        score (int): The score to submit.
+        level_completed (int): The level on which the score was achieved.
+
+    Returns:
+        SubmissionTicket: Poll it each frame; poll() returns (success, message) when done.
+    """
+    credentials = _snapshot_auth()
+    username = credentials[0] if credentials is not None else None
+    try:
+        submission_id = get_outbox().add(score, level_completed, username=username)['id']
+    except OSError as e: # Still try to send it, just without the offline copy
+        print(f"Network Client: Could not write score outbox: {e}")
+        submission_id = None
+    ticket = SubmissionTicket(score, level_completed, submission_id, credentials)
+    _ensure_submission_worker()
+    _submission_queue.put(ticket)
+    return ticket
+
+
+def schedule_outbox_replay():
+    """Asks the worker to resend unsent scores (called after a successful login)."""
+    credentials = _snapshot_auth()
+    if credentials is None:
+        return False
+    try:
+        has_backlog = len(get_outbox().pending(username=credentials[0])) > 0
+    except OSError as e:
+        print(f"Network Client: Could not read score outbox: {e}")
+        return False
+    if has_backlog:
+        _ensure_submission_worker()
+        _submission_queue.put((_REPLAY, credentials))
+    return has_backlog
+
+
+def shutdown_submission_worker(timeout=5.0):
+    """
+    Lets queued submissions finish (up to `timeout` seconds) and stops the worker.
+    Call before logging out / quitting so in-flight scores are not dropped; anything
+    still unsent stays in the outbox for the next session.
+    """
+    global _submission_thread
+    with _submission_lock:
+        thread = _submission_thread
+        _submission_thread = None
+    if thread is None or not thread.is_alive():
+        return
+    _submission_queue.put(_STOP)
+    thread.join(timeout)
@@ -0,0 +1,123 @@
+"""Durable local outbox for score submissions that have not reached the server yet.
+
+Every submission is appended to a JSON-lines file before it is sent, and an
+acknowledgement record is appended once the server has stored it (or rejected
+it for good). Whatever has an "add" record but no "ack" record survives a
+crash, a lost connection or quitting the game, and is replayed on the owner's next
+successful login. Each entry carries a random `submission_id` that the server
+uses to drop retries it has already stored.
+"""
+# /Users/junluo/Desktop/桌面文件/PlaneWar_Sever/game/outbox.py
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+
+# Rewrite the file once this many acknowledged records have piled up
+COMPACT_AFTER_ACKS = 100
+
+
+class ScoreOutbox:
+    """Thread-safe, append-only log of unsent scores."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending = {} # submission_id -> entry dict, in insertion order
+        self._acked_records = 0 # Acknowledged "add"/"ack" pairs still in the file
+        self._load()
+
+    def _load(self):
+        """Rebuilds the pending set from the log. A torn last line (crash mid-write) is ignored."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get('op') == 'add':
+                    self._pending[record['id']] = record
+                elif record.get('op') == 'ack' and self._pending.pop(record.get('id'), None) is not None:
+                    self._acked_records += 1
+
+    def _append(self, records):
+        """Appends records and forces them to disk before returning."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def add(self, score, level, username=None):
+        """
+        Records a new unsent score.
+
+        Args:
+            score (int): The score to submit.
+            level (int): The level on which the score was achieved.
+            username (str, optional): Account the score belongs to; replay only sends
+                entries owned by the logged-in user, so entries without one are never replayed.
+
+        Returns:
+            dict: The stored entry, including its new `id` (the submission_id).
+        """
+        entry = {
+            'op': 'add',
+            'id': uuid.uuid4().hex,
+            'score': score,
+            'level': level,
+            'username': username,
+            'created_at': datetime.utcnow().isoformat(),
+        }
+        with self._lock:
+            self._append([entry])
+            self._pending[entry['id']] = entry
+        return entry
+
+    def ack(self, submission_ids):
+        """Marks entries as delivered (or permanently rejected) so they are not replayed."""
+        with self._lock:
+            acked = [sid for sid in submission_ids if sid in self._pending]
+            if not acked:
+                return
+            self._append([{'op': 'ack', 'id': sid} for sid in acked])
+            for sid in acked:
+                del self._pending[sid]
+            self._acked_records += len(acked)
+            if not self._pending or self._acked_records >= COMPACT_AFTER_ACKS:
+                self._compact()
+
+    def _compact(self):
+        """Rewrites the log with only the pending entries (atomic replace)."""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in self._pending.values():
+                f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._acked_records = 0
+
+    def pending(self, username=None):
+        """
+        Returns unsent entries, oldest first, optionally only those owned by `username`.
+
+        Entries recorded without an owner are never attributed to whoever logs in
+        next: they are only returned when no `username` is given, and stay in the
+        outbox until they are acknowledged explicitly.
+        """
+        with self._lock:
+            entries = list(self._pending.values())
+        if username is not None:
+            entries = [e for e in entries if e.get('username') == username]
+        return entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
@@ -1,7 +1,21 @@
 import pygame
 # --- Use relative imports for modules within the 'game' package ---
 from .settings import *  # Import constants
-from .bullet import Bullet  # Import Bullet class
+from .bullet import player_bullet_pool  # Recycled Bullet sprites
+
+# Shield overlays by (radius, color): identical every frame, and for every Player
+_shield_overlays = {}
+
+def shield_overlay(radius, color):
+    """ The translucent shield circle for `radius` and `color`, drawn once and then reused. """
+    key = (radius, tuple(color))
+    overlay = _shield_overlays.get(key)
+    if overlay is None:
+        diameter = max(1, radius * 2)
+        overlay = pygame.Surface((diameter, diameter), pygame.SRCALPHA)
+        pygame.draw.circle(overlay, color, (radius, radius), max(1, radius))
+        _shield_overlays[key] = overlay
+    return overlay
 
 class Player(pygame.sprite.Sprite):
     """
@@ -22,7 +36,7 @@ class Player(pygame.sprite.Sprite):
         if not isinstance(player_img, pygame.Surface):
             raise ValueError("Invalid player image provided to Player init.")
         self.image_orig = player_img
-        self.image = self.image_orig.copy()
+        self.image = self.image_orig # Never drawn on, so no private copy is needed
         self.rect = self.image.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 20))
 
         # Score and bombs
@@ -57,17 +71,21 @@ class Player(pygame.sprite.Sprite):
         self.velocity = pygame.math.Vector2(0, 0)
         self._last_center = pygame.math.Vector2(self.rect.center)
 
-    def shoot(self):
+    def shoot(self, projectiles=None):
+        """ Fires if the shot delay has passed. With a ProjectileManager the shots go into it and [] is returned. """
         now = pygame.time.get_ticks()
         if now - self.last_shot_time > self.shoot_delay:
             self.last_shot_time = now
-            bullets = []
             if self.powerup_type == 'double_shot':
-                left = Bullet(self.rect.centerx - 10, self.rect.top)
-                right = Bullet(self.rect.centerx + 10, self.rect.top)
-                bullets.extend([left, right])
+                origins = [(self.rect.centerx - 10, self.rect.top), (self.rect.centerx + 10, self.rect.top)]
             else:
-                bullets.append(Bullet(self.rect.centerx, self.rect.top))
+                origins = [(self.rect.centerx, self.rect.top)]
+            bullets = []
+            for x, y in origins:
+                if projectiles is not None:
+                    projectiles.fire_player(x, y)
+                else:
+                    bullets.append(player_bullet_pool.acquire(x, y))
 
             if self.shoot_sound:
                 try:
@@ -105,9 +123,6 @@ class Player(pygame.sprite.Sprite):
         self.velocity = new_center - old_center
         self._last_center = new_center
 
-        # Reset image
-        self.image = self.image_orig.copy()
-
     def activate_powerup(self, type):
         now = pygame.time.get_ticks()
         if type == 'double_shot':
@@ -149,10 +164,7 @@ class Player(pygame.sprite.Sprite):
     def draw_shield(self, surface):
         if not self.shield_active:
             return
-        radius = self.shield_visual_radius
-        diameter = max(1, radius * 2)
-        shield_surf = pygame.Surface((diameter, diameter), pygame.SRCALPHA)
-        draw_r = max(1, radius)
-        pygame.draw.circle(shield_surf, self.shield_visual_color, (radius, radius), draw_r)
-        rect = shield_surf.get_rect(center=self.rect.center)
-        surface.blit(shield_surf, rect)
+        overlay = shield_overlay(self.shield_visual_radius, self.shield_visual_color)
+        # Same placement as get_rect(center=self.rect.center), without a Rect per frame
+        surface.blit(overlay, (self.rect.centerx - overlay.get_width() // 2,
+                               self.rect.centery - overlay.get_height() // 2))
@@ -0,0 +1,183 @@
+"""Structure-of-arrays projectile system backed by NumPy (optional).
+
+Each bullet in the sprite version is a full `pygame.sprite.Sprite` with a
+Python `update()` per frame. `ProjectileManager` keeps every projectile of a
+kind in NumPy arrays instead (positions and velocities), so a frame is a few
+vectorized operations whatever the bullet count:
+
+* `update()` moves and culls all projectiles at once,
+* `collide_enemies()` / `collide_sprite()` / `hits_player()` do the AABB tests
+  against a whole enemy group (or one sprite) as one broadcast comparison,
+* `draw()` batch-blits the survivors with `Surface.blits`.
+
+It is used by run_game when `USE_NUMPY_PROJECTILES` is set and NumPy is
+installed (`poetry install -E fast-projectiles`); otherwise the sprite bullets
+are used. Collision semantics match the sprite path: a projectile is consumed
+by the first enemy (in group order) it overlaps, like `groupcollide(enemies,
+bullets, True, True)`, and overlap uses `Rect.colliderect` rules (touching
+edges don't collide).
+"""
+# /Users/junluo/Desktop/桌面文件/PlaneWar_Sever/game/projectiles.py
+from itertools import repeat
+
+from .settings import *
+from .bullet import Bullet, EnemyBullet
+
+try:
+    import numpy as np
+except ImportError: # Optional dependency: the sprite bullets work without it
+    np = None
+
+NUMPY_AVAILABLE = np is not None
+
+
+class ProjectileArray:
+    """ Top-left corners and velocities of live projectiles sharing one image, packed in the first `count` rows. """
+    def __init__(self, image, capacity=PROJECTILE_ARRAY_CAPACITY):
+        if np is None:
+            raise RuntimeError("ProjectileArray requires numpy (poetry install -E fast-projectiles)")
+        self.image = image
+        self.width, self.height = image.get_size()
+        self.size = np.array([self.width, self.height], dtype=float)
+        self.pos = np.zeros((capacity, 2))
+        self.vel = np.zeros((capacity, 2))
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self, needed):
+        capacity = max(needed, 2 * len(self.pos))
+        for name in ('pos', 'vel'):
+            old = getattr(self, name)
+            new = np.zeros((capacity, 2))
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def spawn(self, x, y, vx, vy):
+        """ Adds a projectile with its top-left corner at (x, y), moving (vx, vy) pixels per frame. """
+        if self.count == len(self.pos):
+            self._grow(self.count + 1)
+        self.pos[self.count] = (x, y)
+        self.vel[self.count] = (vx, vy)
+        self.count += 1
+
+    def bounds(self):
+        """ (count, 4) array of left, top, right, bottom edges. """
+        pos = self.pos[:self.count]
+        return np.hstack((pos, pos + self.size))
+
+    def keep(self, mask):
+        """ Compacts the arrays to the projectiles where `mask` is True (order preserved). """
+        kept = int(mask.sum())
+        if kept != self.count:
+            self.pos[:kept] = self.pos[:self.count][mask]
+            self.vel[:kept] = self.vel[:self.count][mask]
+            self.count = kept
+
+    def clear(self):
+        self.count = 0
+
+    def update(self):
+        """ Moves every projectile one frame, then drops those entirely off-screen. """
+        if not self.count:
+            return
+        self.pos[:self.count] += self.vel[:self.count]
+        left, top, right, bottom = self.bounds().T
+        self.keep((bottom >= 0) & (top <= SCREEN_HEIGHT) & (right >= 0) & (left <= SCREEN_WIDTH))
+
+    def overlaps(self, rects):
+        """
+        Vectorized AABB test of every projectile against `rects`.
+
+        Returns:
+            ndarray: (len(rects), count) bools, True where projectile j overlaps rect i.
+        """
+        boxes = np.asarray([tuple(r) for r in rects], dtype=float).reshape(-1, 4) # x, y, w, h
+        r_left, r_top = boxes[:, 0:1], boxes[:, 1:2]
+        r_right, r_bottom = r_left + boxes[:, 2:3], r_top + boxes[:, 3:4]
+        p_left, p_top, p_right, p_bottom = self.bounds().T
+        return (r_left < p_right) & (p_left < r_right) & (r_top < p_bottom) & (p_top < r_bottom)
+
+    def draw(self, surface):
+        """ Blits every projectile in one `Surface.blits` call. """
+        if not self.count:
+            return
+        topleft = self.pos[:self.count].round().astype(int).tolist()
+        surface.blits(zip(repeat(self.image), topleft), doreturn=False)
+
+
+class ProjectileManager:
+    """ Player shots and enemy shots for one level, as two ProjectileArrays. """
+    def __init__(self, player_image=None, enemy_image=None, capacity=PROJECTILE_ARRAY_CAPACITY):
+        self.player_shots = ProjectileArray(player_image or Bullet.make_image(), capacity)
+        self.enemy_shots = ProjectileArray(enemy_image or EnemyBullet.make_image(), capacity)
+
+    def fire_player(self, x, y):
+        """ Same placement and speed as `Bullet(x, y)`: centred on (x, y), straight up. """
+        shots = self.player_shots
+        shots.spawn(round(x) - shots.width // 2, round(y) - shots.height // 2, 0, -BULLET_SPEED)
+
+    def fire_enemy(self, x, y, direction=None):
+        """ Same placement and velocity as `EnemyBullet(x, y, direction)`: top edge at y. """
+        shots = self.enemy_shots
+        vx, vy = (0, 1) if direction is None else (direction.x, direction.y)
+        shots.spawn(round(x) - shots.width // 2, round(y), vx * ENEMY_BULLET_SPEED_Y, vy * ENEMY_BULLET_SPEED_Y)
+
+    def update(self):
+        self.player_shots.update()
+        self.enemy_shots.update()
+
+    def collide_enemies(self, enemies):
+        """
+        Player shots against `enemies`, like `groupcollide(enemies, bullets, True, True)`.
+
+        Every overlapping shot is consumed by the first enemy (in group order) it
+        overlaps; enemies hit by at least one shot are killed.
+
+        Returns:
+            dict: Each enemy hit mapped to the number of shots that hit it.
+        """
+        shots = self.player_shots
+        sprites = enemies.sprites()
+        if not sprites or not shots.count:
+            return {}
+        overlap = shots.overlaps([s.rect for s in sprites])
+        hit_any = overlap.any(axis=0)
+        if not hit_any.any():
+            return {}
+        first_enemy = overlap.argmax(axis=0)[hit_any]
+        counts = np.bincount(first_enemy, minlength=len(sprites))
+        shots.keep(~hit_any)
+        hits = {}
+        for index in np.flatnonzero(counts):
+            sprite = sprites[index]
+            hits[sprite] = int(counts[index])
+            sprite.kill()
+        return hits
+
+    def collide_sprite(self, sprite):
+        """ Removes the player shots overlapping `sprite` (e.g. the boss) and returns how many there were. """
+        shots = self.player_shots
+        if not shots.count:
+            return 0
+        hit = shots.overlaps([sprite.rect])[0]
+        shots.keep(~hit)
+        return int(hit.sum())
+
+    def hits_player(self, player):
+        """ Removes the enemy shots overlapping `player`; True if there were any. """
+        shots = self.enemy_shots
+        if not shots.count:
+            return False
+        hit = shots.overlaps([player.rect])[0]
+        shots.keep(~hit)
+        return bool(hit.any())
+
+    def clear_enemy_shots(self):
+        """ Bomb: every enemy bullet disappears. """
+        self.enemy_shots.clear()
+
+    def draw(self, surface):
+        self.player_shots.draw(surface)
+        self.enemy_shots.draw(surface)
@@ -52,6 +52,7 @@ UI_FONT_PATH = os.path.join(FONT_DIR, "NotoSansSC-Regular.ttf")
 FONT_SIZE_LARGE = 60
 FONT_SIZE_SCORE = 36
 FONT_SIZE_TITLE = 90
+HUD_TEXT_CACHE_SIZE = 128 # Rendered (text, color) surfaces kept by the in-game HUD
 
 # --- Sprite Dimensions ---
 PLAYER_WIDTH = 55
@@ -91,6 +92,10 @@ BOSS_SPEED_Y = 1           # Vertical speed for the boss (if used)
 BOSS_SHOOT_DELAY = 1500
 BOSS_MAX_HEALTH = 50
 ENEMY_BULLET_SPEED_Y = 12
+BULLET_POOL_MAX_FREE = 256     # Killed bullets kept for reuse, per bullet type
+# NumPy structure-of-arrays projectiles (game/projectiles.py) instead of bullet sprites; needs numpy
+USE_NUMPY_PROJECTILES = os.environ.get('PLANEWAR_NUMPY_PROJECTILES', '0').lower() in ('1', 'true', 'yes')
+PROJECTILE_ARRAY_CAPACITY = 256 # Initial rows per projectile array (grows as needed)
 
 STARTUP_GRACE_PERIOD = 1500
 PLAYER_STARTING_BOMBS = 3 # Define how many bombs the player starts with
@@ -102,6 +107,11 @@ BOMB_KEY = pygame.K_b
 
 BACKGROUND_SCROLL_SPEED = 2 # Pixels per frame, adjust as desired
 
+# --- Collision Broadphase ---
+# Side (px) of the spatial hash cells used by run_game's collision checks.
+# Roughly the size of an enemy: bullets then touch 1-2 cells, enemies ~4.
+SPATIAL_HASH_CELL_SIZE = 64
+
 # --- PowerUp Types ---
 POWERUP_TYPES = ['double_shot', 'shield', 'bomb']
 POWERUP_IMAGES = {
@@ -151,6 +161,8 @@ BGM_VOLUME = 0.3
 
 # --- High Score File Path ---
 HIGH_SCORE_FILE_PATH = os.path.join(BASE_DIR, "highscore.txt")
+# Scores not yet accepted by the server (append-only, replayed after login)
+OUTBOX_FILE_PATH = os.path.join(BASE_DIR, "score_outbox.jsonl")
 
 # --- Server API URL ---
 # Define the base URL for the Flask server API
@@ -232,10 +232,16 @@ def show_start_screen(screen_surf, clock_obj, fonts, high_score, logged_in_usern
     return "QUIT" # Fallback
 
 
-def show_end_screen(screen_surf, clock_obj, fonts, game_result, final_score, submission_status=None):
+def show_end_screen(screen_surf, clock_obj, fonts, game_result, final_score, submission_status=None,
+                    pending_submission=None):
     """
     Displays the game over/win screen and waits for player input (R/Q/Enter/Esc).
-    (No changes needed here based on login update)
+
+    Args:
+        submission_status (str, optional): Status line to show under the score.
+        pending_submission (network_client.SubmissionTicket, optional): A score submission
+            still running in the background. It is polled every frame (without blocking)
+            and its result replaces `submission_status` as soon as it arrives.
     """
     font_large = fonts.get('large') or pygame.font.SysFont(None, FONT_SIZE_LARGE)
     font_score = fonts.get('score') or pygame.font.SysFont(None, FONT_SIZE_SCORE)
@@ -261,6 +267,13 @@ def show_end_screen(screen_surf, clock_obj, fonts, game_result, final_score, sub
                 if event.key == pygame.K_ESCAPE or event.key == pygame.K_q:
                     return 'QUIT'
 
+        # Non-blocking check on the background score submission
+        if pending_submission is not None:
+            result = pending_submission.poll()
+            if result is not None:
+                _, submission_status = result
+                pending_submission = None
+
         screen_surf.blit(overlay, (0, 0))
 
         msg_surf = font_large.render(result_text, True, result_color)
@@ -0,0 +1,52 @@
+"""Add best_scores table and backfill from scores
+
+Revision ID: 5b2f0c9a7d13
+Revises: 845454af1341
+Create Date: 2025-05-10 10:02:41.518220
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2f0c9a7d13'
+down_revision = '845454af1341'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('best_scores',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('level', sa.Integer(), nullable=False),
+    sa.Column('best_score', sa.Integer(), nullable=False),
+    sa.Column('achieved_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'level')
+    )
+    with op.batch_alter_table('best_scores', schema=None) as batch_op:
+        batch_op.create_index('ix_best_scores_level_rank', ['level', sa.text('best_score DESC'), 'achieved_at'], unique=False)
+
+    # Backfill: each user's highest score per level, with the earliest time it was reached
+    op.execute("""
+        INSERT INTO best_scores (user_id, level, best_score, achieved_at)
+        SELECT s.user_id, s.level, s.score_value, MIN(s.timestamp)
+        FROM scores AS s
+        JOIN (
+            SELECT user_id, level, MAX(score_value) AS max_score
+            FROM scores
+            GROUP BY user_id, level
+        ) AS m
+          ON m.user_id = s.user_id
+         AND m.level = s.level
+         AND m.max_score = s.score_value
+        GROUP BY s.user_id, s.level, s.score_value
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('best_scores', schema=None) as batch_op:
+        batch_op.drop_index('ix_best_scores_level_rank')
+
+    op.drop_table('best_scores')
@@ -0,0 +1,29 @@
+"""Add client submission_id to scores for retry dedup
+
+Revision ID: 9e4d21c6b8a0
+Revises: 5b2f0c9a7d13
+Create Date: 2025-05-12 18:34:09.204117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4d21c6b8a0'
+down_revision = '5b2f0c9a7d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('scores', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('submission_id', sa.String(length=64), nullable=True))
+        # NULLs never collide, so existing rows (and clients that send no id) are unaffected
+        batch_op.create_index('ix_scores_user_submission', ['user_id', 'submission_id'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('scores', schema=None) as batch_op:
+        batch_op.drop_index('ix_scores_user_submission')
+        batch_op.drop_column('submission_id')
@@ -0,0 +1,44 @@
+"""Add user_totals table for the overall rank lookup
+
+Revision ID: a8d3f6b2c914
+Revises: e41b7d9c3a62
+Create Date: 2025-05-19 09:12:44.518306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8d3f6b2c914'
+down_revision = 'e41b7d9c3a62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_totals',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total_score', sa.Integer(), nullable=False),
+    sa.Column('achieved_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    with op.batch_alter_table('user_totals', schema=None) as batch_op:
+        batch_op.create_index('ix_user_totals_rank',
+                              [sa.text('total_score DESC'), 'achieved_at', 'user_id'], unique=False)
+
+    # Backfill: each user's sum of personal bests, with the earliest time among them
+    op.execute("""
+        INSERT INTO user_totals (user_id, total_score, achieved_at)
+        SELECT user_id, SUM(best_score), MIN(achieved_at)
+        FROM best_scores
+        GROUP BY user_id
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('user_totals', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_totals_rank')
+
+    op.drop_table('user_totals')
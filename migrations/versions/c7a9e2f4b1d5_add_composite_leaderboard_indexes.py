@@ -0,0 +1,47 @@
+"""Add composite covering indexes for leaderboard access patterns
+
+Revision ID: c7a9e2f4b1d5
+Revises: 9e4d21c6b8a0
+Create Date: 2025-05-14 09:12:53.640318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7a9e2f4b1d5'
+down_revision = '9e4d21c6b8a0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('scores', schema=None) as batch_op:
+        # Per-level "best score per user, earliest time" aggregation over raw scores
+        batch_op.create_index('ix_scores_level_user_score_ts',
+                              ['level', 'user_id', sa.text('score_value DESC'), 'timestamp'], unique=False)
+        # One user's best per level (profile pages, best_scores rebuilds)
+        batch_op.create_index('ix_scores_user_level_score',
+                              ['user_id', 'level', sa.text('score_value DESC')], unique=False)
+
+    with op.batch_alter_table('best_scores', schema=None) as batch_op:
+        # user_id becomes the last key column: it is the final ORDER BY tie-breaker,
+        # and with it the per-level leaderboard is answered from the index alone
+        batch_op.drop_index('ix_best_scores_level_rank')
+        batch_op.create_index('ix_best_scores_level_rank',
+                              ['level', sa.text('best_score DESC'), 'achieved_at', 'user_id'], unique=False)
+        # Covers the overall leaderboard's GROUP BY user_id SUM(best_score), MIN(achieved_at)
+        batch_op.create_index('ix_best_scores_user_totals', ['user_id', 'best_score', 'achieved_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('best_scores', schema=None) as batch_op:
+        batch_op.drop_index('ix_best_scores_user_totals')
+        batch_op.drop_index('ix_best_scores_level_rank')
+        batch_op.create_index('ix_best_scores_level_rank',
+                              ['level', sa.text('best_score DESC'), 'achieved_at'], unique=False)
+
+    with op.batch_alter_table('scores', schema=None) as batch_op:
+        batch_op.drop_index('ix_scores_user_level_score')
+        batch_op.drop_index('ix_scores_level_user_score_ts')
@@ -0,0 +1,44 @@
+"""Add period_best_scores table for daily and weekly leaderboards
+
+Revision ID: e41b7d9c3a62
+Revises: c7a9e2f4b1d5
+Create Date: 2025-05-16 11:40:27.902113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e41b7d9c3a62'
+down_revision = 'c7a9e2f4b1d5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Not backfilled: the current day's and week's buckets fill from new submissions
+    op.create_table('period_best_scores',
+    sa.Column('period', sa.String(length=16), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('level', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('best_score', sa.Integer(), nullable=False),
+    sa.Column('achieved_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('period', 'period_start', 'level', 'user_id')
+    )
+    with op.batch_alter_table('period_best_scores', schema=None) as batch_op:
+        batch_op.create_index('ix_period_best_scores_rank',
+                              ['period', 'period_start', 'level', sa.text('best_score DESC'), 'achieved_at', 'user_id'],
+                              unique=False)
+        batch_op.create_index('ix_period_best_scores_user_totals',
+                              ['period', 'period_start', 'user_id', 'best_score', 'achieved_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('period_best_scores', schema=None) as batch_op:
+        batch_op.drop_index('ix_period_best_scores_user_totals')
+        batch_op.drop_index('ix_period_best_scores_rank')
+
+    op.drop_table('period_best_scores')
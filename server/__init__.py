@@ -12,7 +12,8 @@ from flask import Flask
 # --- Ensure this import matches the function defined in config.py ---
 from .config import get_config
 # --- Import extensions ---
-from .extensions import db, migrate, login_manager, bcrypt
+from .database import configure_engine_options, install_sqlite_pragmas
+from .extensions import db, migrate, login_manager, bcrypt, leaderboard_cache, user_cache, score_ingest, login_guard, instrumentation, metrics
 
 def create_app():
     """Application factory function."""
@@ -31,10 +32,18 @@ def create_app():
 
     # --- Initialize extensions ---
     try:
+        configure_engine_options(app)
         db.init_app(app)
+        install_sqlite_pragmas(app)
         migrate.init_app(app, db) # Initialize migrate with app and db
         login_manager.init_app(app)
         bcrypt.init_app(app)
+        leaderboard_cache.init_app(app)
+        user_cache.init_app(app)
+        score_ingest.init_app(app)
+        login_guard.init_app(app)
+        instrumentation.init_app(app)
+        metrics.init_app(app)
         print(" * Extensions initialized.")
     except Exception as e:
         print(f"ERROR initializing extensions: {e}")
@@ -55,6 +64,9 @@ def create_app():
         print(f"ERROR registering blueprints: {e}")
         raise
 
+    from .commands import register_commands
+    register_commands(app) # `flask prune-leaderboards`
+
     # --- Add Context Processors --- # <-- NEW SECTION
     @app.context_processor
     def inject_now():
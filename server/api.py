@@ -3,23 +3,116 @@
 
 Contains routes (using a Flask Blueprint) designed to be called by the game
 client or other services. Handles tasks like user login (`/api/login`),
-score submission (`/api/submit_score`), and logout (`/api/logout`) using JSON requests
-and responses, relying on Flask-Login for authentication.
+score submission (`/api/submit_score`, or batched via `/api/submit_scores`),
+logout (`/api/logout`) and paginated leaderboards (`/api/leaderboard`) using
+JSON requests and responses, relying on Flask-Login for authentication.
 """
-from flask import Blueprint, request, jsonify
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import math
+from datetime import datetime
+from flask import Blueprint, request, jsonify, make_response
+from sqlalchemy.exc import IntegrityError
 from flask_login import login_user, logout_user, login_required, current_user # Import Flask-Login functions
 from .models import User, Score # Make sure Score is imported
-from .extensions import db
+from .extensions import db, score_ingest, login_guard, user_cache
+from .login_guard import PasswordVerifierBusy
+from .tokens import issue_token, token_max_age
+from .leaderboard_service import (
+    TOP_N_PLAYERS,
+    LeaderboardCursor,
+    get_leaderboard_page_by_level,
+    get_overall_leaderboard_page,
+    get_cached_latest_score_write,
+    current_period_start,
+    get_period_leaderboard_page,
+    get_player_rank_by_level,
+    get_player_rank_overall,
+    RANK_NEIGHBOURS,
+    ALL_TIME,
+)
+from .models import LEADERBOARD_PERIODS
 
-# Note: For a more secure API, consider using Flask-Login's session for simple cases
-# or token-based authentication (e.g., Flask-JWT-Extended) for stateless APIs.
-# The current implementation relying on user_id sent by the client is INSECURE.
+# Upper bound on ?limit= for the JSON leaderboard endpoints
+MAX_LEADERBOARD_PAGE_SIZE = 100
+# Upper bound on ?neighbours= for /api/rank
+MAX_RANK_NEIGHBOURS = 10
+# Upper bound on entries accepted by /api/submit_scores in one request
+MAX_BATCH_SCORES = 50
+# Matches Score.submission_id
+MAX_SUBMISSION_ID_LENGTH = 64
+
+# Authentication: either the Flask-Login session cookie or a signed bearer token
+# from /api/login (see tokens.py). The user is never taken from the payload.
+# A token is trusted on its signature alone, so a user deleted or renamed after
+# it was issued stays authenticated until it expires (at most API_TOKEN_MAX_AGE
+# seconds). Clients renew it via /api/token/refresh, which re-checks the account.
 
 bp = Blueprint('api', __name__, url_prefix='/api') # Added url_prefix for clarity
+logger = logging.getLogger(__name__)
+
+def _validate_score_entry(entry):
+    """
+    Validates one score payload ({'score': ..., 'level': ..., 'submission_id': optional str}).
+
+    Returns:
+        tuple: ((int: score, int: level, str|None: submission_id), None) when valid,
+               or ((None, None, None), str: error message).
+    """
+    invalid = (None, None, None)
+    if not isinstance(entry, dict):
+        return invalid, "Entry must be a JSON object"
+    score_value = entry.get('score')
+    level_value = entry.get('level')
+    if score_value is None or level_value is None:
+        return invalid, "Missing score or level"
+    submission_id = entry.get('submission_id')
+    if submission_id is not None and (not isinstance(submission_id, str) or not 0 < len(submission_id) <= MAX_SUBMISSION_ID_LENGTH):
+        return invalid, "Invalid submission_id"
+    try:
+        return (int(score_value), int(level_value), submission_id), None
+    except (ValueError, TypeError):
+        return invalid, "Invalid data types for score or level"
+
+def _idempotency_key(submission_id):
+    """
+    Resolves the dedup key of a single submission from the `Idempotency-Key` header
+    and/or the body's submission_id (both map to Score.submission_id).
+
+    Returns:
+        tuple: (str|None: key, str|None: error message)
+    """
+    header_key = request.headers.get('Idempotency-Key')
+    if header_key is None:
+        return submission_id, None
+    header_key = header_key.strip()
+    if not 0 < len(header_key) <= MAX_SUBMISSION_ID_LENGTH:
+        return None, "Invalid Idempotency-Key header"
+    if submission_id is not None and submission_id != header_key:
+        return None, "Idempotency-Key header does not match submission_id"
+    return header_key, None
+
+def _duplicate_submission_response(score):
+    """Replays the result of a submission that was already stored."""
+    response = jsonify({
+        "success": True,
+        "message": f"Score submitted successfully for level {score.level}.",
+        "duplicate": True,
+    })
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response, 201
 
 @bp.route('/login', methods=['POST'])
 def api_login():
-    """API endpoint for programmatic login (e.g., from Pygame client)."""
+    """
+    API endpoint for programmatic login (e.g., from Pygame client).
+
+    Starts a Flask-Login session and also returns a signed bearer token; later
+    /api calls may send `Authorization: Bearer <token>` instead of the cookie.
+    """
     if not request.is_json:
         return jsonify({"success": False, "message": "Request must be JSON"}), 415
 
@@ -30,20 +123,40 @@ def api_login():
     if not username or not password:
         return jsonify({"success": False, "message": "Username and password required"}), 400
 
+    # Refuse before hashing anything if this username or IP keeps failing
+    retry_after = login_guard.retry_after(username, request.remote_addr)
+    if retry_after:
+        response = jsonify({"success": False, "message": "Too many failed login attempts, please try again later"})
+        response.headers['Retry-After'] = str(math.ceil(retry_after))
+        return response, 429
+
     user = User.query.filter_by(username=username).first()
 
-    if user and user.check_password(password):
+    try:
+        authenticated = user is not None and user.check_password(password)
+    except PasswordVerifierBusy:
+        response = jsonify({"success": False, "message": "Server busy, please retry shortly"})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+
+    if authenticated:
+        login_guard.record_success(username, request.remote_addr)
         # Use Flask-Login to establish a session
         login_user(user) # Creates the secure session cookie
-        print(f"User {user.username} logged in successfully via API.")
-        # Return success, no need to send user_id anymore. Client relies on session cookie.
+        logger.info("User %s logged in via API.", user.username)
+        # Return success, no need to send user_id anymore. Client relies on session cookie
+        # or, statelessly, on the signed bearer token (see tokens.py).
         return jsonify({
             "success": True,
             "message": "Login successful",
-            "username": user.username # Still useful to return username for client UI
+            "username": user.username, # Still useful to return username for client UI
+            "token": issue_token(user),
+            "token_type": "Bearer",
+            "expires_in": token_max_age(),
             }), 200
     else:
-        print(f"API login failed for username: {username}")
+        login_guard.record_failure(username, request.remote_addr)
+        logger.info("API login failed for username: %s", username)
         return jsonify({"success": False, "message": "Invalid credentials"}), 401
 
 # Example logout endpoint (optional, but good practice)
@@ -52,53 +165,307 @@ def api_login():
 def api_logout():
     """API endpoint for logging out."""
     username = current_user.username # Get username before logging out
+    user_cache.invalidate([current_user.id]) # Next login reloads the user from the database
     logout_user() # Clears the session cookie
-    print(f"User {username} logged out via API.")
+    logger.info("User %s logged out via API.", username)
     return jsonify({"success": True, "message": "Logout successful"}), 200
 
+@bp.route('/token/refresh', methods=['POST'])
+@login_required
+def api_refresh_token():
+    """
+    Issues a fresh bearer token so a client can stay logged in past API_TOKEN_MAX_AGE.
+
+    Authenticated by the current (not yet expired) token or the session cookie. Unlike
+    ordinary token requests this looks the user up, so an account deleted or renamed
+    since the token was issued cannot keep renewing it.
+    """
+    user = db.session.get(User, current_user.id)
+    if user is None or user.username != current_user.username:
+        return jsonify({"success": False, "message": "Account no longer exists"}), 401
+    return jsonify({
+        "success": True,
+        "token": issue_token(user),
+        "token_type": "Bearer",
+        "expires_in": token_max_age(),
+        }), 200
+
 @bp.route('/submit_score', methods=['POST'])
 @login_required # <<< ADDED: Ensures only logged-in users can submit scores
 def api_submit_score():
     """
     API endpoint for submitting scores from the game client.
     Uses Flask-Login session for authentication.
+
+    Clients may send an `Idempotency-Key` header (or a `submission_id` field): a
+    retry with a key that is already stored returns the original 201 result,
+    marked `Idempotent-Replayed: true`, without inserting another row.
     """
     if not request.is_json:
         return jsonify({"success": False, "message": "Request must be JSON"}), 415
 
     data = request.get_json()
-    # user_id = data.get('user_id') # <<< REMOVED: Do not trust user_id from client
-    score_value = data.get('score')
-    level_from_payload = data.get('level')
-
-    # --- Updated Validation (No longer checks for user_id from payload) ---
-    # current_user is guaranteed to be valid by @login_required
-    if score_value is None or level_from_payload is None:
-         # Simplified error message as user_id is implicitly handled by login
-         return jsonify({"success": False, "message": "Missing score or level"}), 400
-
-    try:
-        score_value_int = int(score_value)
-        level_int = int(level_from_payload)
-    except (ValueError, TypeError):
-         return jsonify({"success": False, "message": "Invalid data types for score or level"}), 400
+    # user_id is NOT read from the payload; current_user is guaranteed valid by @login_required
+    (score_value_int, level_int, submission_id), error = _validate_score_entry(data)
+    if not error:
+        submission_id, error = _idempotency_key(submission_id)
+    if error:
+        return jsonify({"success": False, "message": error}), 400
 
     # --- Secure Authentication via Flask-Login ---
     # current_user is provided by Flask-Login based on the valid session cookie
     user = current_user
     # --- End Secure Authentication ---
 
+    # A retried submission (same idempotency key) is answered without another INSERT
+    if submission_id:
+        existing = Score.find_submissions(user.id, [submission_id]).get(submission_id)
+        if existing is not None:
+            return _duplicate_submission_response(existing)
+
+    # Write-behind mode: hand the validated score to the background flusher
+    if score_ingest.enabled:
+        if not score_ingest.submit(user.id, score_value_int, level_int, submission_id):
+            response = jsonify({"success": False, "message": "Server busy, please retry shortly"})
+            response.headers['Retry-After'] = '1'
+            return response, 503
+        return jsonify({"success": True, "message": f"Score accepted for level {level_int}."}), 202 # 202 Accepted
+
     # Create and save the score using the authenticated user's ID
     try:
         new_score = Score(user_id=user.id, # <<< Use current_user.id
                           score_value=score_value_int,
-                          level=level_int) # Field name 'level' confirmed correct from models.py
+                          level=level_int, # Field name 'level' confirmed correct from models.py
+                          submission_id=submission_id)
         db.session.add(new_score)
+        # The flush also raises the user's best_scores row (see models._sync_best_scores),
+        # so the materialized leaderboard data commits atomically with the raw score.
         db.session.commit()
-        print(f"Score {score_value_int} for user {user.username} (ID: {user.id}) on Level {level_int} saved.")
+        logger.debug("Score %s for user %s on level %s saved.", score_value_int, user.id, level_int)
         return jsonify({"success": True, "message": f"Score submitted successfully for level {level_int}."}), 201 # 201 Created
-    except Exception as e:
+    except IntegrityError:
+        # Lost a race with a concurrent retry of the same submission_id
+        db.session.rollback()
+        existing = Score.find_submissions(user.id, [submission_id]).get(submission_id)
+        if existing is not None:
+            return _duplicate_submission_response(existing)
+        return jsonify({"success": False, "message": "Database error saving score"}), 500
+    except Exception:
         db.session.rollback()
-        print(f"Error saving score for user {user.username} (ID: {user.id}) on level {level_int}: {e}")
+        logger.exception("Error saving score for user %s on level %s", user.id, level_int)
         return jsonify({"success": False, "message": "Database error saving score"}), 500
 
+
+@bp.route('/submit_scores', methods=['POST'])
+@login_required
+def api_submit_scores():
+    """
+    Batch variant of /api/submit_score for clients that finished several levels.
+
+    Expects {"scores": [{"score": int, "level": int, "client_timestamp": str|None,
+    "submission_id": str|None}, ...]}. Entries whose submission_id is already stored
+    are reported with "duplicate": true instead of being inserted again.
+    Every entry is validated before anything is written; valid entries are then
+    inserted in a single transaction (one multi-row INSERT and one commit) and the
+    response carries one result per entry, in request order. `client_timestamp` is
+    only echoed back so the client can match results; the server clock stamps rows.
+    """
+    if not request.is_json:
+        return jsonify({"success": False, "message": "Request must be JSON"}), 415
+
+    data = request.get_json()
+    entries = data.get('scores') if isinstance(data, dict) else None
+    if not isinstance(entries, list) or not entries:
+        return jsonify({"success": False, "message": "Request must contain a non-empty 'scores' list"}), 400
+    if len(entries) > MAX_BATCH_SCORES:
+        return jsonify({"success": False, "message": f"At most {MAX_BATCH_SCORES} scores per request"}), 413
+
+    user = current_user
+    validated = [_validate_score_entry(entry) for entry in entries]
+    # Entries already stored by an earlier attempt are reported, not inserted again
+    existing = Score.find_submissions(user.id, [values[2] for values, error in validated if not error])
+
+    results = []
+    new_scores = [] # (result index, Score)
+    seen_ids = {}   # submission_id -> Score created earlier in this batch
+    for index, (entry, ((score_value_int, level_int, submission_id), error)) in enumerate(zip(entries, validated)):
+        result = {
+            "index": index,
+            "client_timestamp": entry.get('client_timestamp') if isinstance(entry, dict) else None,
+        }
+        if error:
+            result.update(success=False, message=error)
+        elif submission_id in existing:
+            result.update(success=True, score=score_value_int, level=level_int,
+                          duplicate=True, id=existing[submission_id].id)
+        elif submission_id in seen_ids:
+            result.update(success=True, score=score_value_int, level=level_int, duplicate=True)
+            new_scores.append((index, seen_ids[submission_id]))
+        else:
+            result.update(success=True, score=score_value_int, level=level_int)
+            new_score = Score(user_id=user.id, score_value=score_value_int, level=level_int,
+                              submission_id=submission_id)
+            if submission_id:
+                seen_ids[submission_id] = new_score
+            new_scores.append((index, new_score))
+        results.append(result)
+
+    if not any(result['success'] for result in results):
+        return jsonify({"success": False, "message": "No valid scores in request", "results": results}), 400
+
+    try:
+        # add_all + one commit: the ORM emits a single executemany INSERT, and the
+        # best_scores / leaderboard-cache hooks still run once for the whole batch.
+        db.session.add_all([score for _, score in new_scores])
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent retry stored one of these submission_ids first; retrying resolves it
+        db.session.rollback()
+        return jsonify({"success": False, "message": "Duplicate submission in progress, please retry"}), 409
+    except Exception:
+        db.session.rollback()
+        logger.exception("Error saving score batch for user %s", user.id)
+        return jsonify({"success": False, "message": "Database error saving scores"}), 500
+
+    for index, score in new_scores:
+        results[index]['id'] = score.id
+    saved = sum(1 for result in results if result['success'])
+    logger.debug("Saved %d/%d scores for user %s in one batch.", saved, len(entries), user.id)
+    all_saved = saved == len(entries)
+    return jsonify({
+        "success": all_saved,
+        "message": f"{saved} of {len(entries)} scores submitted successfully.",
+        "results": results,
+    }), 201 if all_saved else 207 # 207 Multi-Status: some entries were rejected
+
+
+# ==============================
+# === JSON Leaderboard API ===
+# ==============================
+
+def _encode_cursor(cursor):
+    """Serializes a LeaderboardCursor into an opaque URL-safe token."""
+    raw = json.dumps([cursor.score, cursor.timestamp.isoformat(), cursor.user_id, cursor.rank])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def _decode_cursor(token):
+    """Parses a token from `_encode_cursor`. Raises ValueError if it is malformed."""
+    try:
+        score, timestamp, user_id, rank = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        return LeaderboardCursor(int(score), datetime.fromisoformat(timestamp), int(user_id), int(rank))
+    except (binascii.Error, UnicodeError, TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def _parse_page_args():
+    """Reads ?limit= and ?cursor=. Returns (limit, after) or raises ValueError."""
+    try:
+        limit = int(request.args.get('limit', TOP_N_PLAYERS))
+    except ValueError:
+        limit = None
+    if limit is None or not 1 <= limit <= MAX_LEADERBOARD_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_LEADERBOARD_PAGE_SIZE}")
+    cursor = request.args.get('cursor')
+    return limit, (_decode_cursor(cursor) if cursor else None)
+
+def _leaderboard_response(level_num, fetch_page):
+    """
+    Serves a leaderboard page with conditional-request support.
+
+    The ETag is derived from the latest score write (cached per worker, dropped on
+    every committed score), so a client polling with If-None-Match gets a body-less
+    304 without any leaderboard query. Last-Modified is sent for information only;
+    If-Modified-Since alone never produces a 304.
+
+    `?period=daily|weekly` serves the current day's or week's leaderboard instead of
+    the all-time one passed in as `fetch_page`.
+    """
+    try:
+        limit, after = _parse_page_args()
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    period = request.args.get('period', ALL_TIME)
+    if period != ALL_TIME:
+        if period not in LEADERBOARD_PERIODS:
+            return jsonify({"success": False,
+                            "message": f"period must be one of: {', '.join([ALL_TIME, *LEADERBOARD_PERIODS])}"}), 400
+        start = current_period_start(period)
+        fetch_page = lambda limit, after: get_period_leaderboard_page(period, level_num, limit, after, start=start)
+        period_key = f"{period}@{start.isoformat()}" # A new bucket starts empty, so change the ETag with it
+    else:
+        period_key = ALL_TIME
+
+    latest_id, latest_timestamp = get_cached_latest_score_write()
+    etag = hashlib.sha1(
+        f"{latest_id}:{level_num}:{period_key}:{limit}:{request.args.get('cursor', '')}".encode('utf-8')
+    ).hexdigest()
+
+    # Only the ETag decides a 304: HTTP dates have one-second resolution, so an
+    # If-Modified-Since equal to Last-Modified can't tell apart a later write in the same second
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        leaderboard, next_after = fetch_page(limit, after)
+        for entry in leaderboard:
+            entry['timestamp'] = entry['timestamp'].isoformat() if entry['timestamp'] else None
+        response = jsonify({
+            "success": True,
+            "level": level_num,
+            "period": period,
+            "leaderboard": leaderboard,
+            "next_cursor": _encode_cursor(next_after) if next_after else None,
+        })
+
+    response.set_etag(etag)
+    if latest_timestamp:
+        response.last_modified = latest_timestamp
+    # Let clients and proxies store the page but always revalidate it
+    response.cache_control.no_cache = True
+    return response
+
+@bp.route('/leaderboard', methods=['GET'])
+def api_get_overall_leaderboard():
+    """Overall leaderboard as JSON. Supports ?limit=, ?cursor=, ?period= and conditional GETs."""
+    return _leaderboard_response(None, lambda limit, after: get_overall_leaderboard_page(limit, after))
+
+@bp.route('/leaderboard/level/<int:level_num>', methods=['GET'])
+def api_get_level_leaderboard(level_num):
+    """Per-level leaderboard as JSON. Supports ?limit=, ?cursor=, ?period= and conditional GETs."""
+    return _leaderboard_response(level_num, lambda limit, after: get_leaderboard_page_by_level(level_num, limit, after))
+
+
+@bp.route('/rank', methods=['GET'])
+@login_required
+def api_get_rank():
+    """
+    The current user's rank, score, percentile and nearest rivals as JSON.
+
+    Query args: ?level= (omit for the overall leaderboard) and ?neighbours= (players
+    shown on each side, default RANK_NEIGHBOURS). 404 if the user has no score there.
+    """
+    try:
+        level_arg = request.args.get('level')
+        level_num = int(level_arg) if level_arg not in (None, '') else None
+        neighbours = int(request.args.get('neighbours', RANK_NEIGHBOURS))
+    except ValueError:
+        return jsonify({"success": False, "message": "level and neighbours must be integers"}), 400
+    if level_num is not None and level_num <= 0:
+        return jsonify({"success": False, "message": "Level must be a positive integer"}), 400
+    if not 0 <= neighbours <= MAX_RANK_NEIGHBOURS:
+        return jsonify({"success": False,
+                        "message": f"neighbours must be between 0 and {MAX_RANK_NEIGHBOURS}"}), 400
+
+    if level_num is None:
+        result = get_player_rank_overall(current_user.id, neighbours)
+    else:
+        result = get_player_rank_by_level(current_user.id, level_num, neighbours)
+    if result is None:
+        return jsonify({"success": False, "level": level_num, "message": "No score recorded yet."}), 404
+
+    result['timestamp'] = result['timestamp'].isoformat() if result['timestamp'] else None
+    for entry in result['above'] + result['below']:
+        entry['timestamp'] = entry['timestamp'].isoformat() if entry['timestamp'] else None
+    response = jsonify({"success": True, "level": level_num, "username": current_user.username, **result})
+    # Specific to the caller: never let a shared cache store it
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
@@ -11,11 +11,13 @@ from flask import Flask
 # --- Import datetime and UTC ---
 from datetime import datetime, UTC #<--- Import datetime object and UTC timezone
 from .config import Config, DevelopmentConfig, ProductionConfig # Import your config classes
-from .extensions import db, login_manager, bcrypt, migrate # Add migrate if you use it
+from .extensions import db, login_manager, bcrypt, migrate, leaderboard_cache, user_cache, score_ingest, login_guard, instrumentation, metrics
 # --- Import Blueprints ---
 from .views import bp as views_bp
 from .auth import bp as auth_bp # Assuming you have an auth blueprint
 from .api import bp as api_bp
+from .commands import register_commands
+from .database import configure_engine_options, install_sqlite_pragmas
 # --- Add other blueprint imports as needed ---
 
 def create_app(config_class=None, config_override=None):
@@ -43,12 +45,19 @@ def create_app(config_class=None, config_override=None):
 
     # --- Initialize Flask Extensions ---
     print("Initializing extensions...")
+    configure_engine_options(app) # Pool sizing from DB_POOL_* (must precede db.init_app)
     db.init_app(app)
+    install_sqlite_pragmas(app) # WAL, synchronous=NORMAL, busy_timeout, mmap on SQLite
     login_manager.init_app(app)
     bcrypt.init_app(app)
-    if 'migrate' in locals(): # Initialize migrate only if imported
-        migrate.init_app(app, db)
-        print("Flask-Migrate initialized.")
+    leaderboard_cache.init_app(app)
+    user_cache.init_app(app)
+    score_ingest.init_app(app)
+    login_guard.init_app(app)
+    instrumentation.init_app(app) # Request timing + SQL counts, JSON logs
+    metrics.init_app(app) # Prometheus /metrics (after db: times pool checkouts)
+    migrate.init_app(app, db) # Needed for `flask db upgrade` (e.g. the best_scores backfill)
+    print("Flask-Migrate initialized.")
     # Initialize other extensions here...
     print("Extensions initialized.")
 
@@ -73,6 +82,8 @@ def create_app(config_class=None, config_override=None):
         return {'now': datetime.now(UTC)}
     # --------------------------------------------
 
+    register_commands(app) # `flask prune-leaderboards`
+
     # Optional: Add other context processors, error handlers, shell context, etc.
     @app.shell_context_processor
     def make_shell_context():
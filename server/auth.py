@@ -7,7 +7,8 @@ operations and uses Flask-Login for session management.
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
 from .models import User
-from .extensions import db, bcrypt
+from .extensions import db, bcrypt, login_guard, user_cache
+from .login_guard import PasswordVerifierBusy
 
 bp = Blueprint('auth', __name__)
 
@@ -57,12 +58,24 @@ def login():
         password = request.form.get('password')
         remember = request.form.get('remember') == 'on'
 
+        if login_guard.retry_after(username, request.remote_addr):
+            flash('Too many failed login attempts. Please try again later.', 'danger')
+            return redirect(url_for('auth.login'))
+
         user = User.query.filter_by(username=username).first()
 
-        if user is None or not user.check_password(password):
+        try:
+            authenticated = user is not None and user.check_password(password)
+        except PasswordVerifierBusy:
+            flash('The server is busy. Please try again in a moment.', 'warning')
+            return redirect(url_for('auth.login'))
+
+        if not authenticated:
+            login_guard.record_failure(username, request.remote_addr)
             flash('Invalid username or password.', 'danger')
             return redirect(url_for('auth.login'))
 
+        login_guard.record_success(username, request.remote_addr)
         login_user(user, remember=remember)
         flash(f'Welcome back, {user.username}!', 'success')
 
@@ -77,6 +90,7 @@ def login():
 @login_required
 def logout():
     """Handles user logout."""
+    user_cache.invalidate([current_user.id]) # Next login reloads the user from the database
     logout_user()
     flash('You have been logged out.', 'info')
     return redirect(url_for('auth.login'))  # Redirect to login page after logout
@@ -0,0 +1,299 @@
+"""In-process caching for read-heavy leaderboard data and session users.
+
+Provides a small thread-safe TTL + LRU cache and two Flask extensions built on
+top of it. `LeaderboardCache`: cached leaderboards are invalidated per level
+whenever a transaction that inserted scores commits, so readers never see
+stale data from their own worker; the TTL bounds staleness across workers.
+`UserCache`: backs the Flask-Login user_loader so authenticated requests skip
+the per-request primary-key lookup.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+# session.info key holding the levels touched by not-yet-committed Score inserts
+_DIRTY_LEVELS_KEY = '_leaderboard_dirty_levels'
+# session.info key holding ids of users changed or deleted by not-yet-committed flushes
+_DIRTY_USERS_KEY = '_user_cache_dirty_ids'
+# User columns never kept in process memory; they load from the database on first access
+_UNCACHED_USER_COLUMNS = frozenset({'password_hash'})
+
+
+class TTLLRUCache:
+    """Thread-safe mapping with per-entry expiry and least-recently-used eviction."""
+
+    def __init__(self, max_entries=128, ttl_seconds=30.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._data = OrderedDict() # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        """Returns the cached value, or `default` if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > self._clock():
+                    self._data.move_to_end(key) # Mark as most recently used
+                    self.hits += 1
+                    return value
+                del self._data[key] # Expired
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """Stores a value, evicting the least recently used entries if full."""
+        with self._lock:
+            self._data[key] = (self._clock() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        """Returns a snapshot of the cache counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': (self.hits / lookups) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'size': len(self._data),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+            }
+
+
+class LeaderboardCache:
+    """
+    Flask extension caching leaderboard query results per application.
+
+    Config:
+        LEADERBOARD_CACHE_TTL (float): Seconds an entry stays valid. 0 disables caching.
+        LEADERBOARD_CACHE_MAX_ENTRIES (int): LRU capacity.
+    """
+
+    OVERALL_KEY = ('overall',)
+    LEVELS_KEY = ('levels',)
+    VERSION_KEY = ('latest_write',)
+    PLAYER_COUNT_KEY = ('player_count',)
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('LEADERBOARD_CACHE_TTL', 30.0)
+        app.config.setdefault('LEADERBOARD_CACHE_MAX_ENTRIES', 128)
+        app.extensions['leaderboard_cache'] = TTLLRUCache(
+            max_entries=app.config['LEADERBOARD_CACHE_MAX_ENTRIES'],
+            ttl_seconds=app.config['LEADERBOARD_CACHE_TTL'],
+        )
+
+    @staticmethod
+    def level_key(level_num):
+        return ('level', level_num)
+
+    @staticmethod
+    def level_count_key(level_num):
+        return ('level_count', level_num)
+
+    @staticmethod
+    def period_key(period, start, level_num):
+        """Key of a daily/weekly leaderboard bucket; `level_num` None is the bucket's overall ranking."""
+        return ('period', period, start, level_num)
+
+    @property
+    def store(self):
+        """The cache belonging to the current app, or None outside an app context."""
+        if not has_app_context():
+            return None
+        return current_app.extensions.get('leaderboard_cache')
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached value for `key`, calling `compute()` on a miss."""
+        store = self.store
+        if store is None or store.ttl_seconds <= 0:
+            return compute()
+        sentinel = object()
+        value = store.get(key, sentinel)
+        if value is sentinel:
+            value = compute()
+            store.set(key, value)
+        return value
+
+    def invalidate_levels(self, levels):
+        """Drops cached data affected by new scores on the given levels."""
+        store = self.store
+        if store is None:
+            return
+        for level_num in levels:
+            store.delete(self.level_key(level_num))
+            store.delete(self.level_count_key(level_num))
+        # Any new score can change the overall ranking, add a new level or player, or move the write marker
+        store.delete(self.OVERALL_KEY)
+        store.delete(self.LEVELS_KEY)
+        store.delete(self.VERSION_KEY)
+        store.delete(self.PLAYER_COUNT_KEY)
+        # Only the current day/week is cached, and new scores land in the current buckets
+        from .models import LEADERBOARD_PERIODS, period_start # Local import, see _collect_dirty_levels
+        now = datetime.utcnow()
+        for period in LEADERBOARD_PERIODS:
+            start = period_start(period, now)
+            store.delete(self.period_key(period, start, None))
+            for level_num in levels:
+                store.delete(self.period_key(period, start, level_num))
+
+    def clear(self):
+        store = self.store
+        if store is not None:
+            store.clear()
+
+    def stats(self):
+        store = self.store
+        return store.stats() if store is not None else {}
+
+
+class UserCache:
+    """
+    Flask extension caching the users loaded by Flask-Login, per application.
+
+    Only column values are cached, and never `password_hash`: a hit rebuilds the
+    `User` and attaches it to the request's session with `merge(load=False)`,
+    which issues no SQL, so the result behaves like a normally loaded user
+    (relationships and the password hash load lazily when accessed).
+
+    Entries are only invalidated in the worker that commits the change, so in
+    other workers a renamed or deleted user stays loadable for up to
+    USER_CACHE_TTL seconds. Keep the TTL short enough for that to be acceptable.
+
+    Config:
+        USER_CACHE_TTL (float): Seconds an entry stays valid. 0 disables caching.
+        USER_CACHE_MAX_ENTRIES (int): LRU capacity.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('USER_CACHE_TTL', 60.0)
+        app.config.setdefault('USER_CACHE_MAX_ENTRIES', 1024)
+        app.extensions['user_cache'] = TTLLRUCache(
+            max_entries=app.config['USER_CACHE_MAX_ENTRIES'],
+            ttl_seconds=app.config['USER_CACHE_TTL'],
+        )
+
+    @property
+    def store(self):
+        """The cache belonging to the current app, or None outside an app context."""
+        if not has_app_context():
+            return None
+        return current_app.extensions.get('user_cache')
+
+    def load(self, session, user_cls, user_id):
+        """Returns the user with `user_id` attached to `session`, or None if it does not exist."""
+        store = self.store
+        if store is None or store.ttl_seconds <= 0:
+            return session.get(user_cls, user_id)
+        values = store.get(user_id)
+        if values is None:
+            user = session.get(user_cls, user_id)
+            if user is not None:
+                store.set(user_id, {column.key: getattr(user, column.key)
+                                    for column in user_cls.__table__.columns
+                                    if column.key not in _UNCACHED_USER_COLUMNS})
+            return user
+        user = user_cls(**values)
+        make_transient_to_detached(user)
+        return session.merge(user, load=False)
+
+    def invalidate(self, user_ids):
+        store = self.store
+        if store is None:
+            return
+        for user_id in user_ids:
+            store.delete(user_id)
+
+    def clear(self):
+        store = self.store
+        if store is not None:
+            store.clear()
+
+    def stats(self):
+        store = self.store
+        return store.stats() if store is not None else {}
+
+
+# --- Write-driven invalidation ---
+# Levels are collected at flush time and only invalidated once the transaction
+# commits, so a rolled-back submission never evicts valid entries.
+
+@event.listens_for(Session, 'after_flush')
+def _collect_dirty_levels(session, flush_context):
+    from .models import Score # Local import: models imports extensions, which imports this module
+    levels = {obj.level for obj in session.new if isinstance(obj, Score)}
+    if levels:
+        session.info.setdefault(_DIRTY_LEVELS_KEY, set()).update(levels)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_levels(session):
+    levels = session.info.pop(_DIRTY_LEVELS_KEY, None)
+    if levels:
+        from .extensions import leaderboard_cache
+        leaderboard_cache.invalidate_levels(levels)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_dirty_levels(session):
+    session.info.pop(_DIRTY_LEVELS_KEY, None)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_dirty_users(session, flush_context):
+    from .models import User # Local import, see _collect_dirty_levels
+    user_ids = {obj.id for obj in list(session.dirty) + list(session.deleted)
+                if isinstance(obj, User) and obj.id is not None}
+    if user_ids:
+        session.info.setdefault(_DIRTY_USERS_KEY, set()).update(user_ids)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_users(session):
+    user_ids = session.info.pop(_DIRTY_USERS_KEY, None)
+    if user_ids:
+        from .extensions import user_cache
+        user_cache.invalidate(user_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_dirty_users(session):
+    session.info.pop(_DIRTY_USERS_KEY, None)
@@ -0,0 +1,20 @@
+"""Flask CLI commands for maintenance jobs.
+
+Registered on the app by both application factories; run them with the app
+selected via FLASK_APP, e.g. from cron:
+    FLASK_APP=server.app flask prune-leaderboards
+"""
+import click
+
+
+@click.command('prune-leaderboards')
+def prune_leaderboards_command():
+    """Deletes daily/weekly leaderboard buckets older than their retention."""
+    from .leaderboard_service import prune_period_best_scores
+    deleted = prune_period_best_scores()
+    for period, count in deleted.items():
+        click.echo(f"Pruned {count} {period} leaderboard rows.")
+
+
+def register_commands(app):
+    app.cli.add_command(prune_leaderboards_command)
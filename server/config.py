@@ -21,6 +21,50 @@ class Config:
     # Default to SQLite in the *server* directory (can be changed)
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(os.path.dirname(__file__), 'database.db') # Path relative to this file
+    # In-process leaderboard cache (per worker). TTL of 0 disables caching.
+    LEADERBOARD_CACHE_TTL = float(os.environ.get('LEADERBOARD_CACHE_TTL', 30))
+    LEADERBOARD_CACHE_MAX_ENTRIES = int(os.environ.get('LEADERBOARD_CACHE_MAX_ENTRIES', 128))
+    # SQLAlchemy pool (see database.py; explicit SQLALCHEMY_ENGINE_OPTIONS entries take precedence)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800)) # Seconds; below typical server idle timeouts
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+    # Pragmas applied to every SQLite connection
+    SQLITE_PRAGMAS_ENABLED = os.environ.get('SQLITE_PRAGMAS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    # Daily/weekly leaderboard buckets kept by `flask prune-leaderboards` (current one included)
+    LEADERBOARD_DAILY_RETENTION = int(os.environ.get('LEADERBOARD_DAILY_RETENTION', 14))
+    LEADERBOARD_WEEKLY_RETENTION = int(os.environ.get('LEADERBOARD_WEEKLY_RETENTION', 12))
+    # Structured request/SQL logging (see instrumentation.py)
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_JSON = os.environ.get('LOG_JSON', 'true').lower() in ('1', 'true', 'yes')
+    REQUEST_LOG_ENABLED = os.environ.get('REQUEST_LOG_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    REQUEST_LOG_SAMPLE_RATE = float(os.environ.get('REQUEST_LOG_SAMPLE_RATE', 1.0))
+    REQUEST_LOG_SLOW_MS = float(os.environ.get('REQUEST_LOG_SLOW_MS', 1000))
+    SQL_SLOW_QUERY_MS = float(os.environ.get('SQL_SLOW_QUERY_MS', 100))
+    # Prometheus /metrics endpoint; set METRICS_BEARER_TOKEN to require `Authorization: Bearer <token>`
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    METRICS_BEARER_TOKEN = os.environ.get('METRICS_BEARER_TOKEN')
+    # Flask-Login user_loader cache (per worker). TTL of 0 disables caching.
+    USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 60))
+    USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', 1024))
+    # Write-behind score ingestion: /api/submit_score queues and returns 202 (off by default)
+    SCORE_INGEST_ASYNC = os.environ.get('SCORE_INGEST_ASYNC', 'false').lower() in ('1', 'true', 'yes')
+    SCORE_INGEST_QUEUE_SIZE = int(os.environ.get('SCORE_INGEST_QUEUE_SIZE', 10000))
+    SCORE_INGEST_BATCH_SIZE = int(os.environ.get('SCORE_INGEST_BATCH_SIZE', 200))
+    SCORE_INGEST_FLUSH_INTERVAL = float(os.environ.get('SCORE_INGEST_FLUSH_INTERVAL', 0.5))
+    # Lifetime (seconds) of the signed bearer tokens issued by /api/login
+    API_TOKEN_MAX_AGE = int(os.environ.get('API_TOKEN_MAX_AGE', 3600))
+    # Login protection: cap concurrent bcrypt checks and throttle repeated failures
+    LOGIN_VERIFY_MAX_CONCURRENCY = int(os.environ.get('LOGIN_VERIFY_MAX_CONCURRENCY', 4))
+    LOGIN_VERIFY_QUEUE_TIMEOUT = float(os.environ.get('LOGIN_VERIFY_QUEUE_TIMEOUT', 2.0))
+    LOGIN_THROTTLE_WINDOW = float(os.environ.get('LOGIN_THROTTLE_WINDOW', 300))
+    LOGIN_THROTTLE_MAX_PER_USERNAME = int(os.environ.get('LOGIN_THROTTLE_MAX_PER_USERNAME', 5))
+    LOGIN_THROTTLE_MAX_PER_IP = int(os.environ.get('LOGIN_THROTTLE_MAX_PER_IP', 50))
 
 class DevelopmentConfig(Config):
     """Development configuration."""
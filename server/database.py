@@ -0,0 +1,91 @@
+"""Database engine tuning: pool options and SQLite connection pragmas.
+
+`configure_engine_options(app)` fills `SQLALCHEMY_ENGINE_OPTIONS` from the
+DB_POOL_* settings before `db.init_app`; options set explicitly in
+SQLALCHEMY_ENGINE_OPTIONS win. Pool sizing is skipped for in-memory SQLite,
+whose single shared connection takes no pool arguments.
+
+`install_sqlite_pragmas(app)` runs after `db.init_app` and registers a
+`connect` listener on each SQLite engine so that every new DBAPI connection
+gets WAL journaling, synchronous=NORMAL, a busy timeout and memory-mapped I/O.
+In WAL mode readers no longer wait for a committing writer (and vice versa),
+and NORMAL only fsyncs at checkpoints: a power loss can drop the last commits,
+but cannot corrupt the database.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Accepted values, so a typo in the environment can't be interpolated into SQL
+_JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+_SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def build_engine_options(config):
+    """Engine options for `config['SQLALCHEMY_DATABASE_URI']` from the DB_POOL_* settings."""
+    uri = config.get('SQLALCHEMY_DATABASE_URI')
+    if not uri:
+        return {}
+    options = {
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', True),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+    }
+    if not _is_memory_sqlite(make_url(uri)):
+        options.update(
+            pool_size=config.get('DB_POOL_SIZE', 10),
+            max_overflow=config.get('DB_MAX_OVERFLOW', 20),
+            pool_timeout=config.get('DB_POOL_TIMEOUT', 10),
+        )
+    return options
+
+
+def configure_engine_options(app):
+    """Merges the tuned defaults under any SQLALCHEMY_ENGINE_OPTIONS already configured."""
+    options = build_engine_options(app.config)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def sqlite_pragmas(config):
+    """
+    PRAGMA statements run on each new SQLite connection, in order.
+
+    Raises:
+        ValueError: If SQLITE_JOURNAL_MODE or SQLITE_SYNCHRONOUS is not a valid mode.
+    """
+    journal_mode = str(config.get('SQLITE_JOURNAL_MODE', 'WAL')).upper()
+    synchronous = str(config.get('SQLITE_SYNCHRONOUS', 'NORMAL')).upper()
+    if journal_mode not in _JOURNAL_MODES:
+        raise ValueError(f"SQLITE_JOURNAL_MODE must be one of {', '.join(_JOURNAL_MODES)}")
+    if synchronous not in _SYNCHRONOUS_MODES:
+        raise ValueError(f"SQLITE_SYNCHRONOUS must be one of {', '.join(_SYNCHRONOUS_MODES)}")
+    return [
+        f'PRAGMA journal_mode={journal_mode}',
+        f'PRAGMA synchronous={synchronous}',
+        f"PRAGMA busy_timeout={int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}",
+        f"PRAGMA mmap_size={int(config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}",
+    ]
+
+
+def install_sqlite_pragmas(app):
+    """Registers the pragma `connect` listener on the app's SQLite engines (if SQLITE_PRAGMAS_ENABLED)."""
+    if not app.config.get('SQLITE_PRAGMAS_ENABLED', True):
+        return
+    pragmas = sqlite_pragmas(app.config)
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    from .extensions import db
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', set_pragmas)
@@ -1,7 +1,9 @@
 """Initializes and configures Flask extensions.
 
-Instantiates common Flask extensions (SQLAlchemy, Migrate, LoginManager)
-to avoid circular dependencies within the application factory pattern.
+Instantiates common Flask extensions (SQLAlchemy, Migrate, LoginManager, and the
+in-process LeaderboardCache, UserCache, ScoreIngest queue, LoginGuard,
+RequestInstrumentation and Metrics) to avoid circular dependencies
+within the application factory pattern.
 Includes configuration specific to these extensions, like the user loader callback
 for Flask-Login.
 """
@@ -10,14 +12,27 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
 from flask_bcrypt import Bcrypt
+from .cache import LeaderboardCache, UserCache
+from .ingest import ScoreIngest
+from .login_guard import LoginGuard
+from .instrumentation import RequestInstrumentation
+from .metrics import Metrics
 
 db = SQLAlchemy()
 migrate = Migrate()
 login_manager = LoginManager()
 bcrypt = Bcrypt()
+leaderboard_cache = LeaderboardCache()
+user_cache = UserCache()
+score_ingest = ScoreIngest()
+login_guard = LoginGuard()
+instrumentation = RequestInstrumentation()
+metrics = Metrics()
 
 # Tells Flask-Login which view function handles logins (using the blueprint name)
 login_manager.login_view = 'auth.login'
 # Optional: Customize the message flashed when login is required
 login_manager.login_message = "Please log in to access this page."
-login_manager.login_message_category = "info" # Bootstrap category for styling
\ No newline at end of file
+login_manager.login_message_category = "info" # Bootstrap category for styling
+# API clients get a plain 401 instead of a redirect to the HTML login page
+login_manager.blueprint_login_views = {'api': None}
\ No newline at end of file
@@ -0,0 +1,231 @@
+"""Optional write-behind ingestion of submitted scores.
+
+When `SCORE_INGEST_ASYNC` is enabled, `/api/submit_score` only validates the
+score and appends it to a bounded in-memory queue; a background flusher thread
+commits queued scores in batches (by size or by time). A full queue is
+reported to the caller so it can back off, and pending scores are drained on
+shutdown. Queued scores live in process memory, so a hard crash loses whatever
+has not been flushed yet.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app, has_app_context
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+
+class ScoreIngestWorker:
+    """Bounded queue plus a daemon thread that commits scores in batches."""
+
+    def __init__(self, app, max_queue_size=10000, batch_size=200, flush_interval=0.5):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        # Counters, updated from request threads and the flusher: only via _count()
+        self._counter_lock = threading.Lock()
+        self.accepted = 0
+        self.rejected = 0
+        self.flushed = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.batches = 0
+
+    # --- Producer side (request threads) ---
+
+    def submit(self, user_id, score_value, level, submission_id=None):
+        """
+        Queues one score. Returns False without blocking if the queue is full.
+
+        The score is stamped with the acceptance time, so leaderboard tie-breaks
+        reflect when the player submitted, not when the batch was flushed.
+        """
+        try:
+            self._queue.put_nowait((user_id, score_value, level, submission_id, datetime.utcnow()))
+        except queue.Full:
+            self._count('rejected')
+            return False
+        self._count('accepted')
+        return True
+
+    def _count(self, name, amount=1):
+        """Adds `amount` to the counter `name` (`+=` is not atomic across threads)."""
+        with self._counter_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    @property
+    def depth(self):
+        return self._queue.qsize()
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Starts the flusher thread once per process (safe after a gunicorn fork)."""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._stop_event.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='score-ingest-flusher', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10.0):
+        """Stops the flusher and commits everything still queued."""
+        self._stop_event.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+        self._thread = None
+        # Anything enqueued after the thread exited (or if it never started)
+        while self._flush(self._take_batch(block=False)):
+            pass
+
+    # --- Consumer side (flusher thread) ---
+
+    def _take_batch(self, block=True):
+        """Collects up to `batch_size` items, waiting at most `flush_interval` for more."""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if block and remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._flush(self._take_batch())
+        # Drain on shutdown
+        while self._flush(self._take_batch(block=False)):
+            pass
+
+    def _flush(self, batch):
+        """Commits one batch in a single transaction. Returns the number of items handled."""
+        if not batch:
+            return 0
+        from .extensions import db # Local import: extensions imports this module
+        from .models import Score
+        with self.app.app_context():
+            try:
+                db.session.add_all([
+                    Score(user_id=user_id, score_value=score_value, level=level,
+                          submission_id=submission_id, timestamp=accepted_at)
+                    for user_id, score_value, level, submission_id, accepted_at in batch
+                ])
+                db.session.commit()
+                self._count('flushed', len(batch))
+                self._count('batches')
+            except IntegrityError:
+                # Typically a retried submission_id that is already stored; fall back
+                # to row-by-row so only the offending rows are skipped.
+                db.session.rollback()
+                self._flush_one_by_one(db, Score, batch)
+            except Exception:
+                db.session.rollback()
+                self._count('failed', len(batch))
+                logger.exception("Score ingest: failed to commit batch of %d scores", len(batch))
+            finally:
+                db.session.remove()
+        return len(batch)
+
+    def _flush_one_by_one(self, db, Score, batch):
+        for user_id, score_value, level, submission_id, accepted_at in batch:
+            try:
+                db.session.add(Score(user_id=user_id, score_value=score_value, level=level,
+                                     submission_id=submission_id, timestamp=accepted_at))
+                db.session.commit()
+                self._count('flushed')
+            except IntegrityError:
+                db.session.rollback()
+                if submission_id is not None and Score.find_submissions(user_id, [submission_id]):
+                    self._count('duplicates') # A retry of a score that is already stored
+                else:
+                    # Any other constraint (e.g. the user was deleted after the 202)
+                    self._count('failed')
+                    logger.exception("Score ingest: failed to commit score for user %s", user_id)
+            except Exception:
+                db.session.rollback()
+                self._count('failed')
+                logger.exception("Score ingest: failed to commit score for user %s", user_id)
+        self._count('batches')
+
+    def stats(self):
+        with self._counter_lock:
+            return {
+                'queue_depth': self.depth,
+                'queue_capacity': self._queue.maxsize,
+                'accepted': self.accepted,
+                'rejected': self.rejected,
+                'flushed': self.flushed,
+                'failed': self.failed,
+                'duplicates': self.duplicates,
+                'batches': self.batches,
+            }
+
+
+class ScoreIngest:
+    """
+    Flask extension wiring a `ScoreIngestWorker` to each app that enables it.
+
+    Config:
+        SCORE_INGEST_ASYNC (bool): Turn write-behind mode on. Default False.
+        SCORE_INGEST_QUEUE_SIZE (int): Queue capacity before submissions are refused.
+        SCORE_INGEST_BATCH_SIZE (int): Maximum scores committed per transaction.
+        SCORE_INGEST_FLUSH_INTERVAL (float): Seconds to wait for a batch to fill.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SCORE_INGEST_ASYNC', False)
+        app.config.setdefault('SCORE_INGEST_QUEUE_SIZE', 10000)
+        app.config.setdefault('SCORE_INGEST_BATCH_SIZE', 200)
+        app.config.setdefault('SCORE_INGEST_FLUSH_INTERVAL', 0.5)
+        if not app.config['SCORE_INGEST_ASYNC']:
+            return
+        worker = ScoreIngestWorker(
+            app,
+            max_queue_size=app.config['SCORE_INGEST_QUEUE_SIZE'],
+            batch_size=app.config['SCORE_INGEST_BATCH_SIZE'],
+            flush_interval=app.config['SCORE_INGEST_FLUSH_INTERVAL'],
+        )
+        app.extensions['score_ingest'] = worker
+        atexit.register(worker.stop) # Drain pending scores on interpreter shutdown
+
+    @property
+    def worker(self):
+        """The current app's worker, or None if write-behind mode is off."""
+        if not has_app_context():
+            return None
+        return current_app.extensions.get('score_ingest')
+
+    @property
+    def enabled(self):
+        return self.worker is not None
+
+    def submit(self, user_id, score_value, level, submission_id=None):
+        """Queues a score for the current app, starting the flusher on first use."""
+        worker = self.worker
+        worker.start()
+        return worker.submit(user_id, score_value, level, submission_id)
+
+    def stats(self):
+        worker = self.worker
+        return worker.stats() if worker is not None else {}
@@ -0,0 +1,188 @@
+"""Per-request timing, SQL instrumentation and structured (JSON) logging.
+
+`RequestInstrumentation` times every request and counts the SQL statements it
+runs (via SQLAlchemy cursor events), then emits one JSON log line per request
+on the `server.instrumentation` logger:
+
+    {"ts": "...", "level": "INFO", "logger": "server.instrumentation", "message": "request",
+     "method": "GET", "path": "/api/leaderboard", "endpoint": "api.api_get_overall_leaderboard",
+     "status": 200, "duration_ms": 4.1, "sql_count": 2, "sql_ms": 1.3}
+
+Request lines are sampled (`REQUEST_LOG_SAMPLE_RATE`), but errors (5xx) and
+requests slower than `REQUEST_LOG_SLOW_MS` are always logged. Any statement
+slower than `SQL_SLOW_QUERY_MS` is logged as a "slow_query" warning. Modules log
+through `logging.getLogger(__name__)`; everything under the `server` logger goes
+through the JSON formatter.
+"""
+import json
+import logging
+import random
+import time
+from datetime import datetime, UTC
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Root logger of the package; every module logger (server.api, server.ingest, ...) is a child
+ROOT_LOGGER_NAME = 'server'
+# Slow-query log lines keep at most this much of the SQL text
+MAX_LOGGED_STATEMENT_LENGTH = 500
+# conn.info key holding the start times of statements in flight on that connection
+_QUERY_START_KEY = '_instrumentation_query_start'
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line; `extra={'fields': {...}}` adds keys."""
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, UTC).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        payload.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+def configure_logging(level='INFO', json_format=True):
+    """Attaches one stderr handler to the `server` logger (idempotent across app instances)."""
+    root = logging.getLogger(ROOT_LOGGER_NAME)
+    root.setLevel(level)
+    handler = next((h for h in root.handlers if getattr(h, '_planewar_handler', False)), None)
+    if handler is None:
+        handler = logging.StreamHandler()
+        handler._planewar_handler = True
+        root.addHandler(handler)
+    handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(
+        '%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    return root
+
+
+class _RequestStats:
+    """Timings collected for the request in flight (stored on `flask.g`)."""
+
+    __slots__ = ('started', 'sql_count', 'sql_seconds')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_QUERY_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get(_QUERY_START_KEY)
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    if not has_app_context():
+        return
+    settings = current_app.extensions.get('request_instrumentation')
+    if settings is None:
+        return
+    endpoint = None
+    if has_request_context():
+        stats = g.get('_request_stats')
+        if stats is not None:
+            stats.sql_count += 1
+            stats.sql_seconds += elapsed
+        endpoint = request.endpoint
+    if elapsed * 1000 >= settings['slow_query_ms']:
+        logger.warning('slow_query', extra={'fields': {
+            'duration_ms': round(elapsed * 1000, 3),
+            'statement': ' '.join(statement.split())[:MAX_LOGGED_STATEMENT_LENGTH],
+            'executemany': executemany,
+            'endpoint': endpoint,
+        }})
+
+
+_engine_listeners_installed = False
+
+
+def _install_engine_listeners():
+    """Listens on every Engine once per process; per-app settings are looked up at event time."""
+    global _engine_listeners_installed
+    if not _engine_listeners_installed:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _engine_listeners_installed = True
+
+
+class RequestInstrumentation:
+    """
+    Flask extension logging per-request latency, status, endpoint and SQL count/time.
+
+    Config:
+        REQUEST_LOG_ENABLED (bool): Emit per-request log lines. Slow queries are logged regardless.
+        REQUEST_LOG_SAMPLE_RATE (float): Fraction (0..1) of ordinary requests logged.
+        REQUEST_LOG_SLOW_MS (float): Requests at least this slow are always logged, as warnings.
+        SQL_SLOW_QUERY_MS (float): Statements at least this slow are logged as "slow_query".
+        LOG_LEVEL (str): Level of the `server` logger.
+        LOG_JSON (bool): JSON lines (default) or plain text.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('REQUEST_LOG_ENABLED', True)
+        app.config.setdefault('REQUEST_LOG_SAMPLE_RATE', 1.0)
+        app.config.setdefault('REQUEST_LOG_SLOW_MS', 1000.0)
+        app.config.setdefault('SQL_SLOW_QUERY_MS', 100.0)
+        app.config.setdefault('LOG_LEVEL', 'INFO')
+        app.config.setdefault('LOG_JSON', True)
+        app.extensions['request_instrumentation'] = {
+            'enabled': app.config['REQUEST_LOG_ENABLED'],
+            'sample_rate': app.config['REQUEST_LOG_SAMPLE_RATE'],
+            'slow_request_ms': app.config['REQUEST_LOG_SLOW_MS'],
+            'slow_query_ms': app.config['SQL_SLOW_QUERY_MS'],
+        }
+        configure_logging(app.config['LOG_LEVEL'], app.config['LOG_JSON'])
+        _install_engine_listeners()
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    @staticmethod
+    def _start_request():
+        g._request_stats = _RequestStats()
+
+    @staticmethod
+    def _finish_request(response):
+        stats = g.pop('_request_stats', None)
+        if stats is None:
+            return response
+        settings = current_app.extensions['request_instrumentation']
+        duration_ms = (time.perf_counter() - stats.started) * 1000
+        sql_ms = stats.sql_seconds * 1000
+        # Lets browsers' devtools and clients see the split without parsing logs
+        response.headers['Server-Timing'] = f'app;dur={duration_ms:.1f}, db;dur={sql_ms:.1f}'
+
+        slow = duration_ms >= settings['slow_request_ms']
+        failed = response.status_code >= 500
+        if not settings['enabled']:
+            return response
+        if not (slow or failed or random.random() < settings['sample_rate']):
+            return response
+        user = g.get('_login_user') # Only if already loaded; never trigger a user lookup here
+        logger.log(logging.WARNING if (slow or failed) else logging.INFO, 'request', extra={'fields': {
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 3),
+            'sql_count': stats.sql_count,
+            'sql_ms': round(sql_ms, 3),
+            'user_id': getattr(user, 'id', None),
+            'slow': slow,
+        }})
+        return response
@@ -1,23 +1,122 @@
 """Business logic for calculating and retrieving leaderboard data.
 
 Encapsulates database queries and logic for generating ranked leaderboards.
-Provides functions to get top scores overall, top scores per level, and
-the distinct levels available, handling tie-breaking logic where necessary.
+Reads from the materialized `best_scores` table (see `models.BestScore`), which
+holds each user's personal best per level. Provides functions to get top scores
+overall, top scores per level, and the distinct levels available, handling
+tie-breaking logic where necessary.
 """
-from .models import Score, User
-from .extensions import db
-from sqlalchemy import desc, asc, func, distinct
-# It might be useful to import current_app if using logger instead of print
-# from flask import current_app
+import logging
+import sqlite3
+from collections import namedtuple
+from datetime import datetime
+from flask import current_app
+from .models import BestScore, PeriodBestScore, Score, User, UserTotal, LEADERBOARD_PERIODS, period_start
+from .extensions import db, leaderboard_cache
+from sqlalchemy import func
+
+logger = logging.getLogger(__name__)
 
 # Define constants or configuration
 TOP_N_PLAYERS = 30
+# `period` value selecting the all-time leaderboards (the others are LEADERBOARD_PERIODS keys)
+ALL_TIME = 'all'
+# Buckets kept per period by `prune_period_best_scores`, including the current one
+DEFAULT_PERIOD_RETENTION = {'daily': 14, 'weekly': 12}
+# Players shown on each side of the requesting player by the rank lookup
+RANK_NEIGHBOURS = 2
+
+# Position of the last row of a page; pass it back as `after` to fetch the next page.
+# `user_id` is the final tie-breaker so the ordering (and thus the keyset) is total.
+LeaderboardCursor = namedtuple('LeaderboardCursor', ['score', 'timestamp', 'user_id', 'rank'])
+
+
+def _format_page(results, limit, start_rank):
+    """
+    Turns (user_id, username, score, timestamp) rows into ranked dictionaries.
+
+    `results` may hold one row more than `limit`; that extra row only signals
+    that another page exists and is not returned.
+
+    Returns:
+        tuple: (list: leaderboard, LeaderboardCursor|None: cursor for the next page)
+    """
+    has_more = len(results) > limit
+    leaderboard = []
+    next_after = None
+    # Rank is a simple 1-based position: rows are pre-sorted so ties on score are
+    # already broken by timestamp (R2 requires *different* ranks in that case).
+    for i, (user_id, username, score, timestamp) in enumerate(results[:limit]):
+        rank = start_rank + i + 1
+        leaderboard.append({
+            'rank': rank,
+            'username': username,
+            'score': score,
+            'timestamp': timestamp # Include for potential display or debugging
+        })
+        next_after = LeaderboardCursor(score, timestamp, user_id, rank)
+    return leaderboard, (next_after if has_more else None)
+
+
+def _after_filter(score_col, timestamp_col, user_id_col, after):
+    """Keyset predicate selecting rows ranked strictly below `after`."""
+    return db.or_(
+        score_col < after.score,
+        db.and_(score_col == after.score, timestamp_col > after.timestamp),
+        db.and_(score_col == after.score, timestamp_col == after.timestamp, user_id_col > after.user_id),
+    )
+
+
+def _before_filter(score_col, timestamp_col, user_id_col, position):
+    """Keyset predicate selecting rows ranked strictly above `position`."""
+    return db.or_(
+        score_col > position.score,
+        db.and_(score_col == position.score, timestamp_col < position.timestamp),
+        db.and_(score_col == position.score, timestamp_col == position.timestamp, user_id_col < position.user_id),
+    )
+
+
+def get_leaderboard_page_by_level(level_num, limit=TOP_N_PLAYERS, after=None):
+    """
+    Gets one page of a level's leaderboard using keyset pagination.
+
+    Args:
+        level_num (int): The level number to get the leaderboard for.
+        limit (int): Maximum number of rows to return.
+        after (LeaderboardCursor, optional): Cursor returned with the previous page.
+
+    Returns:
+        tuple: (list: leaderboard rows, LeaderboardCursor|None: cursor for the next page)
+    """
+    query = db.session.query(
+        BestScore.user_id,
+        User.username,
+        BestScore.best_score,
+        BestScore.achieved_at
+    ).select_from(BestScore)\
+     .join(User, User.id == BestScore.user_id)\
+     .filter(BestScore.level == level_num)
+
+    if after is not None:
+        query = query.filter(_after_filter(BestScore.best_score, BestScore.achieved_at, BestScore.user_id, after))
+
+    results = query.order_by(
+        BestScore.best_score.desc(),   # Highest score first
+        BestScore.achieved_at.asc(),   # Earliest timestamp first for ties
+        BestScore.user_id.asc()        # Stable order for keyset pagination
+    ).limit(limit + 1).all()
+
+    return _format_page(results, limit, after.rank if after else 0)
+
 
 def get_leaderboard_by_level(level_num):
     """
     Gets the top players for a specific level based on their highest score for that level.
     Tie-breaking is done by the earliest timestamp achieving that highest score.
 
+    Reads the materialized `best_scores` table, so this is a single indexed range scan
+    on (level, best_score DESC, achieved_at) no matter how many raw scores exist.
+
     Args:
         level_num (int): The level number to get the leaderboard for.
 
@@ -25,155 +124,500 @@ def get_leaderboard_by_level(level_num):
         list: A list of dictionaries, each containing 'rank', 'username', 'score', 'timestamp'.
               Returns empty list if level doesn't exist or has no scores.
     """
-    # Subquery to find the highest score for each user ON THIS LEVEL
-    subq_max_score = db.session.query(
-        Score.user_id,
-        func.max(Score.score_value).label('max_score')
-    ).filter(Score.level == level_num)\
-     .group_by(Score.user_id)\
+    leaderboard, _ = get_leaderboard_page_by_level(level_num, limit=TOP_N_PLAYERS)
+    logger.debug("Leaderboard for level %s: %d rows", level_num, len(leaderboard))
+    return leaderboard
+
+
+def get_overall_leaderboard_page(limit=TOP_N_PLAYERS, after=None):
+    """
+    Gets one page of the overall leaderboard using keyset pagination.
+
+    Args:
+        limit (int): Maximum number of rows to return.
+        after (LeaderboardCursor, optional): Cursor returned with the previous page.
+
+    Returns:
+        tuple: (list: leaderboard rows, LeaderboardCursor|None: cursor for the next page)
+    """
+    subq_overall = db.session.query(
+        BestScore.user_id,
+        func.sum(BestScore.best_score).label('total_score'),
+        func.min(BestScore.achieved_at).label('earliest_best_score_timestamp')
+    ).group_by(BestScore.user_id)\
      .subquery()
 
-    # Find the earliest timestamp associated with that max score for each user ON THIS LEVEL
-    subq_earliest_timestamp = db.session.query(
-        Score.user_id,
-        func.min(Score.timestamp).label('earliest_timestamp')
-    ).join(subq_max_score, db.and_(
-        Score.user_id == subq_max_score.c.user_id,
-        Score.score_value == subq_max_score.c.max_score
-    ))\
-    .filter(Score.level == level_num)\
-    .group_by(Score.user_id)\
-    .subquery()
-
-    # Main query to get user details and rank them
-    results = db.session.query(
+    query = db.session.query(
+        User.id,
         User.username,
-        subq_max_score.c.max_score,
-        subq_earliest_timestamp.c.earliest_timestamp
+        subq_overall.c.total_score,
+        subq_overall.c.earliest_best_score_timestamp
     ).select_from(User)\
-     .join(subq_max_score, User.id == subq_max_score.c.user_id)\
-     .join(subq_earliest_timestamp, User.id == subq_earliest_timestamp.c.user_id)\
-     .order_by(
-         subq_max_score.c.max_score.desc(),             # Highest score first
-         subq_earliest_timestamp.c.earliest_timestamp.asc() # Earliest timestamp first for ties
-     )\
-     .limit(TOP_N_PLAYERS)\
-     .all()
-
-    # Format results with rank
-    leaderboard = []
-    current_rank = 0
-    # Commenting out unused variables for clarity during debugging
-    # last_score = -1
-    # last_timestamp = None
-    # rank_increment = 1
-
-    for i, (username, score, timestamp) in enumerate(results):
-        # Determine rank - handles ties correctly (same score/timestamp = same rank)
-        # Uses the more standard approach: same score = same rank, next rank skips.
-        # R2 requires *different* rank for same score if timestamp differs, so we order by timestamp asc.
-        # Simple 1-based index as rank (since results are pre-sorted correctly for ties)
-        current_rank = i + 1
+     .join(subq_overall, User.id == subq_overall.c.user_id)
 
-        leaderboard.append({
-            'rank': current_rank,
-            'username': username,
-            'score': score,
-            'timestamp': timestamp # Include for potential display or debugging
-        })
+    if after is not None:
+        query = query.filter(_after_filter(
+            subq_overall.c.total_score, subq_overall.c.earliest_best_score_timestamp, User.id, after
+        ))
 
-    # --- BEGIN ADDED DEBUG LINE ---
-    print(f"DEBUG: Leaderboard data for level {level_num}: {leaderboard}")
-    # Alternatively, using Flask's logger if you prefer (requires importing current_app):
-    # from flask import current_app
-    # current_app.logger.debug(f"Leaderboard data for level {level_num}: {leaderboard}")
-    # --- END ADDED DEBUG LINE ---
+    results = query.order_by(
+        subq_overall.c.total_score.desc(),             # Highest total score first
+        subq_overall.c.earliest_best_score_timestamp.asc(), # Earliest timestamp contributing to total score ranks higher in ties
+        User.id.asc()                                  # Stable order for keyset pagination
+    ).limit(limit + 1).all()
 
-    return leaderboard
+    return _format_page(results, limit, after.rank if after else 0)
 
 
 def get_overall_leaderboard():
     """
     Gets the top players based on the sum of their highest scores across all levels.
-    Tie-breaking uses the timestamp of the user's last submitted score that was
-    a personal best for any level (contributing to the sum).
+    Tie-breaking uses the earliest timestamp among the personal bests that make up
+    the total (an earlier contributing best ranks higher).
+
+    Aggregates the materialized `best_scores` table (one row per user and level)
+    instead of the raw `scores` table.
+
+    Returns:
+        list: A list of dictionaries, each containing 'rank', 'username', 'score', 'timestamp'.
+    """
+    leaderboard, _ = get_overall_leaderboard_page(limit=TOP_N_PLAYERS)
+    return leaderboard
+
+def get_distinct_levels():
+    """Gets a sorted list of distinct level numbers that have scores."""
+    # best_scores has a row for every (user, level) that has a score, and its
+    # level-leading index answers DISTINCT without touching the raw scores.
+    levels = db.session.query(BestScore.level)\
+                       .distinct()\
+                       .order_by(BestScore.level.asc())\
+                       .all()
+    distinct_levels = [level[0] for level in levels] # Extract level numbers from tuples
+    return distinct_levels
+
+
+def get_latest_score_write():
+    """
+    Identifies the most recent score write, for HTTP cache validators.
+
+    Uses the highest `scores.id` (a primary-key lookup) and that row's timestamp.
+
+    Returns:
+        tuple: (int: latest score id or 0, datetime|None: its timestamp)
+    """
+    latest = db.session.query(Score.id, Score.timestamp)\
+                       .order_by(Score.id.desc())\
+                       .first()
+    return (latest.id, latest.timestamp) if latest else (0, None)
+
+
+# --- Daily / weekly leaderboards ---
+# Served from `period_best_scores`, which keeps a personal best per (period bucket,
+# level, user) and is updated on every submit, so a "today" or "this week" board is
+# the same index range scan as the all-time one instead of a date-filtered rescan.
+
+def current_period_start(period, now=None):
+    """First day of the current `period` bucket (UTC)."""
+    return period_start(period, now or datetime.utcnow())
+
+
+def get_period_leaderboard_page(period, level_num=None, limit=TOP_N_PLAYERS, after=None, start=None):
+    """
+    Gets one page of a daily or weekly leaderboard using keyset pagination.
+
+    Args:
+        period (str): 'daily' or 'weekly' (a LEADERBOARD_PERIODS key).
+        level_num (int, optional): Level to rank; None ranks the sum of the bucket's
+            per-level bests, like the overall leaderboard.
+        limit (int): Maximum number of rows to return.
+        after (LeaderboardCursor, optional): Cursor returned with the previous page.
+        start (date, optional): Bucket to read; defaults to the current one.
+
+    Returns:
+        tuple: (list: leaderboard rows, LeaderboardCursor|None: cursor for the next page)
+    """
+    if start is None:
+        start = current_period_start(period)
+    in_bucket = db.and_(PeriodBestScore.period == period, PeriodBestScore.period_start == start)
+
+    if level_num is not None:
+        score_col = PeriodBestScore.best_score
+        timestamp_col = PeriodBestScore.achieved_at
+        user_id_col = PeriodBestScore.user_id
+        query = db.session.query(user_id_col, User.username, score_col, timestamp_col)\
+                          .select_from(PeriodBestScore)\
+                          .join(User, User.id == PeriodBestScore.user_id)\
+                          .filter(in_bucket, PeriodBestScore.level == level_num)
+    else:
+        subq_totals = db.session.query(
+            PeriodBestScore.user_id,
+            func.sum(PeriodBestScore.best_score).label('total_score'),
+            func.min(PeriodBestScore.achieved_at).label('earliest_best_score_timestamp')
+        ).filter(in_bucket)\
+         .group_by(PeriodBestScore.user_id)\
+         .subquery()
+        score_col = subq_totals.c.total_score
+        timestamp_col = subq_totals.c.earliest_best_score_timestamp
+        user_id_col = User.id
+        query = db.session.query(User.id, User.username, score_col, timestamp_col)\
+                          .select_from(User)\
+                          .join(subq_totals, User.id == subq_totals.c.user_id)
+
+    if after is not None:
+        query = query.filter(_after_filter(score_col, timestamp_col, user_id_col, after))
+
+    results = query.order_by(
+        score_col.desc(),
+        timestamp_col.asc(),
+        user_id_col.asc()
+    ).limit(limit + 1).all()
+
+    return _format_page(results, limit, after.rank if after else 0)
+
+
+def get_period_leaderboard(period, level_num=None, start=None):
+    """Top players of the current (or given) daily/weekly bucket; see `get_period_leaderboard_page`."""
+    leaderboard, _ = get_period_leaderboard_page(period, level_num, limit=TOP_N_PLAYERS, start=start)
+    return leaderboard
+
+
+def prune_period_best_scores(now=None):
+    """
+    Retention job: deletes daily/weekly buckets that have aged out.
+
+    Keeps the newest LEADERBOARD_<PERIOD>_RETENTION buckets of each period (the
+    current one included; see DEFAULT_PERIOD_RETENTION) and commits.
 
     Returns:
-        list: A list of dictionaries, each containing 'rank', 'username', 'total_score', 'timestamp'.
+        dict: Period name -> number of rows deleted.
     """
-    # Subquery: Find the highest score for each user on each distinct level they played
-    subq_max_per_level = db.session.query(
+    now = now or datetime.utcnow()
+    deleted = {}
+    for period, length in LEADERBOARD_PERIODS.items():
+        keep = current_app.config.get(f'LEADERBOARD_{period.upper()}_RETENTION', DEFAULT_PERIOD_RETENTION[period])
+        oldest_kept = period_start(period, now) - length * (max(keep, 1) - 1)
+        result = db.session.execute(
+            db.delete(PeriodBestScore).where(
+                PeriodBestScore.period == period,
+                PeriodBestScore.period_start < oldest_kept
+            )
+        )
+        deleted[period] = result.rowcount
+    db.session.commit()
+    return deleted
+
+
+# --- Single-player rank lookup ---
+# A player's rank is 1 + the number of rows ordered before theirs, so it is answered
+# with COUNT queries over rank-ordered indexes (best_scores per level, user_totals
+# overall) instead of ranking everybody. Neighbours come from two keyset range scans starting at the player.
+
+def _rank_result(rows, columns, position, ahead, total, neighbours):
+    """
+    Builds the rank lookup response for the row at `position`.
+
+    Args:
+        rows: Query of (user_id, username, score, timestamp) rows for the leaderboard.
+        columns (tuple): The (score, timestamp, user_id) columns `rows` is ordered by.
+        position (LeaderboardCursor): The player's own row.
+        ahead (int): Number of rows ranked above the player.
+        total (int): Number of rows on the leaderboard.
+        neighbours (int): Rows to return on each side.
+    """
+    score_col, timestamp_col, user_id_col = columns
+    rank = ahead + 1
+    above, below = [], []
+    if neighbours > 0:
+        # Walk upwards from the player (reverse order), then flip back into rank order
+        above_rows = rows.filter(_before_filter(score_col, timestamp_col, user_id_col, position))\
+                         .order_by(score_col.asc(), timestamp_col.desc(), user_id_col.desc())\
+                         .limit(neighbours).all()[::-1]
+        above, _ = _format_page(above_rows, neighbours, rank - 1 - len(above_rows))
+        below_rows = rows.filter(_after_filter(score_col, timestamp_col, user_id_col, position))\
+                         .order_by(score_col.desc(), timestamp_col.asc(), user_id_col.asc())\
+                         .limit(neighbours).all()
+        below, _ = _format_page(below_rows, neighbours, rank)
+    return {
+        'rank': rank,
+        'score': position.score,
+        'timestamp': position.timestamp,
+        'total_players': total,
+        # Share of ranked players this player is level with or ahead of (100.0 for first place)
+        'percentile': round(100.0 * (total - ahead) / total, 2),
+        'above': above,
+        'below': below,
+    }
+
+
+def _count_ahead(counted, columns, position):
+    """Number of rows of the COUNT query `counted` ranked above `position` (see `get_player_rank_by_level`)."""
+    score_col, timestamp_col, user_id_col = columns
+    higher = counted.filter(score_col > position.score).scalar()
+    tied_ahead = counted.filter(
+        score_col == position.score,
+        db.or_(
+            timestamp_col < position.timestamp,
+            db.and_(timestamp_col == position.timestamp, user_id_col < position.user_id),
+        )
+    ).scalar()
+    return higher + tied_ahead
+
+
+def _count_level_players(level_num):
+    return db.session.query(func.count()).select_from(BestScore)\
+                     .filter(BestScore.level == level_num)\
+                     .scalar()
+
+
+def get_player_rank_by_level(user_id, level_num, neighbours=RANK_NEIGHBOURS):
+    """
+    Looks up one player's position on a level's leaderboard.
+
+    The number of players ahead is counted in two index-only range scans of
+    ix_best_scores_level_rank: rows with a higher best score, plus rows tied on
+    score that reached it earlier (or have a lower user_id). Both start at the
+    player's score via an index seek, so the cost grows with the player's rank,
+    not with the number of players on the level; the level's player count is
+    served from the leaderboard cache.
+
+    Args:
+        user_id (int): The player to look up.
+        level_num (int): The level number.
+        neighbours (int): Players to include directly above and below.
+
+    Returns:
+        dict|None: 'rank', 'score', 'timestamp', 'total_players', 'percentile', and
+                   'above'/'below' lists of leaderboard rows; None if the player has
+                   no score on the level.
+    """
+    mine = db.session.query(BestScore.best_score, BestScore.achieved_at)\
+                     .filter(BestScore.user_id == user_id, BestScore.level == level_num)\
+                     .first()
+    if mine is None:
+        return None
+    position = LeaderboardCursor(mine.best_score, mine.achieved_at, user_id, None)
+
+    columns = (BestScore.best_score, BestScore.achieved_at, BestScore.user_id)
+    in_level = db.session.query(func.count()).select_from(BestScore)\
+                         .filter(BestScore.level == level_num)
+    ahead = _count_ahead(in_level, columns, position)
+    total = leaderboard_cache.get_or_compute(
+        leaderboard_cache.level_count_key(level_num),
+        lambda: _count_level_players(level_num)
+    )
+    # The cached count may predate this player's first score on the level
+    total = max(total, ahead + 1)
+
+    rows = db.session.query(BestScore.user_id, User.username, BestScore.best_score, BestScore.achieved_at)\
+                     .select_from(BestScore)\
+                     .join(User, User.id == BestScore.user_id)\
+                     .filter(BestScore.level == level_num)
+    return _rank_result(rows, columns, position, ahead, total, neighbours)
+
+
+def _count_players():
+    return db.session.query(func.count()).select_from(UserTotal).scalar()
+
+
+def get_player_rank_overall(user_id, neighbours=RANK_NEIGHBOURS):
+    """
+    Looks up one player's position on the overall leaderboard.
+
+    Reads the materialized `user_totals` table (see `models.UserTotal`), so the
+    players ahead are counted with the same two range scans as the per-level
+    lookup, on ix_user_totals_rank, instead of aggregating every best_scores row.
+    Same return value as `get_player_rank_by_level`.
+    """
+    mine = db.session.query(UserTotal.total_score, UserTotal.achieved_at)\
+                     .filter(UserTotal.user_id == user_id)\
+                     .first()
+    if mine is None:
+        return None
+    position = LeaderboardCursor(mine.total_score, mine.achieved_at, user_id, None)
+
+    columns = (UserTotal.total_score, UserTotal.achieved_at, UserTotal.user_id)
+    ahead = _count_ahead(db.session.query(func.count()).select_from(UserTotal), columns, position)
+    total = leaderboard_cache.get_or_compute(leaderboard_cache.PLAYER_COUNT_KEY, _count_players)
+    total = max(total, ahead + 1)
+
+    rows = db.session.query(UserTotal.user_id, User.username, UserTotal.total_score, UserTotal.achieved_at)\
+                     .select_from(UserTotal)\
+                     .join(User, User.id == UserTotal.user_id)
+    return _rank_result(rows, columns, position, ahead, total, neighbours)
+
+
+# --- Leaderboards computed from raw scores ---
+# The served leaderboards above read the materialized `best_scores` table. These
+# compute the same rankings straight from `scores`, to rebuild or audit that table.
+# Window functions (SQLite >= 3.25, PostgreSQL) pick each user's best row and the
+# rank in a single pass; the original GROUP BY + self-join plan is kept as a
+# fallback for engines without them.
+
+def window_functions_supported():
+    """True if the current database can run ROW_NUMBER() OVER (...)."""
+    dialect = db.engine.dialect
+    if dialect.name == 'sqlite':
+        return sqlite3.sqlite_version_info >= (3, 25, 0)
+    return dialect.name in ('postgresql', 'mysql', 'mariadb', 'oracle', 'mssql')
+
+
+def _best_score_rows(level_num=None, use_window=True):
+    """
+    Subquery of (user_id, level, best_score, achieved_at): each user's highest score
+    per level and the earliest time it was reached, computed from raw scores.
+    """
+    if use_window:
+        # One scan of the (level, user_id, score_value DESC, timestamp) index
+        ranked = db.session.query(
+            Score.user_id,
+            Score.level,
+            Score.score_value.label('best_score'),
+            Score.timestamp.label('achieved_at'),
+            func.row_number().over(
+                partition_by=(Score.user_id, Score.level),
+                order_by=(Score.score_value.desc(), Score.timestamp.asc())
+            ).label('position')
+        )
+        if level_num is not None:
+            ranked = ranked.filter(Score.level == level_num)
+        ranked = ranked.subquery()
+        return db.session.query(
+            ranked.c.user_id, ranked.c.level, ranked.c.best_score, ranked.c.achieved_at
+        ).filter(ranked.c.position == 1).subquery()
+
+    # Fallback: max per (user, level), then join back to find when it was first reached
+    subq_max_score = db.session.query(
         Score.user_id,
         Score.level,
-        func.max(Score.score_value).label('max_score_for_level')
-    ).group_by(Score.user_id, Score.level)\
-     .subquery()
+        func.max(Score.score_value).label('best_score')
+    )
+    if level_num is not None:
+        subq_max_score = subq_max_score.filter(Score.level == level_num)
+    subq_max_score = subq_max_score.group_by(Score.user_id, Score.level).subquery()
 
-    # Subquery to find the timestamp associated with each of those max scores
-    subq_max_score_timestamps = db.session.query(
+    return db.session.query(
         Score.user_id,
         Score.level,
-        func.min(Score.timestamp).label('earliest_timestamp_for_max') # Use the *earliest* time they achieved their max on that level
-    ).join(subq_max_per_level, db.and_(
-        Score.user_id == subq_max_per_level.c.user_id,
-        Score.level == subq_max_per_level.c.level,
-        Score.score_value == subq_max_per_level.c.max_score_for_level
-    )).group_by(Score.user_id, Score.level)\
+        subq_max_score.c.best_score,
+        func.min(Score.timestamp).label('achieved_at')
+    ).join(subq_max_score, db.and_(
+        Score.user_id == subq_max_score.c.user_id,
+        Score.level == subq_max_score.c.level,
+        Score.score_value == subq_max_score.c.best_score
+    )).group_by(Score.user_id, Score.level, subq_max_score.c.best_score)\
       .subquery()
 
-    # Subquery: Sum the highest scores per user and find the *earliest* timestamp among their best scores.
-    # R2: "earliest achieved the score" - for the total score, this is ambiguous. Let's use the earliest
-    # timestamp among all the scores that constitute their personal bests per level.
-    subq_overall = db.session.query(
-        subq_max_per_level.c.user_id,
-        func.sum(subq_max_per_level.c.max_score_for_level).label('total_score'),
-        func.min(subq_max_score_timestamps.c.earliest_timestamp_for_max).label('earliest_best_score_timestamp') # Overall earliest time contributing to total
-    ).select_from(subq_max_per_level)\
-     .join(subq_max_score_timestamps, db.and_(
-         subq_max_per_level.c.user_id == subq_max_score_timestamps.c.user_id,
-         subq_max_per_level.c.level == subq_max_score_timestamps.c.level
-     ))\
-     .group_by(subq_max_per_level.c.user_id)\
-     .subquery()
-
-    # Final query to get user details and rank them
-    results = db.session.query(
-        User.username,
-        subq_overall.c.total_score,
-        subq_overall.c.earliest_best_score_timestamp
-    ).select_from(User)\
-     .join(subq_overall, User.id == subq_overall.c.user_id)\
-     .order_by(
-         subq_overall.c.total_score.desc(),             # Highest total score first
-         subq_overall.c.earliest_best_score_timestamp.asc() # Earliest timestamp contributing to total score ranks higher in ties
-     )\
-     .limit(TOP_N_PLAYERS)\
-     .all()
-
-    # Format results with rank (similar logic as per-level)
-    leaderboard = []
-    current_rank = 0
-    # Rank formatting simplified to 1-based index due to pre-sorting handling ties
-    for i, (username, total_score, timestamp) in enumerate(results):
-        current_rank = i + 1
-        leaderboard.append({
-            'rank': current_rank,
-            'username': username,
-            'score': total_score, # Use 'score' key for consistency in template? Or 'total_score'? Let's use 'score'.
-            'timestamp': timestamp
-        })
 
-    # Optional: Add debug print here too if needed for overall leaderboard
-    # print(f"DEBUG: Overall leaderboard data: {leaderboard}")
+def _ranked_rows(rows, score_col, timestamp_col, user_id_col, limit, use_window):
+    """Orders (user_id, username, score, timestamp) rows and returns them as ranked dictionaries."""
+    ordering = (score_col.desc(), timestamp_col.asc(), user_id_col.asc())
+    if use_window:
+        # Rank is computed in the same statement; ROW_NUMBER gives tied rows distinct ranks like _format_page
+        rows = rows.add_columns(func.row_number().over(order_by=ordering).label('rank'))
+        results = rows.order_by(*ordering).limit(limit).all()
+        return [
+            {'rank': rank, 'username': username, 'score': score, 'timestamp': timestamp}
+            for _, username, score, timestamp, rank in results
+        ]
+    leaderboard, _ = _format_page(rows.order_by(*ordering).limit(limit).all(), limit, 0)
     return leaderboard
 
-def get_distinct_levels():
-    """Gets a sorted list of distinct level numbers that have scores."""
-    levels = db.session.query(Score.level)\
-                       .distinct()\
-                       .order_by(Score.level.asc())\
-                       .all()
-    distinct_levels = [level[0] for level in levels] # Extract level numbers from tuples
-    # Optional: Add debug print here to see what levels are found
-    # print(f"DEBUG: Distinct levels found in DB: {distinct_levels}")
-    return distinct_levels
\ No newline at end of file
+
+def get_leaderboard_by_level_from_scores(level_num, limit=TOP_N_PLAYERS, use_window=None):
+    """
+    Same result as `get_leaderboard_by_level`, computed from raw scores.
+
+    Args:
+        level_num (int): The level number to get the leaderboard for.
+        limit (int): Maximum number of rows to return.
+        use_window (bool, optional): Force the window-function (True) or fallback (False)
+            plan. Defaults to window functions when the database supports them.
+    """
+    if use_window is None:
+        use_window = window_functions_supported()
+    best = _best_score_rows(level_num, use_window)
+    rows = db.session.query(best.c.user_id, User.username, best.c.best_score, best.c.achieved_at)\
+                     .select_from(best)\
+                     .join(User, User.id == best.c.user_id)
+    return _ranked_rows(rows, best.c.best_score, best.c.achieved_at, best.c.user_id, limit, use_window)
+
+
+def get_overall_leaderboard_from_scores(limit=TOP_N_PLAYERS, use_window=None):
+    """Same result as `get_overall_leaderboard`, computed from raw scores (see above)."""
+    if use_window is None:
+        use_window = window_functions_supported()
+    best = _best_score_rows(None, use_window)
+    totals = db.session.query(
+        best.c.user_id,
+        func.sum(best.c.best_score).label('total_score'),
+        func.min(best.c.achieved_at).label('earliest_best_score_timestamp')
+    ).group_by(best.c.user_id).subquery()
+    rows = db.session.query(User.id, User.username, totals.c.total_score, totals.c.earliest_best_score_timestamp)\
+                     .select_from(User)\
+                     .join(totals, User.id == totals.c.user_id)
+    return _ranked_rows(rows, totals.c.total_score, totals.c.earliest_best_score_timestamp, User.id,
+                        limit, use_window)
+
+
+def rebuild_best_scores(use_window=None):
+    """
+    Recomputes the whole `best_scores` table, and `user_totals` from it, from raw
+    scores in one transaction.
+
+    For repairs after scores were edited or deleted outside the ORM (the after_flush
+    hook only ever raises a best). Commits and returns the number of best_scores
+    rows written.
+    """
+    if use_window is None:
+        use_window = window_functions_supported()
+    best = _best_score_rows(None, use_window)
+    db.session.execute(db.delete(BestScore))
+    result = db.session.execute(
+        db.insert(BestScore).from_select(
+            ['user_id', 'level', 'best_score', 'achieved_at'],
+            db.select(best.c.user_id, best.c.level, best.c.best_score, best.c.achieved_at)
+        )
+    )
+    db.session.execute(db.delete(UserTotal))
+    db.session.execute(
+        db.insert(UserTotal).from_select(
+            ['user_id', 'total_score', 'achieved_at'],
+            db.select(BestScore.user_id, func.sum(BestScore.best_score), func.min(BestScore.achieved_at))
+              .group_by(BestScore.user_id)
+        )
+    )
+    db.session.commit()
+    leaderboard_cache.clear()
+    return result.rowcount
+
+
+# --- Cached read path ---
+# Views should prefer these: results are served from the per-app LeaderboardCache
+# and recomputed only after a committed score write invalidates the level (or the TTL expires).
+
+def get_cached_leaderboard_by_level(level_num):
+    """Cached variant of `get_leaderboard_by_level`."""
+    return leaderboard_cache.get_or_compute(
+        leaderboard_cache.level_key(level_num),
+        lambda: get_leaderboard_by_level(level_num)
+    )
+
+def get_cached_overall_leaderboard():
+    """Cached variant of `get_overall_leaderboard`."""
+    return leaderboard_cache.get_or_compute(leaderboard_cache.OVERALL_KEY, get_overall_leaderboard)
+
+def get_cached_distinct_levels():
+    """Cached variant of `get_distinct_levels`."""
+    return leaderboard_cache.get_or_compute(leaderboard_cache.LEVELS_KEY, get_distinct_levels)
+
+def get_cached_period_leaderboard(period, level_num=None):
+    """Cached variant of `get_period_leaderboard` for the current bucket."""
+    start = current_period_start(period)
+    return leaderboard_cache.get_or_compute(
+        leaderboard_cache.period_key(period, start, level_num),
+        lambda: get_period_leaderboard(period, level_num, start=start)
+    )
+
+def get_cached_latest_score_write():
+    """Cached variant of `get_latest_score_write`; dropped on every committed score."""
+    return leaderboard_cache.get_or_compute(leaderboard_cache.VERSION_KEY, get_latest_score_write)
@@ -0,0 +1,308 @@
+"""End-to-end HTTP load generator for the server.
+
+Simulated players each hold their own HTTP session, log in through
+`/api/login`, then loop over a weighted mix of `/api/submit_score`, the HTML
+`/leaderboard` page and `/api/leaderboard`, pausing for an exponentially
+distributed think time between requests. The report (JSON) has throughput,
+error rates and a latency histogram with p50/p95/p99 per endpoint.
+
+Usage (seed a throwaway database and run the app under gunicorn):
+    python -m server.loadtest --start-gunicorn --workers 4 --seed \
+        --database-url sqlite:////tmp/loadtest.db --clients 50 --duration 60
+
+Or point it at a server that is already running (its users must exist, e.g.
+from an earlier --seed run):
+    python -m server.loadtest --url http://127.0.0.1:8000 --clients 20 --duration 30
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager, redirect_stdout
+
+import requests
+
+from .bench import _BENCH_PASSWORD, percentile
+
+# Upper bounds (ms) of the latency histogram buckets; slower requests land in "+Inf"
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# Default request mix: endpoint name -> relative weight
+DEFAULT_MIX = {'submit_score': 3, 'leaderboard_page': 1, 'api_leaderboard': 2}
+
+
+class EndpointStats:
+    """Latency samples and outcome counters for one endpoint (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = [] # seconds
+        self.errors = 0
+        self.status_counts = {}
+
+    def record(self, seconds, status):
+        """`status` is the HTTP status code, or the exception class name for transport errors."""
+        with self._lock:
+            self.samples.append(seconds)
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            if not isinstance(status, int) or status >= 400:
+                self.errors += 1
+
+    def report(self, elapsed):
+        with self._lock:
+            samples = list(self.samples)
+            errors = self.errors
+            status_counts = dict(self.status_counts)
+        count = len(samples)
+        histogram = {str(upper): 0 for upper in LATENCY_BUCKETS_MS}
+        histogram['+Inf'] = 0
+        for seconds in samples:
+            ms = seconds * 1000
+            bucket = next((str(upper) for upper in LATENCY_BUCKETS_MS if ms <= upper), '+Inf')
+            histogram[bucket] += 1
+        return {
+            'requests': count,
+            'errors': errors,
+            'error_rate': (errors / count) if count else 0.0,
+            'requests_per_second': (count / elapsed) if elapsed else 0.0,
+            'status_counts': {str(k): v for k, v in status_counts.items()},
+            'p50_ms': percentile(samples, 50) * 1000 if samples else None,
+            'p95_ms': percentile(samples, 95) * 1000 if samples else None,
+            'p99_ms': percentile(samples, 99) * 1000 if samples else None,
+            'max_ms': max(samples) * 1000 if samples else None,
+            'histogram_ms': histogram,
+        }
+
+
+class SimulatedClient(threading.Thread):
+    """One player: logs in, then sends the request mix until `deadline`."""
+
+    def __init__(self, base_url, username, password, stats, deadline, think_time, mix, levels, seed):
+        super().__init__(name=f'loadtest-{username}', daemon=True)
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.stats = stats
+        self.deadline = deadline
+        self.think_time = think_time
+        self.levels = levels
+        self.rng = random.Random(seed)
+        self.endpoints = list(mix)
+        self.weights = [mix[name] for name in self.endpoints]
+        self.session = requests.Session()
+        self.headers = {}
+
+    def _timed(self, name, method, path, **kwargs):
+        began = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=30, **kwargs)
+            status = response.status_code
+        except requests.exceptions.RequestException as e:
+            response, status = None, type(e).__name__
+        self.stats[name].record(time.perf_counter() - began, status)
+        return response
+
+    def login(self):
+        response = self._timed('login', 'POST', '/api/login',
+                               json={'username': self.username, 'password': self.password})
+        if response is None or response.status_code != 200:
+            return False
+        token = response.json().get('token')
+        if token:
+            self.headers = {'Authorization': f'Bearer {token}'}
+        return True
+
+    def step(self):
+        name = self.rng.choices(self.endpoints, weights=self.weights)[0]
+        if name == 'submit_score':
+            payload = {'score': int(100 * self.rng.paretovariate(1.5)), 'level': self.rng.randint(1, self.levels)}
+            self._timed(name, 'POST', '/api/submit_score', json=payload, headers=self.headers)
+        elif name == 'leaderboard_page':
+            self._timed(name, 'GET', '/leaderboard')
+        elif name == 'api_leaderboard':
+            self._timed(name, 'GET', '/api/leaderboard', params={'limit': 30})
+
+    def run(self):
+        if not self.login():
+            return
+        while time.monotonic() < self.deadline:
+            self.step()
+            if self.think_time > 0:
+                time.sleep(min(self.rng.expovariate(1.0 / self.think_time),
+                               max(0.0, self.deadline - time.monotonic())))
+
+
+def run_load(base_url, clients=10, duration=30.0, think_time=0.5, users=None, levels=5,
+             mix=None, password=_BENCH_PASSWORD, username_format='bench_user_{}', seed=1):
+    """
+    Drives `clients` simulated players against `base_url` for `duration` seconds.
+
+    Clients log in as `username_format.format(i)` for i in 1..`users` (round-robin,
+    so several clients may share an account when users < clients).
+
+    Returns:
+        dict: The JSON-serializable report.
+    """
+    mix = mix or DEFAULT_MIX
+    users = users or clients
+    stats = {name: EndpointStats() for name in ['login'] + list(mix)}
+    began = time.monotonic()
+    deadline = began + duration
+    threads = [
+        SimulatedClient(base_url, username_format.format(i % users + 1), password, stats,
+                        deadline, think_time, mix, levels, seed + i)
+        for i in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(duration + 60)
+    elapsed = time.monotonic() - began
+
+    endpoints = {name: endpoint.report(elapsed) for name, endpoint in stats.items()}
+    total = sum(e['requests'] for e in endpoints.values())
+    errors = sum(e['errors'] for e in endpoints.values())
+    return {
+        'base_url': base_url,
+        'parameters': {'clients': clients, 'duration': duration, 'think_time': think_time,
+                       'users': users, 'levels': levels, 'mix': mix},
+        'elapsed_seconds': elapsed,
+        'requests': total,
+        'errors': errors,
+        'error_rate': (errors / total) if total else 0.0,
+        'requests_per_second': (total / elapsed) if elapsed else 0.0,
+        'endpoints': endpoints,
+    }
+
+
+# ==============================================================================
+# --- Local server management ---
+# ==============================================================================
+
+def seed_database(database_url, users, levels, submissions):
+    """Recreates the schema on `database_url` and fills it via bench.generate_dataset."""
+    from .app import create_app
+    from .bench import generate_dataset
+    from .config import Config
+    from .extensions import db
+
+    app = create_app(Config, config_override={'SQLALCHEMY_DATABASE_URI': database_url})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        counts = generate_dataset(db, users=users, levels=levels, submissions=submissions)
+        db.session.remove()
+    return counts
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+@contextmanager
+def gunicorn_server(database_url, workers=4, threads=1, port=None, extra_env=None, startup_timeout=30):
+    """
+    Runs `server.app:create_app()` under gunicorn on 127.0.0.1 for the duration of the block.
+
+    Yields:
+        str: The server's base URL.
+    """
+    if shutil.which('gunicorn') is None:
+        raise RuntimeError("gunicorn is not installed (it is a server dependency: poetry install)")
+    port = port or _free_port()
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': database_url,
+        'SECRET_KEY': env.get('SECRET_KEY', 'loadtest-secret-key'), # Shared by all workers
+        # All simulated clients come from 127.0.0.1; don't let the IP throttle skew results
+        'LOGIN_THROTTLE_MAX_PER_IP': '0',
+    })
+    env.update(extra_env or {})
+    command = ['gunicorn', '--workers', str(workers), '--threads', str(threads),
+               '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'server.app:create_app()']
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL)
+    try:
+        if not _wait_for_port(port, startup_timeout):
+            raise RuntimeError(f"gunicorn did not start listening on port {port} within {startup_timeout}s")
+        yield f'http://127.0.0.1:{port}'
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def _parse_mix(text):
+    """Parses 'submit_score=3,api_leaderboard=2' into a weight dict."""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r} (choose from {', '.join(DEFAULT_MIX)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help='Base URL of a running server')
+    target.add_argument('--start-gunicorn', action='store_true', help='Start the app under gunicorn locally')
+    parser.add_argument('--database-url', default='sqlite:////tmp/planewar_loadtest.db',
+                        help='Database for --start-gunicorn (and --seed)')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=1, help='gunicorn threads per worker')
+    parser.add_argument('--seed', action='store_true', help='Drop, recreate and fill --database-url first')
+    parser.add_argument('--users', type=int, default=100, help='Accounts to seed / log in as')
+    parser.add_argument('--levels', type=int, default=5)
+    parser.add_argument('--submissions', type=int, default=10, help='Average seeded scores per user')
+    parser.add_argument('--clients', type=int, default=20, help='Concurrent simulated players')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds to run')
+    parser.add_argument('--think-time', type=float, default=0.5, help='Mean pause between requests (s)')
+    parser.add_argument('--mix', type=_parse_mix, default=None,
+                        help='Endpoint weights, e.g. submit_score=3,leaderboard_page=1,api_leaderboard=2')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+
+    with redirect_stdout(sys.stderr): # Keep the app's progress prints out of the JSON
+        if args.seed:
+            seed_database(args.database_url, args.users, args.levels, args.submissions)
+        load_args = dict(clients=args.clients, duration=args.duration, think_time=args.think_time,
+                         users=args.users, levels=args.levels, mix=args.mix)
+        if args.start_gunicorn:
+            with gunicorn_server(args.database_url, workers=args.workers, threads=args.threads) as base_url:
+                report = run_load(base_url, **load_args)
+            report['server'] = {'gunicorn_workers': args.workers, 'gunicorn_threads': args.threads}
+        else:
+            report = run_load(args.url, **load_args)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        sys.stdout.write(text + '\n')
+    return 0 if report['requests'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""Protects the login endpoints from bcrypt-driven CPU exhaustion.
+
+bcrypt is deliberately slow, so a burst of logins can pin every worker's CPU
+and starve score submissions and leaderboard reads. The `LoginGuard`
+extension puts three things in front of `bcrypt.check_password_hash`:
+
+* a concurrency cap: at most `LOGIN_VERIFY_MAX_CONCURRENCY` hashes run at once
+  per process, and a login that cannot get a slot within
+  `LOGIN_VERIFY_QUEUE_TIMEOUT` seconds is refused (`PasswordVerifierBusy`);
+* sliding-window throttles on failed attempts per username and per client IP;
+* latency metrics for every hash check.
+"""
+import threading
+import time
+from collections import deque
+
+from flask import current_app, has_app_context
+
+# Upper bounds (seconds) of the hash latency histogram buckets
+HASH_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class PasswordVerifierBusy(Exception):
+    """Raised when no verification slot frees up within the queue timeout."""
+
+
+class PasswordVerifier:
+    """Runs password hash checks with bounded concurrency and records their latency."""
+
+    def __init__(self, max_concurrency=4, queue_timeout=2.0, clock=time.perf_counter):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Metrics
+        self.in_flight = 0
+        self.rejected = 0
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.bucket_counts = [0] * len(HASH_LATENCY_BUCKETS)
+
+    def verify(self, check, password_hash, password):
+        """
+        Calls `check(password_hash, password)` once a slot is free.
+
+        The hash runs in the calling thread: bcrypt releases the GIL while hashing,
+        so capping how many requests may hash at once bounds CPU use without
+        handing the work to another thread.
+
+        Raises:
+            PasswordVerifierBusy: If no slot frees up within `queue_timeout` seconds.
+        """
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordVerifierBusy()
+        with self._lock:
+            self.in_flight += 1
+        started = self._clock()
+        try:
+            return check(password_hash, password)
+        finally:
+            self._slots.release()
+            self._observe(self._clock() - started)
+
+    def _observe(self, seconds):
+        with self._lock:
+            self.in_flight -= 1
+            self.count += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            for i, upper in enumerate(HASH_LATENCY_BUCKETS):
+                if seconds <= upper:
+                    self.bucket_counts[i] += 1
+                    break
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_concurrency': self.max_concurrency,
+                'in_flight': self.in_flight,
+                'rejected': self.rejected,
+                'hash_count': self.count,
+                'hash_seconds_total': self.total_seconds,
+                'hash_seconds_avg': (self.total_seconds / self.count) if self.count else 0.0,
+                'hash_seconds_max': self.max_seconds,
+                # Cumulative counts per upper bound, Prometheus-histogram style
+                'hash_seconds_buckets': {
+                    upper: sum(self.bucket_counts[:i + 1]) for i, upper in enumerate(HASH_LATENCY_BUCKETS)
+                },
+            }
+
+
+class AttemptThrottle:
+    """Counts failed attempts per key in a sliding window."""
+
+    def __init__(self, max_attempts, window_seconds, max_keys=10000, clock=time.monotonic):
+        self.max_attempts = max_attempts
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._clock = clock
+        self._attempts = {} # key -> deque of failure times, oldest first
+        self._lock = threading.Lock()
+
+    def _prune(self, key, now):
+        attempts = self._attempts.get(key)
+        if attempts is None:
+            return None
+        while attempts and attempts[0] <= now - self.window_seconds:
+            attempts.popleft()
+        if not attempts:
+            del self._attempts[key]
+            return None
+        return attempts
+
+    def retry_after(self, key):
+        """Seconds until `key` may try again, or 0 if it is not throttled."""
+        if key is None or self.max_attempts <= 0:
+            return 0
+        with self._lock:
+            now = self._clock()
+            attempts = self._prune(key, now)
+            if attempts is None or len(attempts) < self.max_attempts:
+                return 0
+            return max(0.0, attempts[0] + self.window_seconds - now)
+
+    def record_failure(self, key):
+        if key is None or self.max_attempts <= 0:
+            return
+        with self._lock:
+            now = self._clock()
+            if key not in self._attempts and len(self._attempts) >= self.max_keys:
+                # Bound memory under a spray of distinct keys: drop the stalest one
+                stalest = min(self._attempts, key=lambda k: self._attempts[k][-1])
+                del self._attempts[stalest]
+            attempts = self._attempts.setdefault(key, deque())
+            attempts.append(now)
+            if len(attempts) > self.max_attempts:
+                attempts.popleft()
+
+    def reset(self, key):
+        with self._lock:
+            self._attempts.pop(key, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._attempts)
+
+
+class _LoginGuardState:
+    """Per-app verifier, throttles and counters."""
+
+    def __init__(self, config):
+        self.verifier = PasswordVerifier(
+            max_concurrency=config['LOGIN_VERIFY_MAX_CONCURRENCY'],
+            queue_timeout=config['LOGIN_VERIFY_QUEUE_TIMEOUT'],
+        )
+        window = config['LOGIN_THROTTLE_WINDOW']
+        self.by_username = AttemptThrottle(config['LOGIN_THROTTLE_MAX_PER_USERNAME'], window)
+        self.by_ip = AttemptThrottle(config['LOGIN_THROTTLE_MAX_PER_IP'], window)
+        self.throttled = 0
+
+
+class LoginGuard:
+    """
+    Flask extension guarding password verification for the login endpoints.
+
+    Config:
+        LOGIN_VERIFY_MAX_CONCURRENCY (int): Password hashes allowed to run at once per process.
+        LOGIN_VERIFY_QUEUE_TIMEOUT (float): Seconds a login may wait for a slot before a 503.
+        LOGIN_THROTTLE_WINDOW (float): Sliding window, in seconds, for counting failed logins.
+        LOGIN_THROTTLE_MAX_PER_USERNAME (int): Failures per username in the window. 0 disables.
+        LOGIN_THROTTLE_MAX_PER_IP (int): Failures per client IP in the window. 0 disables.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('LOGIN_VERIFY_MAX_CONCURRENCY', 4)
+        app.config.setdefault('LOGIN_VERIFY_QUEUE_TIMEOUT', 2.0)
+        app.config.setdefault('LOGIN_THROTTLE_WINDOW', 300.0)
+        app.config.setdefault('LOGIN_THROTTLE_MAX_PER_USERNAME', 5)
+        app.config.setdefault('LOGIN_THROTTLE_MAX_PER_IP', 50)
+        app.extensions['login_guard'] = _LoginGuardState(app.config)
+
+    @property
+    def state(self):
+        """The current app's guard state, or None outside an app context."""
+        if not has_app_context():
+            return None
+        return current_app.extensions.get('login_guard')
+
+    def check_password_hash(self, check, password_hash, password):
+        """Runs `check(password_hash, password)` through the current app's verifier."""
+        state = self.state
+        if state is None:
+            return check(password_hash, password)
+        return state.verifier.verify(check, password_hash, password)
+
+    def retry_after(self, username, ip):
+        """Seconds the caller must wait before another login attempt, or 0."""
+        state = self.state
+        if state is None:
+            return 0
+        wait = max(state.by_username.retry_after(username), state.by_ip.retry_after(ip))
+        if wait:
+            state.throttled += 1
+        return wait
+
+    def record_failure(self, username, ip):
+        state = self.state
+        if state is not None:
+            state.by_username.record_failure(username)
+            state.by_ip.record_failure(ip)
+
+    def record_success(self, username, ip):
+        """Clears the username's failures (the IP's count keeps running down on its own)."""
+        state = self.state
+        if state is not None:
+            state.by_username.reset(username)
+
+    def stats(self):
+        state = self.state
+        if state is None:
+            return {}
+        stats = state.verifier.stats()
+        stats.update(
+            throttled=state.throttled,
+            tracked_usernames=len(state.by_username),
+            tracked_ips=len(state.by_ip),
+        )
+        return stats
@@ -0,0 +1,306 @@
+"""Prometheus-compatible `/metrics` endpoint, without extra dependencies.
+
+Exposes, in the Prometheus text exposition format (version 0.0.4):
+
+* request counters and latency histograms per endpoint (blueprint route);
+* scores stored (any path) plus the write-behind ingest queue's counters;
+* leaderboard and user cache hits, misses and hit ratio;
+* database pool checkout wait time and pool occupancy;
+* bcrypt verification time and login throttling from `LoginGuard`.
+
+Values are per worker process: with gunicorn, each worker answers for
+itself, so scrape workers individually (or sum what a scrape happens to hit).
+"""
+import threading
+import time
+
+from flask import Response, current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Upper bounds (seconds) of the request latency histogram buckets
+REQUEST_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Upper bounds (seconds) of the DB pool checkout wait histogram buckets
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# session.info key counting Score rows flushed by the open transaction
+_PENDING_SCORES_KEY = '_metrics_pending_scores'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Thread-safe histogram with one series per label tuple."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {} # labels -> [bucket counts..., count, sum]
+
+    def observe(self, value, labels=()):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0, 0.0]
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    series[i] += 1
+                    break
+            series[-2] += 1
+            series[-1] += value
+
+    def samples(self, name, label_names=()):
+        """Yields exposition lines: cumulative _bucket series, then _count and _sum."""
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            pairs = list(zip(label_names, labels))
+            cumulative = 0
+            for upper, count in zip(self.buckets, series):
+                cumulative += count
+                yield f'{name}_bucket{_format_labels(pairs + [("le", _format_value(float(upper)))])} {cumulative}'
+            yield f'{name}_bucket{_format_labels(pairs + [("le", "+Inf")])} {series[-2]}'
+            yield f'{name}_count{_format_labels(pairs)} {series[-2]}'
+            yield f'{name}_sum{_format_labels(pairs)} {_format_value(series[-1])}'
+
+
+class _MetricsState:
+    """Per-app collectors updated by request hooks and SQLAlchemy events."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {} # (endpoint, method, status) -> count
+        self.in_flight = 0
+        self.request_seconds = Histogram(REQUEST_LATENCY_BUCKETS)
+        self.pool_wait_seconds = Histogram(POOL_WAIT_BUCKETS)
+        self.scores_stored = 0
+
+
+class Metrics:
+    """
+    Flask extension serving `/metrics` and collecting the request/DB series behind it.
+
+    Must be initialised after `db`, so it can time checkouts from the app's engine pools.
+
+    Config:
+        METRICS_ENABLED (bool): Register the endpoint and collectors. Default True.
+        METRICS_BEARER_TOKEN (str, optional): If set, scrapes must send
+            `Authorization: Bearer <token>`.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_BEARER_TOKEN', None)
+        if not app.config['METRICS_ENABLED']:
+            return
+        state = app.extensions['metrics'] = _MetricsState()
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.add_url_rule('/metrics', 'metrics', self._metrics_view)
+
+        from .extensions import db
+        with app.app_context():
+            for engine in db.engines.values():
+                _time_pool_checkouts(engine, state.pool_wait_seconds)
+
+    @staticmethod
+    def _state():
+        return current_app.extensions.get('metrics')
+
+    def _start_request(self):
+        state = self._state()
+        g._metrics_started = time.perf_counter()
+        with state.lock:
+            state.in_flight += 1
+
+    def _finish_request(self, response):
+        started = g.pop('_metrics_started', None)
+        if started is None:
+            return response
+        state = self._state()
+        # Unmatched URLs (404s) share one label so scanners can't blow up the series count
+        endpoint = request.endpoint or 'unmatched'
+        key = (endpoint, request.method, str(response.status_code))
+        with state.lock:
+            state.in_flight -= 1
+            state.requests[key] = state.requests.get(key, 0) + 1
+        state.request_seconds.observe(time.perf_counter() - started, (endpoint,))
+        return response
+
+    def _metrics_view(self):
+        token = current_app.config['METRICS_BEARER_TOKEN']
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return Response('Unauthorized\n', 401, {'WWW-Authenticate': 'Bearer'})
+        return Response(self.render(), 200, {'Content-Type': CONTENT_TYPE, 'Cache-Control': 'no-store'})
+
+    def render(self):
+        """The current app's metrics in the Prometheus text format."""
+        from .extensions import db, leaderboard_cache, login_guard, score_ingest, user_cache
+        state = self._state()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for sample in samples:
+                if isinstance(sample, str):
+                    lines.append(sample)
+                else:
+                    labels, value = sample
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+
+        # --- HTTP ---
+        with state.lock:
+            requests_snapshot = sorted(state.requests.items())
+            in_flight = state.in_flight
+        metric('planewar_http_requests_total', 'counter', 'HTTP requests by endpoint, method and status.',
+               [((('endpoint', e), ('method', m), ('status', s)), n) for (e, m, s), n in requests_snapshot])
+        metric('planewar_http_request_duration_seconds', 'histogram', 'HTTP request latency by endpoint.',
+               state.request_seconds.samples('planewar_http_request_duration_seconds', ('endpoint',)))
+        metric('planewar_http_requests_in_flight', 'gauge', 'Requests currently being handled (including this one).',
+               [((), in_flight)])
+
+        # --- Score ingestion ---
+        metric('planewar_scores_stored_total', 'counter', 'Score rows committed by this process (any path).',
+               [((), state.scores_stored)])
+        ingest = score_ingest.stats()
+        if ingest:
+            for key, help_text in (('accepted', 'Scores queued by the API.'),
+                                   ('rejected', 'Scores refused because the queue was full.'),
+                                   ('flushed', 'Scores committed from the queue.'),
+                                   ('failed', 'Scores dropped after a database error.'),
+                                   ('duplicates', 'Retried submissions skipped as already stored.'),
+                                   ('batches', 'Batches committed.')):
+                metric(f'planewar_score_ingest_{key}_total', 'counter', f'Write-behind ingest: {help_text}',
+                       [((), ingest[key])])
+            metric('planewar_score_ingest_queue_depth', 'gauge', 'Scores waiting in the write-behind queue.',
+                   [((), ingest['queue_depth'])])
+            metric('planewar_score_ingest_queue_capacity', 'gauge', 'Capacity of the write-behind queue.',
+                   [((), ingest['queue_capacity'])])
+
+        # --- Caches ---
+        cache_stats = [(name, cache.stats()) for name, cache in (('leaderboard', leaderboard_cache), ('user', user_cache))]
+        cache_stats = [((('cache', name),), stats) for name, stats in cache_stats if stats]
+        for suffix, key, kind, help_text in (('hits_total', 'hits', 'counter', 'Cache hits.'),
+                                             ('misses_total', 'misses', 'counter', 'Cache misses.'),
+                                             ('hit_ratio', 'hit_ratio', 'gauge', 'Cache hits / lookups since start.'),
+                                             ('entries', 'size', 'gauge', 'Entries currently cached.')):
+            metric(f'planewar_cache_{suffix}', kind, help_text,
+                   [(labels, stats[key]) for labels, stats in cache_stats])
+
+        # --- Database pool ---
+        metric('planewar_db_pool_checkout_wait_seconds', 'histogram',
+               'Time to get a connection from the pool (includes opening new connections).',
+               state.pool_wait_seconds.samples('planewar_db_pool_checkout_wait_seconds'))
+        occupancy = []
+        for engine_name, engine in db.engines.items():
+            pool = engine.pool # Read now: engine.dispose() replaces it
+            for gauge in ('size', 'checkedout', 'overflow'):
+                if hasattr(pool, gauge): # QueuePool; SQLite memory/static pools lack these
+                    occupancy.append((gauge, ((('engine', engine_name or 'default'),), getattr(pool, gauge)())))
+        for gauge, help_text in (('size', 'Configured pool size.'),
+                                 ('checkedout', 'Connections currently checked out.'),
+                                 ('overflow', 'Connections open beyond the pool size.')):
+            samples = [sample for name, sample in occupancy if name == gauge]
+            if samples:
+                metric(f'planewar_db_pool_{gauge}', 'gauge', help_text, samples)
+
+        # --- Password verification (bcrypt) ---
+        guard = login_guard.stats()
+        if guard:
+            buckets = [f'planewar_password_verify_seconds_bucket{_format_labels([("le", _format_value(float(upper)))])} {count}'
+                       for upper, count in guard['hash_seconds_buckets'].items()]
+            buckets += [f'planewar_password_verify_seconds_bucket{_format_labels([("le", "+Inf")])} {guard["hash_count"]}',
+                        f'planewar_password_verify_seconds_count {guard["hash_count"]}',
+                        f'planewar_password_verify_seconds_sum {_format_value(float(guard["hash_seconds_total"]))}']
+            metric('planewar_password_verify_seconds', 'histogram', 'bcrypt password check duration.', buckets)
+            metric('planewar_password_verify_in_flight', 'gauge', 'bcrypt checks running now.',
+                   [((), guard['in_flight'])])
+            metric('planewar_password_verify_max_concurrency', 'gauge', 'Concurrent bcrypt checks allowed.',
+                   [((), guard['max_concurrency'])])
+            metric('planewar_password_verify_rejected_total', 'counter',
+                   'Logins refused because no verification slot freed up in time.', [((), guard['rejected'])])
+            metric('planewar_login_throttled_total', 'counter', 'Logins refused by the failure throttles.',
+                   [((), guard['throttled'])])
+
+        return '\n'.join(lines) + '\n'
+
+
+# --- Pool checkout wait ---
+# SQLAlchemy has no event before a checkout starts, so the clock starts when the
+# ORM is about to need a connection (a Session execute or flush) and stops at the
+# pool's `checkout` event. The first statement on a connection clears a start
+# that no checkout consumed (the session already held one). Listeners are set on
+# the engine, so they carry over to the new pool after engine.dispose().
+
+_checkout_clock = threading.local()
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _start_checkout_clock(orm_execute_state):
+    _checkout_clock.started = time.perf_counter()
+
+
+@event.listens_for(Session, 'before_flush')
+def _start_checkout_clock_for_flush(session, flush_context, instances):
+    _checkout_clock.started = time.perf_counter()
+
+
+def _time_pool_checkouts(engine, histogram):
+    """Observes, via pool events on `engine`, how long ORM operations wait for a connection."""
+    def observe_checkout(dbapi_connection, connection_record, connection_proxy):
+        started = getattr(_checkout_clock, 'started', None)
+        if started is not None:
+            _checkout_clock.started = None
+            histogram.observe(time.perf_counter() - started)
+
+    def forget_checkout_start(conn, cursor, statement, parameters, context, executemany):
+        _checkout_clock.started = None
+
+    event.listen(engine, 'checkout', observe_checkout)
+    event.listen(engine, 'before_cursor_execute', forget_checkout_start)
+
+
+# --- Stored score counter ---
+# Counted at flush and credited on commit, so rolled-back submissions are not counted.
+
+@event.listens_for(Session, 'after_flush')
+def _count_flushed_scores(session, flush_context):
+    from .models import Score # Local import: models imports extensions, which imports this module
+    flushed = sum(1 for obj in session.new if isinstance(obj, Score))
+    if flushed:
+        session.info[_PENDING_SCORES_KEY] = session.info.get(_PENDING_SCORES_KEY, 0) + flushed
+
+
+@event.listens_for(Session, 'after_commit')
+def _credit_committed_scores(session):
+    committed = session.info.pop(_PENDING_SCORES_KEY, 0)
+    if not committed:
+        return
+    state = current_app.extensions.get('metrics') if has_app_context() else None
+    if state is not None:
+        with state.lock:
+            state.scores_stored += committed
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_flushed_scores(session):
+    session.info.pop(_PENDING_SCORES_KEY, None)
@@ -6,19 +6,35 @@ definitions, relationships between models, and potentially helper methods
 (e.g., password hashing).
 """
 # /Users/junluo/Desktop/桌面文件/PlaneWar_Sever/server/models.py
-from .extensions import db, login_manager, bcrypt
+from .extensions import db, login_manager, bcrypt, login_guard, user_cache
+from .tokens import token_from_header, verify_token
 from flask_login import UserMixin
-from datetime import datetime # Correct import
+from datetime import datetime, timedelta # Correct import
+from sqlalchemy import event, func, or_
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql, sqlite
 
 @login_manager.user_loader
 def load_user(user_id):
     """Callback used by Flask-Login to reload the user object from the user ID stored in the session."""
     try:
-        # Use db.session.get for efficient primary key lookup
-        return db.session.get(User, int(user_id))
+        # Served from the per-process user cache when possible; misses fall back to db.session.get
+        return user_cache.load(db.session, User, int(user_id))
     except (TypeError, ValueError):
         return None
 
+@login_manager.request_loader
+def load_user_from_request(req):
+    """
+    Authenticates /api requests that carry `Authorization: Bearer <token>`.
+    Only used when there is no session user; the token is verified by HMAC alone,
+    so a user deleted or renamed since it was issued is accepted until it expires.
+    """
+    if req.blueprint != 'api':
+        return None
+    token = token_from_header(req.headers.get('Authorization'))
+    return verify_token(token) if token else None
+
 class User(UserMixin, db.Model):
     """User model for authentication and relationship to scores."""
     __tablename__ = 'users'
@@ -29,14 +45,23 @@ class User(UserMixin, db.Model):
 
     # Relationship: One user has many scores.
     scores = db.relationship('Score', backref='player', lazy='dynamic', cascade="all, delete-orphan")
+    # Materialized personal bests (one row per level), maintained on every Score insert.
+    best_scores = db.relationship('BestScore', backref='player', lazy='dynamic', cascade="all, delete-orphan")
+    # Sum of those bests, for the overall rank lookup
+    total = db.relationship('UserTotal', backref='player', uselist=False, cascade="all, delete-orphan")
 
     def set_password(self, password):
         """Hashes the password and stores it."""
         self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
 
     def check_password(self, password):
-        """Checks if the provided password matches the stored hash."""
-        return bcrypt.check_password_hash(self.password_hash, password)
+        """
+        Checks if the provided password matches the stored hash.
+
+        Runs through the login guard's bounded verifier; raises
+        login_guard.PasswordVerifierBusy if no verification slot frees up in time.
+        """
+        return login_guard.check_password_hash(bcrypt.check_password_hash, self.password_hash, password)
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -54,8 +79,244 @@ class Score(db.Model):
     level = db.Column(db.Integer, nullable=False, index=True) # <<< MAKE SURE THIS LINE IS CORRECT
     # Timestamp when the score was recorded (defaults to UTC now)
     timestamp = db.Column(db.DateTime, nullable=False, index=True, default=datetime.utcnow)
+    # Optional client-generated id (e.g. a UUID) so a retried submission is stored only once
+    submission_id = db.Column(db.String(64), nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_scores_user_submission', 'user_id', 'submission_id', unique=True),
+        # Per-level "best score per user, earliest time" aggregation without touching the table
+        db.Index('ix_scores_level_user_score_ts', 'level', 'user_id', score_value.desc(), 'timestamp'),
+        # One user's best per level
+        db.Index('ix_scores_user_level_score', 'user_id', 'level', score_value.desc()),
+    )
+
+    @classmethod
+    def find_submissions(cls, user_id, submission_ids):
+        """Returns {submission_id: Score} for ids this user has already stored."""
+        submission_ids = [sid for sid in submission_ids if sid]
+        if not submission_ids:
+            return {}
+        existing = cls.query.filter(cls.user_id == user_id, cls.submission_id.in_(submission_ids)).all()
+        return {score.submission_id: score for score in existing}
 
     def __repr__(self):
         # Updated repr to include level
         return f'<Score {self.score_value} by UserID {self.user_id} on Level {self.level} at {self.timestamp}>'
 
+
+class BestScore(db.Model):
+    """
+    Materialized personal best per (user, level).
+
+    Kept in sync with the `scores` table by the `after_flush` listener below, in the
+    same transaction as the Score insert, so leaderboards can be read with a plain
+    indexed ORDER BY ... LIMIT instead of re-aggregating every raw submission.
+    """
+    __tablename__ = 'best_scores'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    level = db.Column(db.Integer, primary_key=True)
+    best_score = db.Column(db.Integer, nullable=False)
+    # Earliest time the best score was reached (tie-breaker: earlier ranks higher)
+    achieved_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        # Serves the per-level leaderboard from the index alone:
+        # WHERE level = ? ORDER BY best_score DESC, achieved_at ASC, user_id ASC
+        db.Index('ix_best_scores_level_rank', 'level', best_score.desc(), 'achieved_at', 'user_id'),
+        # Covers the overall leaderboard: GROUP BY user_id with SUM(best_score), MIN(achieved_at)
+        db.Index('ix_best_scores_user_totals', 'user_id', 'best_score', 'achieved_at'),
+    )
+
+    def __repr__(self):
+        return f'<BestScore {self.best_score} by UserID {self.user_id} on Level {self.level} at {self.achieved_at}>'
+
+
+class UserTotal(db.Model):
+    """
+    Materialized overall-leaderboard row per user: the sum of their `best_scores`.
+
+    Recomputed for every user whose bests change, by the same `after_flush` listener
+    that maintains `BestScore`, so a player's overall rank is an indexed
+    COUNT(*) WHERE total_score > ? like the per-level rank, instead of a GROUP BY
+    over every best_scores row.
+    """
+    __tablename__ = 'user_totals'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    total_score = db.Column(db.Integer, nullable=False)
+    # Earliest time among the user's personal bests (tie-breaker: earlier ranks higher)
+    achieved_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        # WHERE total_score > ? / = ? counts and neighbour scans in leaderboard order
+        db.Index('ix_user_totals_rank', total_score.desc(), 'achieved_at', 'user_id'),
+    )
+
+    def __repr__(self):
+        return f'<UserTotal {self.total_score} by UserID {self.user_id}>'
+
+
+# Time-windowed leaderboards: period name -> bucket length. Buckets start at UTC
+# midnight (daily) and Monday UTC midnight (weekly).
+LEADERBOARD_PERIODS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+}
+
+
+def period_start(period, timestamp):
+    """
+    Returns the first day of the `period` bucket containing `timestamp`.
+
+    Raises:
+        KeyError: If `period` is not in LEADERBOARD_PERIODS.
+    """
+    if period not in LEADERBOARD_PERIODS:
+        raise KeyError(period)
+    day = timestamp.date()
+    if period == 'weekly':
+        return day - timedelta(days=day.weekday()) # Monday
+    return day
+
+
+class PeriodBestScore(db.Model):
+    """
+    Personal best per (period bucket, level, user), for daily and weekly leaderboards.
+
+    Maintained by the same `after_flush` listener as `BestScore`, so a seasonal
+    leaderboard is an indexed ORDER BY ... LIMIT inside one bucket. Buckets older
+    than the retention window are deleted by `flask prune-leaderboards`.
+    """
+    __tablename__ = 'period_best_scores'
+
+    period = db.Column(db.String(16), primary_key=True) # A LEADERBOARD_PERIODS key
+    period_start = db.Column(db.Date, primary_key=True)
+    level = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    best_score = db.Column(db.Integer, nullable=False)
+    # Earliest time within the bucket the best score was reached
+    achieved_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        # Per-level leaderboard of one bucket, read from the index alone
+        db.Index('ix_period_best_scores_rank', 'period', 'period_start', 'level',
+                 best_score.desc(), 'achieved_at', 'user_id'),
+        # Covers the bucket's overall leaderboard: GROUP BY user_id with SUM/MIN
+        db.Index('ix_period_best_scores_user_totals', 'period', 'period_start', 'user_id',
+                 'best_score', 'achieved_at'),
+    )
+
+    def __repr__(self):
+        return f'<PeriodBestScore {self.period} {self.period_start} level {self.level} user {self.user_id}: {self.best_score}>'
+
+
+def _upsert_best(connection, table, key, score_value, timestamp):
+    """
+    Raises the stored best in `table` for the row identified by `key` if `score_value` beats it.
+
+    Args:
+        table: BestScore.__table__ or PeriodBestScore.__table__.
+        key (dict): Primary-key column name -> value.
+    """
+    values = dict(key, best_score=score_value, achieved_at=timestamp)
+    dialect = connection.dialect.name
+
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        stmt = insert(table).values(**values)
+        # Replace on a strictly better score, or the same score reached earlier
+        improves = or_(
+            stmt.excluded.best_score > table.c.best_score,
+            db.and_(stmt.excluded.best_score == table.c.best_score,
+                    stmt.excluded.achieved_at < table.c.achieved_at),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[name] for name in key],
+            set_={'best_score': stmt.excluded.best_score, 'achieved_at': stmt.excluded.achieved_at},
+            where=improves,
+        )
+        connection.execute(stmt)
+        return
+
+    # Generic fallback for dialects without ON CONFLICT support
+    where = db.and_(*(table.c[name] == value for name, value in key.items()))
+    current = connection.execute(
+        db.select(table.c.best_score, table.c.achieved_at).where(where)
+    ).first()
+    if current is None:
+        connection.execute(table.insert().values(**values))
+    elif score_value > current.best_score or \
+            (score_value == current.best_score and timestamp < current.achieved_at):
+        connection.execute(
+            table.update().where(where).values(best_score=score_value, achieved_at=timestamp)
+        )
+
+
+def _upsert_best_score(connection, user_id, level, score_value, timestamp):
+    """Raises the stored personal best for (user_id, level) if `score_value` beats it."""
+    _upsert_best(connection, BestScore.__table__, {'user_id': user_id, 'level': level}, score_value, timestamp)
+
+
+def _refresh_user_total(connection, user_id):
+    """
+    Recomputes the user's `user_totals` row from their `best_scores` rows.
+
+    Both aggregates come from ix_best_scores_user_totals (one user's slice of it).
+    Recomputing rather than adding a delta keeps the tie-breaker right: raising a
+    best moves its achieved_at later, which can change the user's earliest one.
+    """
+    best = BestScore.__table__
+    total_score, achieved_at = connection.execute(
+        db.select(func.sum(best.c.best_score), func.min(best.c.achieved_at)).where(best.c.user_id == user_id)
+    ).one()
+    table = UserTotal.__table__
+    values = {'user_id': user_id, 'total_score': total_score, 'achieved_at': achieved_at}
+    dialect = connection.dialect.name
+
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        stmt = insert(table).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id],
+            set_={'total_score': stmt.excluded.total_score, 'achieved_at': stmt.excluded.achieved_at},
+        )
+        connection.execute(stmt)
+        return
+
+    # Generic fallback for dialects without ON CONFLICT support
+    updated = connection.execute(
+        table.update().where(table.c.user_id == user_id)
+             .values(total_score=total_score, achieved_at=achieved_at)
+    )
+    if updated.rowcount == 0:
+        connection.execute(table.insert().values(**values))
+
+
+@event.listens_for(Session, 'after_flush')
+def _sync_best_scores(session, flush_context):
+    """Folds newly inserted Score rows into `best_scores`, `user_totals` and `period_best_scores` within the same transaction."""
+    new_scores = [obj for obj in session.new if isinstance(obj, Score)]
+    if not new_scores:
+        return
+    # Reduce a batch to one candidate per row first: highest score, earliest time.
+    # bucket is None for the all-time table, else (period, period_start).
+    candidates = {}
+    for score in new_scores:
+        buckets = [None] + [(period, period_start(period, score.timestamp)) for period in LEADERBOARD_PERIODS]
+        for bucket in buckets:
+            key = (bucket, score.user_id, score.level)
+            best = candidates.get(key)
+            if best is None or (score.score_value, best.timestamp) > (best.score_value, score.timestamp):
+                candidates[key] = score
+    connection = session.connection()
+    for (bucket, user_id, level), score in candidates.items():
+        if bucket is None:
+            _upsert_best_score(connection, user_id, level, score.score_value, score.timestamp)
+        else:
+            period, start = bucket
+            _upsert_best(connection, PeriodBestScore.__table__,
+                         {'period': period, 'period_start': start, 'level': level, 'user_id': user_id},
+                         score.score_value, score.timestamp)
+    for user_id in sorted({user_id for bucket, user_id, _ in candidates if bucket is None}):
+        _refresh_user_total(connection, user_id)
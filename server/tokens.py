@@ -0,0 +1,77 @@
+"""Signed, expiring bearer tokens for the `/api` blueprint.
+
+`/api/login` issues a token carrying the user's id and username, signed with
+HMAC-SHA256 under the app's SECRET_KEY (via itsdangerous, which ships with
+Flask). Requests presenting `Authorization: Bearer <token>` are authenticated
+from the token alone: no session cookie, no server-side session and no user
+lookup, so any worker on any host that shares SECRET_KEY can serve them.
+
+Tokens are stateless and stay valid until they expire (`API_TOKEN_MAX_AGE`);
+logging out, changing the password, or deleting or renaming the user does not
+revoke tokens already issued. `/api/token/refresh` renews a token only after
+checking the account still exists under the same name.
+"""
+import hashlib
+
+from flask import current_app
+from flask_login import UserMixin
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+_TOKEN_SALT = 'planewar-api-token'
+# Fallback lifetime (seconds) when API_TOKEN_MAX_AGE is not configured
+DEFAULT_TOKEN_MAX_AGE = 3600
+
+
+class ApiTokenUser(UserMixin):
+    """Authenticated user rebuilt from a verified token (never touches the database)."""
+
+    def __init__(self, user_id, username):
+        self.id = user_id
+        self.username = username
+
+    def __repr__(self):
+        return f'<ApiTokenUser {self.username}>'
+
+
+def _serializer():
+    return URLSafeTimedSerializer(
+        current_app.config['SECRET_KEY'],
+        salt=_TOKEN_SALT,
+        signer_kwargs={'digest_method': hashlib.sha256},
+    )
+
+
+def token_max_age():
+    return current_app.config.get('API_TOKEN_MAX_AGE', DEFAULT_TOKEN_MAX_AGE)
+
+
+def issue_token(user):
+    """Returns a signed token for `user` (anything with `id` and `username`)."""
+    return _serializer().dumps({'uid': user.id, 'name': user.username})
+
+
+def verify_token(token):
+    """
+    Checks a token's signature and age.
+
+    Returns:
+        ApiTokenUser | None: The embedded user, or None if the token is forged,
+                             malformed or older than API_TOKEN_MAX_AGE seconds.
+    """
+    try:
+        claims = _serializer().loads(token, max_age=token_max_age())
+    except (SignatureExpired, BadSignature):
+        return None
+    if not isinstance(claims, dict) or not isinstance(claims.get('uid'), int):
+        return None
+    return ApiTokenUser(claims['uid'], claims.get('name'))
+
+
+def token_from_header(authorization):
+    """Extracts the token from an `Authorization: Bearer <token>` header value, if present."""
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(' ')
+    if scheme.lower() != 'bearer' or not token.strip():
+        return None
+    return token.strip()
@@ -6,12 +6,23 @@ and potentially game information pages. Uses Flask-Login to manage user sessions
 and renders Jinja2 HTML templates.
 """
 # /Users/junluo/Desktop/桌面文件/PlaneWar_Sever/server/views.py
+import logging
 from flask import Blueprint, render_template, redirect, url_for, request, flash, abort
 from flask_login import current_user, login_required
-# Import the service, remove direct db/model access for leaderboard if not needed elsewhere
-from .leaderboard_service import get_leaderboard_by_level, get_overall_leaderboard, get_distinct_levels
+# Import the cached service functions; the cache is invalidated whenever a score commits
+from .leaderboard_service import (
+    get_cached_leaderboard_by_level,
+    get_cached_overall_leaderboard,
+    get_cached_distinct_levels,
+    get_cached_period_leaderboard,
+    ALL_TIME,
+)
+
+# ?period= values offered on the leaderboard page, with their labels
+PERIOD_LABELS = {ALL_TIME: "All Time", 'daily': "Today", 'weekly': "This Week"}
 
 bp = Blueprint('views', __name__)
+logger = logging.getLogger(__name__)
 
 @bp.route('/')
 def index():
@@ -27,9 +38,15 @@ def index():
 @bp.route('/leaderboard/level/<int:level_num>')
 @login_required # Keep login required for viewing leaderboards
 def leaderboard(level_num=None):
-    """Displays the leaderboard, either overall or for a specific level (Top 30)."""
+    """
+    Displays the leaderboard, either overall or for a specific level (Top 30).
+    `?period=daily|weekly` restricts it to the current UTC day or week.
+    """
+    period = request.args.get('period', ALL_TIME)
+    if period not in PERIOD_LABELS:
+        period = ALL_TIME
     try:
-        available_levels = get_distinct_levels() # Get levels for dropdown/links
+        available_levels = get_cached_distinct_levels() # Get levels for dropdown/links
         leaderboard_data = []
         leaderboard_title = ""
         current_level_filter = "Overall" # Default display filter name
@@ -40,26 +57,36 @@ def leaderboard(level_num=None):
                  flash(f"Level {level_num} does not exist or has no scores.", "warning")
                  return redirect(url_for('views.leaderboard')) # Redirect to overall on invalid level
 
-            leaderboard_data = get_leaderboard_by_level(level_num)
+            if period == ALL_TIME:
+                leaderboard_data = get_cached_leaderboard_by_level(level_num)
+            else:
+                leaderboard_data = get_cached_period_leaderboard(period, level_num)
             leaderboard_title = f"Leaderboard - Level {level_num} (Top {len(leaderboard_data)})"
             current_level_filter = f"Level {level_num}"
         else:
             # Overall leaderboard
-            leaderboard_data = get_overall_leaderboard()
+            if period == ALL_TIME:
+                leaderboard_data = get_cached_overall_leaderboard()
+            else:
+                leaderboard_data = get_cached_period_leaderboard(period)
             leaderboard_title = f"Overall Leaderboard (Top {len(leaderboard_data)})"
             # current_level_filter remains "Overall"
+        if period != ALL_TIME:
+            leaderboard_title += f" - {PERIOD_LABELS[period]}"
 
         # Pass formatted data from service to template
         return render_template('leaderboard.html',
                                title=leaderboard_title,
                                scores_data=leaderboard_data,
                                available_levels=available_levels,
-                               current_level_filter=current_level_filter
+                               current_level_filter=current_level_filter,
+                               level_num=level_num,
+                               current_period=period,
+                               period_labels=PERIOD_LABELS
                               )
 
-    except Exception as e:
-        print(f"Error loading leaderboard view: {e}")
-        # import traceback; traceback.print_exc() # Good for dev
+    except Exception:
+        logger.exception("Error loading leaderboard view")
         flash("An error occurred while loading the leaderboard.", "danger")
         # Redirect to a known safe page, maybe index or user profile if they exist
         return redirect(url_for('views.index')) # Redirecting back to index is safer
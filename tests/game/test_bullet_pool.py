@@ -0,0 +1,76 @@
+# tests/game/test_bullet_pool.py
+# Kept apart from test_bullet.py, whose autouse fixture replaces pygame.Surface and Vector2 with mocks.
+import os
+import pygame
+from pygame.math import Vector2
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+pygame.init()
+
+from game.bullet import Bullet, EnemyBullet, SpritePool
+from game.settings import BULLET_SPEED, ENEMY_BULLET_SPEED_Y, SCREEN_HEIGHT
+
+def test_killed_bullets_are_reused_with_the_shared_image():
+    """Test the kill-to-pool lifecycle: a killed bullet comes back reset, drawing the one shared surface."""
+    pool = SpritePool(Bullet)
+    group = pygame.sprite.Group()
+    first = pool.acquire(100, 200)
+    group.add(first)
+    first.update()
+    first.kill()
+    assert pool.free_count() == 1
+
+    second = pool.acquire(300, 400)
+    assert second is first
+    assert second.rect.center == (300, 400)
+    assert second.speedy == -BULLET_SPEED
+    assert second.image is pool.image
+    assert pool.acquire(1, 2).image is second.image
+    assert (pool.created, pool.reused) == (2, 1)
+
+def test_bullet_leaving_the_screen_returns_to_pool():
+    """Test that the off-screen kill in update() recycles the bullet exactly once."""
+    pool = SpritePool(Bullet)
+    bullet = pool.acquire(50, 0)
+    group = pygame.sprite.Group(bullet)
+    for _ in range(5):
+        bullet.update()
+    assert not bullet.alive() and not group
+    bullet.kill() # Already dead: must not be queued twice
+    assert pool.free_count() == 1
+
+def test_enemy_bullet_reset_clears_direction():
+    """Test that a recycled angled enemy bullet fired straight again moves straight down."""
+    pool = SpritePool(EnemyBullet)
+    bullet = pool.acquire(100, 50, direction=Vector2(0.6, 0.8))
+    pygame.sprite.Group(bullet)
+    bullet.kill()
+    again = pool.acquire(200, 60)
+    assert again is bullet
+    assert again.velocity == Vector2(0, ENEMY_BULLET_SPEED_Y)
+    assert again.rect.top == 60 and again.pos == Vector2(again.rect.center)
+    again.update()
+    assert again.rect.top > 60 and again.rect.top < SCREEN_HEIGHT
+
+def test_pool_caps_free_instances_and_ignores_unpooled_bullets():
+    pool = SpritePool(Bullet, max_free=2)
+    group = pygame.sprite.Group(pool.acquire(i, i) for i in range(5))
+    for sprite in group.sprites():
+        sprite.kill()
+    assert pool.free_count() == 2
+    loose = Bullet(10, 10) # Built directly: own surface, never pooled
+    pygame.sprite.Group(loose)
+    loose.kill()
+    assert pool.free_count() == 2
+    assert loose.image is not pool.image
+
+def test_many_shots_allocate_bounded_sprites():
+    """Test that a long burst of short-lived bullets only ever builds the peak number of live sprites."""
+    pool = SpritePool(Bullet)
+    bullets = pygame.sprite.Group()
+    for frame in range(600):
+        bullets.add(pool.acquire(500, SCREEN_HEIGHT - 20))
+        bullets.update()
+    live = len(bullets)
+    assert pool.created <= live + 1
+    assert pool.reused == 600 - pool.created
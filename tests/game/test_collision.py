@@ -0,0 +1,84 @@
+# tests/game/test_collision.py
+import random
+import pygame
+import pytest
+
+from game.collision import SpatialHash
+
+
+class Box(pygame.sprite.Sprite):
+    def __init__(self, x, y, w, h, name=None):
+        super().__init__()
+        self.rect = pygame.Rect(x, y, w, h)
+        self.name = name
+
+def _random_scene(seed, enemies=40, bullets=200):
+    rng = random.Random(seed)
+    enemy_group = pygame.sprite.Group(
+        Box(rng.randint(-30, 1000), rng.randint(-30, 600), 45, 35, f"e{i}") for i in range(enemies))
+    bullet_group = pygame.sprite.Group(
+        Box(rng.randint(-5, 1000), rng.randint(-12, 600), 5, 12, f"b{i}") for i in range(bullets))
+    return enemy_group, bullet_group
+
+def _names(sprites):
+    return [s.name for s in sprites]
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_groupcollide_matches_pygame(seed):
+    """Test identical hits, order and kills to pygame.sprite.groupcollide on a crowded random scene."""
+    expected_enemies, expected_bullets = _random_scene(seed)
+    expected = pygame.sprite.groupcollide(expected_enemies, expected_bullets, True, True)
+
+    enemies, bullets = _random_scene(seed)
+    grid = SpatialHash(cell_size=64)
+    grid.build(bullets, enemies)
+    actual = grid.groupcollide(enemies, bullets, True, True)
+
+    assert expected # The scene is dense enough to have collisions
+    assert [(a.name, _names(b)) for a, b in actual.items()] == \
+           [(a.name, _names(b)) for a, b in expected.items()]
+    assert sorted(_names(enemies)) == sorted(_names(expected_enemies))
+    assert sorted(_names(bullets)) == sorted(_names(expected_bullets))
+
+def test_bullet_overlapping_two_enemies_hits_only_the_first():
+    """Test that a bullet killed by one enemy can't also count against the next (dokillb semantics)."""
+    first, second = Box(0, 0, 40, 40, "first"), Box(20, 0, 40, 40, "second")
+    bullet = Box(25, 10, 5, 12, "bullet")
+    enemies, bullets = pygame.sprite.Group(first, second), pygame.sprite.Group(bullet)
+    grid = SpatialHash()
+    grid.build(bullets, enemies)
+    hits = grid.groupcollide(enemies, bullets, True, True)
+    assert list(hits) == [first]
+    assert second.alive() and not bullet.alive()
+
+def test_spritecollide_only_returns_members_of_the_queried_group():
+    """Test one grid shared by several groups, with kills from earlier checks respected."""
+    player = Box(100, 100, 50, 50)
+    enemy, powerup, shot = Box(120, 120, 30, 30, "enemy"), Box(90, 90, 20, 20, "powerup"), Box(110, 140, 8, 15, "shot")
+    enemies, powerups, enemy_bullets = (pygame.sprite.Group(enemy), pygame.sprite.Group(powerup),
+                                        pygame.sprite.Group(shot))
+    grid = SpatialHash()
+    grid.build(enemies, powerups, enemy_bullets)
+
+    assert grid.spritecollide(player, powerups, True) == [powerup]
+    assert not powerup.alive()
+    assert grid.spritecollide(player, powerups, True) == []
+    assert grid.spritecollide(player, enemies, False) == [enemy]
+    assert enemy.alive()
+    assert grid.spritecollide(player, enemy_bullets, True) == [shot]
+
+def test_large_sprites_and_negative_coordinates():
+    """Test sprites spanning many cells (the boss) and rects partly off-screen."""
+    boss = Box(400, -40, 120, 90, "boss")
+    grid = SpatialHash(cell_size=32)
+    grid.build(pygame.sprite.GroupSingle(boss))
+    assert len(grid) == 1
+    assert grid.query(pygame.Rect(510, 40, 5, 5)) == [boss]
+    assert grid.query(pygame.Rect(600, 40, 5, 5)) == []
+    touching = Box(520, 40, 5, 5) # Shares a cell with the boss but only touches its right edge
+    assert grid.spritecollide(touching, pygame.sprite.Group(boss), False) == []
+    assert grid.spritecollide(Box(390, -50, 20, 20), pygame.sprite.Group(boss), False) == [boss]
+
+def test_invalid_cell_size():
+    with pytest.raises(ValueError):
+        SpatialHash(cell_size=0)
@@ -0,0 +1,79 @@
+# tests/game/test_hud.py
+import os
+import pygame
+import pytest
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+pygame.init()
+
+from game.hud import HUD, CounterText, TextCache
+from game.settings import ORANGE, SCREEN_HEIGHT, SCREEN_WIDTH, WHITE
+
+# test_player.py's init fallback swaps these pygame attributes for mocks for the rest of the session
+_REAL_PYGAME = {name: getattr(pygame, name) for name in ("Surface", "Rect", "font")}
+
+@pytest.fixture(autouse=True)
+def real_pygame(monkeypatch):
+    for name, value in _REAL_PYGAME.items():
+        monkeypatch.setattr(pygame, name, value)
+
+
+class CountingFont:
+    """Real default font that records every render call."""
+    def __init__(self):
+        self.font = pygame.font.Font(None, 36)
+        self.calls = []
+
+    def render(self, text, antialias, color):
+        self.calls.append(text)
+        return self.font.render(text, antialias, color)
+
+def test_unchanged_values_never_rerender():
+    """Test that after the first frame the HUD draws without any font rasterization."""
+    font = CountingFont()
+    hud = HUD(font)
+    screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA) # Bounding rect = drawn pixels
+    hud.draw(screen, 120, 3, 4)
+    first_frame = len(font.calls)
+    for _ in range(100):
+        hud.draw(screen, 120, 3, 4)
+    assert len(font.calls) == first_frame
+    assert screen.get_bounding_rect().width > 0
+
+def test_new_counter_values_reuse_digit_glyphs():
+    """Test that the glyph cache renders each digit once, whatever numbers the score goes through."""
+    font = CountingFont()
+    cache = TextCache(font)
+    score = CounterText(cache, "Score: ", WHITE)
+    for value in range(0, 1000, 7):
+        score.set(value)
+    assert sorted(font.calls) == sorted(["Score: "] + [str(d) for d in range(10)])
+    assert score.set(994) is False
+    assert score.size[0] == sum(cache.render(c, WHITE).get_width() for c in "Score: 994")
+
+def test_counter_layout_matches_whole_string_width():
+    """Test that the glyph layout is as wide as the string rendered in one go (within kerning)."""
+    font = pygame.font.Font(None, 36)
+    text = CounterText(TextCache(font), "Bombs: ", ORANGE)
+    text.set(12)
+    assert abs(text.size[0] - font.size("Bombs: 12")[0]) <= 2
+
+def test_level_is_right_aligned():
+    screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA) # Bounding rect = drawn pixels
+    hud = HUD(pygame.font.Font(None, 36))
+    hud.draw(screen, 0, 0, 7)
+    drawn = screen.subsurface((SCREEN_WIDTH // 2, 0, SCREEN_WIDTH // 2, 60)).get_bounding_rect()
+    assert SCREEN_WIDTH // 2 + drawn.right <= SCREEN_WIDTH - 10
+    assert SCREEN_WIDTH // 2 + drawn.right >= SCREEN_WIDTH - 14
+
+def test_text_cache_is_bounded_lru():
+    font = CountingFont()
+    cache = TextCache(font, max_entries=2)
+    cache.render("a", WHITE)
+    cache.render("b", WHITE)
+    cache.render("a", WHITE) # "a" is now the most recently used
+    cache.render("c", WHITE) # Evicts "b"
+    cache.render("a", WHITE)
+    cache.render("b", WHITE)
+    assert font.calls == ["a", "b", "c", "b"]
+    assert len(cache) == 2 and cache.hits == 2 and cache.misses == 4
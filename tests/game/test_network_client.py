@@ -2,11 +2,13 @@
 import pytest
 import requests
 import json
+import threading
 from unittest.mock import patch, MagicMock, ANY # Import ANY for flexible payload matching
 
 # Import the module under test
 from game import network_client
 from game import settings # Need this to potentially check URLs if needed
+from game.outbox import ScoreOutbox
 
 # Reset module state before each test function if needed
 @pytest.fixture(autouse=True)
@@ -14,8 +16,22 @@ def reset_network_client_state(monkeypatch):
     """Resets the login state in network_client before each test."""
     monkeypatch.setattr(network_client, '_is_logged_in', False)
     monkeypatch.setattr(network_client, '_current_username', None)
+    monkeypatch.setattr(network_client, '_auth_token', None)
+    monkeypatch.setattr(network_client, '_auth_expires_at', None)
     mock_session = MagicMock(spec=requests.Session)
     monkeypatch.setattr(network_client, 'api_session', mock_session)
+    worker_session = MagicMock(spec=requests.Session)
+    worker_session.cookies = requests.cookies.RequestsCookieJar()
+    monkeypatch.setattr(network_client, '_worker_session', worker_session)
+
+
+@pytest.fixture(autouse=True)
+def temp_outbox(monkeypatch, tmp_path):
+    """Points the client at an empty outbox file so tests never touch the real one."""
+    outbox = ScoreOutbox(str(tmp_path / "score_outbox.jsonl"))
+    monkeypatch.setattr(network_client, '_outbox', outbox)
+    yield outbox
+    network_client.shutdown_submission_worker()
 
 
 # --- Helper to create Mock Responses (Corrected) ---
@@ -170,6 +186,20 @@ def test_api_submit_score_success(monkeypatch):
         timeout=10
     )
 
+def test_api_submit_score_sends_idempotency_key(monkeypatch):
+    """Test that a submission_id is sent as the Idempotency-Key header."""
+    monkeypatch.setattr(network_client, '_is_logged_in', True)
+    network_client.api_session.post.return_value = create_mock_response(
+        status_code=201, json_data={"success": True, "message": "Score received"})
+
+    assert network_client.api_submit_score(100, 5, submission_id="abc123")[0] is True
+    network_client.api_session.post.assert_called_once_with(
+        f"{settings.SERVER_API_URL}/submit_score",
+        json={"score": 100, "level": 5},
+        headers={'Content-Type': 'application/json', 'Idempotency-Key': "abc123"},
+        timeout=10
+    )
+
 def test_api_submit_score_not_logged_in(monkeypatch):
     """Test score submission fails if user is not logged in."""
     monkeypatch.setattr(network_client, '_is_logged_in', False)
@@ -263,6 +293,19 @@ def test_api_get_leaderboard_success(monkeypatch):
         timeout=10
     )
 
+def test_api_get_leaderboard_unwraps_paginated_response(monkeypatch):
+    """Test that the server's paginated JSON envelope is unwrapped to the rows."""
+    mock_session = MagicMock(spec=requests.Session)
+    rows = [{"rank": 1, "username": "p1", "score": 1000, "timestamp": "2025-05-01T10:00:00"}]
+    mock_response = create_mock_response(
+        status_code=200,
+        json_data={"success": True, "level": None, "leaderboard": rows, "next_cursor": None}
+    )
+    mock_session.get.return_value = mock_response
+    monkeypatch.setattr(network_client, 'api_session', mock_session)
+
+    assert network_client.api_get_leaderboard(limit=5) == rows
+
 def test_api_get_leaderboard_network_error(monkeypatch):
     """Test leaderboard fetch network error."""
     mock_session = MagicMock(spec=requests.Session)
@@ -360,4 +403,192 @@ def test_api_logout_user_network_error(monkeypatch):
     assert success is False
     assert "Network error" in message
     assert network_client._is_logged_in is False
-    assert network_client._current_username is None
\ No newline at end of file
+    assert network_client._current_username is None
+# --- Tests for submit_score_async (background worker) ---
+
+def test_submit_score_async_returns_immediately_and_completes(monkeypatch):
+    """Test that the ticket is pending until the worker finishes, then holds the result."""
+    release = threading.Event()
+    def slow_submit(score, level, *args):
+        release.wait(5)
+        return True, f"Saved {score} on {level}", False
+    monkeypatch.setattr(network_client, '_post_score', slow_submit)
+
+    ticket = network_client.submit_score_async(120, 3)
+    assert ticket.poll() is None # Still in flight, and poll() did not block
+    release.set()
+    assert ticket.wait(5) == (True, "Saved 120 on 3")
+    assert ticket.done
+    network_client.shutdown_submission_worker()
+
+def test_submit_score_async_reports_exceptions(monkeypatch):
+    """Test that an unexpected error becomes a failed result instead of killing the worker."""
+    def broken_submit(score, level, *args):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(network_client, '_post_score', broken_submit)
+
+    ticket = network_client.submit_score_async(1, 1)
+    success, message = ticket.wait(5)
+    assert success is False
+    assert "boom" in message
+
+    monkeypatch.setattr(network_client, '_post_score', lambda *args: (True, "ok", False))
+    assert network_client.submit_score_async(2, 1).wait(5) == (True, "ok")
+    network_client.shutdown_submission_worker()
+
+
+# --- Tests for the offline outbox ---
+
+def test_failed_async_submission_stays_in_outbox(monkeypatch, temp_outbox):
+    """Test that a score that hit a network error is kept for replay, and acked once sent."""
+    network_client._is_logged_in = True
+    network_client._current_username = "testuser"
+    worker_post = network_client._worker_session.post
+    worker_post.side_effect = requests.exceptions.ConnectionError()
+
+    success, message = network_client.submit_score_async(300, 2).wait(5)
+    assert success is False
+    assert "saved offline" in message
+    pending = temp_outbox.pending()
+    assert [(e["score"], e["level"], e["username"]) for e in pending] == [(300, 2, "testuser")]
+
+    # The next successful submission also flushes the backlog with the same submission_id
+    worker_post.side_effect = None
+    worker_post.return_value = create_mock_response(
+        201, {"success": True, "message": "ok", "results": [{"index": 0, "success": True}]})
+    assert network_client.submit_score_async(50, 1).wait(5)[0] is True
+    network_client.shutdown_submission_worker()
+    assert temp_outbox.pending() == []
+    network_client.api_session.post.assert_not_called() # Never shared with the worker thread
+    batch_calls = [c for c in worker_post.call_args_list
+                   if c.args[0].endswith("/submit_scores")]
+    assert batch_calls[0].kwargs["json"]["scores"][0]["submission_id"] == pending[0]["id"]
+
+def test_login_replays_outbox_in_batches(monkeypatch, temp_outbox):
+    """Test that a successful login resends pending scores in batches and acks them."""
+    for i in range(network_client.OUTBOX_REPLAY_BATCH_SIZE + 5):
+        temp_outbox.add(i, 1, username="testuser")
+    temp_outbox.add(999, 1, username="someone_else") # Must not be sent for testuser
+
+    network_client.api_session.post.return_value = create_mock_response(
+        200, {"success": True, "username": "testuser"})
+    network_client._worker_session.post.side_effect = lambda url, json=None, **kwargs: create_mock_response(
+        201, {"success": True, "results": [{"index": i, "success": True} for i in range(len(json["scores"]))]})
+
+    assert network_client.api_login_user("testuser", "pw")[0] is True
+    network_client._submission_queue.join()
+    assert [e["score"] for e in temp_outbox.pending()] == [999]
+    batch_sizes = [len(c.kwargs["json"]["scores"]) for c in network_client._worker_session.post.call_args_list
+                   if c.args[0].endswith("/submit_scores")]
+    assert batch_sizes == [network_client.OUTBOX_REPLAY_BATCH_SIZE, 5]
+
+def test_queued_score_is_sent_as_the_user_who_queued_it(monkeypatch, temp_outbox):
+    """Test that logging in as someone else while a score waits in the queue doesn't change its owner."""
+    network_client._set_auth("alice", "token-a")
+    release = threading.Event()
+    def blocking_post(url, **kwargs):
+        release.wait(5)
+        return create_mock_response(201, {"success": True, "message": "ok"})
+    worker_post = network_client._worker_session.post
+    worker_post.side_effect = blocking_post
+
+    first = network_client.submit_score_async(1, 1) # Worker blocks on this one
+    second = network_client.submit_score_async(2, 1)
+    network_client.api_logout_user()
+    network_client._set_auth("bob", "token-b")
+    release.set()
+
+    assert first.wait(5)[0] is True and second.wait(5)[0] is True
+    assert [c.kwargs["headers"]["Authorization"] for c in worker_post.call_args_list] == ["Bearer token-a"] * 2
+    assert temp_outbox.pending() == []
+
+def test_worker_401_keeps_a_newer_login(monkeypatch, temp_outbox):
+    """Test that a 401 for an old login's score doesn't log out the user who logged in since."""
+    network_client._set_auth("alice", "token-a")
+    release = threading.Event()
+    def expired_post(url, **kwargs):
+        release.wait(5)
+        return create_mock_response(401, {"message": "Token expired"})
+    network_client._worker_session.post.side_effect = expired_post
+
+    ticket = network_client.submit_score_async(5, 1)
+    network_client._set_auth("bob", "token-b")
+    release.set()
+
+    assert "saved offline" in ticket.wait(5)[1]
+    assert network_client.check_login_status() == (True, "bob")
+    assert [e["username"] for e in temp_outbox.pending()] == ["alice"]
+
+def test_cookie_login_is_copied_to_the_worker_session(monkeypatch):
+    """Test that without a token the worker sends the session cookie captured at queue time."""
+    network_client._set_auth("carol", None)
+    network_client.api_session.cookies = requests.cookies.RequestsCookieJar()
+    network_client.api_session.cookies.set("session", "carol-cookie")
+    seen = []
+    def record_cookies(url, **kwargs):
+        seen.append(dict(network_client._worker_session.cookies))
+        return create_mock_response(201, {"success": True, "message": "ok"})
+    network_client._worker_session.post.side_effect = record_cookies
+
+    ticket = network_client.submit_score_async(7, 2)
+    network_client.api_session.cookies.clear() # Main thread logs out: the queued score is unaffected
+    assert ticket.wait(5)[0] is True
+    assert seen == [{"session": "carol-cookie"}]
+
+def test_retry_delay_grows_and_is_capped():
+    """Test the exponential backoff schedule (with jitter in [0.5, 1.0] of the nominal delay)."""
+    base = network_client.OUTBOX_RETRY_BASE_DELAY
+    assert base * 0.5 <= network_client._retry_delay(0) <= base
+    assert base * 4 * 0.5 <= network_client._retry_delay(2) <= base * 4
+    assert network_client._retry_delay(50) <= network_client.OUTBOX_RETRY_MAX_DELAY
+
+
+# --- Tests for bearer-token mode ---
+
+def test_login_token_is_sent_as_bearer_header(monkeypatch):
+    """Test that a token from /api/login authenticates later submissions and logout is local."""
+    network_client.api_session.post.return_value = create_mock_response(
+        200, {"success": True, "username": "tester", "token": "signed.token"})
+    assert network_client.api_login_user("tester", "pw")[0] is True
+
+    network_client.api_session.post.return_value = create_mock_response(201, {"success": True})
+    network_client.api_submit_score(10, 1)
+    headers = network_client.api_session.post.call_args.kwargs["headers"]
+    assert headers["Authorization"] == "Bearer signed.token"
+
+    calls_before_logout = network_client.api_session.post.call_count
+    assert network_client.api_logout_user() == (True, "Logout successful")
+    assert network_client.api_session.post.call_count == calls_before_logout # Nothing to revoke server-side
+    assert network_client._auth_token is None
+    assert network_client.check_login_status() == (False, None)
+
+def test_token_is_refreshed_before_it_expires(monkeypatch):
+    """Test that a token close to expiry is renewed via /api/token/refresh before the submission."""
+    network_client._set_auth("tester", "old.token", expires_in=network_client.TOKEN_REFRESH_MARGIN - 1)
+    def post(url, **kwargs):
+        if url.endswith("/token/refresh"):
+            return create_mock_response(200, {"success": True, "token": "new.token", "expires_in": 3600})
+        return create_mock_response(201, {"success": True})
+    network_client.api_session.post.side_effect = post
+
+    assert network_client.api_submit_score(10, 1)[0] is True
+    refresh, submit = network_client.api_session.post.call_args_list
+    assert refresh.kwargs["headers"]["Authorization"] == "Bearer old.token"
+    assert submit.kwargs["headers"]["Authorization"] == "Bearer new.token"
+    assert network_client._auth_token == "new.token"
+
+    network_client.api_submit_score(20, 1) # Fresh for another hour: no second refresh
+    assert network_client.api_session.post.call_count == 3
+
+def test_expired_token_keeps_the_score_offline(monkeypatch, temp_outbox):
+    """Test that once the token has expired (refresh refused) the score is kept and the user logged out."""
+    network_client._set_auth("tester", "stale.token", expires_in=-1)
+    network_client._worker_session.post.return_value = create_mock_response(401, {"message": "Unauthorized"})
+
+    ticket = network_client.submit_score_async(15, 2)
+
+    assert "saved offline" in ticket.wait(5)[1]
+    urls = [c.args[0] for c in network_client._worker_session.post.call_args_list]
+    assert urls[0].endswith("/token/refresh") and urls[1].endswith("/submit_score")
+    assert network_client.check_login_status() == (False, None)
+    assert [e["score"] for e in temp_outbox.pending()] == [15]
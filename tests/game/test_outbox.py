@@ -0,0 +1,71 @@
+# test_outbox.py
+import json
+import pytest
+
+from game import outbox as outbox_module
+from game.outbox import ScoreOutbox
+
+
+@pytest.fixture
+def outbox_path(tmp_path):
+    return str(tmp_path / "score_outbox.jsonl")
+
+
+def test_add_and_ack(outbox_path):
+    """Test that entries stay pending until acknowledged."""
+    box = ScoreOutbox(outbox_path)
+    first = box.add(100, 1, username="alice")
+    second = box.add(200, 2, username="alice")
+    assert first["id"] != second["id"]
+    assert [e["score"] for e in box.pending()] == [100, 200]
+
+    box.ack([first["id"]])
+    assert [e["id"] for e in box.pending()] == [second["id"]]
+    assert len(box) == 1
+
+def test_pending_survives_restart(outbox_path):
+    """Test that a new outbox on the same file sees what was not acknowledged."""
+    box = ScoreOutbox(outbox_path)
+    kept = box.add(100, 1, username="alice")
+    sent = box.add(200, 2, username="alice")
+    box.ack([sent["id"]])
+
+    reopened = ScoreOutbox(outbox_path)
+    assert [e["id"] for e in reopened.pending()] == [kept["id"]]
+
+def test_torn_last_line_is_ignored(outbox_path):
+    """Test that a partially written record (crash mid-append) does not break loading."""
+    box = ScoreOutbox(outbox_path)
+    kept = box.add(100, 1)
+    with open(outbox_path, "a", encoding="utf-8") as f:
+        f.write('{"op": "add", "id": "abc", "sco')
+    assert [e["id"] for e in ScoreOutbox(outbox_path).pending()] == [kept["id"]]
+
+def test_pending_filters_by_username(outbox_path):
+    """Test that replay only picks up the logged-in user's scores."""
+    box = ScoreOutbox(outbox_path)
+    box.add(1, 1, username="alice")
+    box.add(2, 1, username="bob")
+    assert [e["score"] for e in box.pending(username="bob")] == [2]
+
+def test_ownerless_entries_are_not_replayed_for_anyone(outbox_path):
+    """Test that a score recorded while logged out is kept but never attributed to the next login."""
+    box = ScoreOutbox(outbox_path)
+    box.add(1, 1)
+    box.add(2, 1, username="alice")
+    assert [e["score"] for e in box.pending(username="alice")] == [2]
+    assert [e["score"] for e in box.pending()] == [1, 2]
+
+def test_compaction_drops_acknowledged_records(outbox_path, monkeypatch):
+    """Test that the log is rewritten with only pending entries once enough acks pile up."""
+    monkeypatch.setattr(outbox_module, "COMPACT_AFTER_ACKS", 3)
+    box = ScoreOutbox(outbox_path)
+    keep = box.add(0, 1)
+    sent = [box.add(i, 1)["id"] for i in range(1, 4)]
+    box.ack(sent)
+
+    with open(outbox_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert records == [keep]
+    box.ack([keep["id"]])
+    assert ScoreOutbox(outbox_path).pending() == []
@@ -154,8 +154,8 @@ def test_player_initial_state(player_instance):
     assert player_instance.rect.centerx == SCREEN_WIDTH // 2
     assert player_instance.rect.bottom == SCREEN_HEIGHT - PLAYER_BOTTOM_MARGIN
 
-@patch('game.player.Bullet', spec=True)
-def test_player_shoot_single(mock_bullet_class, player_instance, mock_sounds_dict, mocker):
+@patch('game.player.player_bullet_pool')
+def test_player_shoot_single(mock_bullet_pool, player_instance, mock_sounds_dict, mocker):
     """Test shooting a single bullet when allowed."""
     start_time = player_instance.last_shot_time
     mocker.patch('pygame.time.get_ticks', return_value=start_time + PLAYER_SHOOT_DELAY + 1)
@@ -166,12 +166,12 @@ def test_player_shoot_single(mock_bullet_class, player_instance, mock_sounds_dic
     new_bullets = player_instance.shoot()
 
     assert len(new_bullets) == 1
-    mock_bullet_class.assert_called_once_with(center_x, top_y)
+    mock_bullet_pool.acquire.assert_called_once_with(center_x, top_y)
     mock_sounds_dict['player_shoot'].play.assert_called_once()
     assert player_instance.last_shot_time == start_time + PLAYER_SHOOT_DELAY + 1
 
-@patch('game.player.Bullet', spec=True)
-def test_player_shoot_double(mock_bullet_class, player_instance, mock_sounds_dict, mocker):
+@patch('game.player.player_bullet_pool')
+def test_player_shoot_double(mock_bullet_pool, player_instance, mock_sounds_dict, mocker):
     """Test shooting double bullets when powerup active."""
     start_time = player_instance.last_shot_time
     mocker.patch('pygame.time.get_ticks', return_value=start_time + PLAYER_SHOOT_DELAY + 1)
@@ -184,18 +184,18 @@ def test_player_shoot_double(mock_bullet_class, player_instance, mock_sounds_dic
     new_bullets = player_instance.shoot()
 
     assert len(new_bullets) == 2
-    assert mock_bullet_class.call_count == 2
+    assert mock_bullet_pool.acquire.call_count == 2
     calls = [
         call(center_x - PLAYER_DOUBLE_SHOT_OFFSET, top_y),
         call(center_x + PLAYER_DOUBLE_SHOT_OFFSET, top_y)
     ]
-    mock_bullet_class.assert_has_calls(calls, any_order=True)
+    mock_bullet_pool.acquire.assert_has_calls(calls, any_order=True)
     mock_sounds_dict['player_shoot'].play.assert_called_once()
     assert player_instance.last_shot_time == start_time + PLAYER_SHOOT_DELAY + 1
 
 
-@patch('game.player.Bullet', spec=True)
-def test_player_shoot_delay(mock_bullet_class, player_instance, mock_sounds_dict, mocker):
+@patch('game.player.player_bullet_pool')
+def test_player_shoot_delay(mock_bullet_pool, player_instance, mock_sounds_dict, mocker):
     """Test that shooting is prevented by the delay."""
     start_time = player_instance.last_shot_time
     mocker.patch('pygame.time.get_ticks', return_value=start_time + PLAYER_SHOOT_DELAY - 1)
@@ -203,7 +203,7 @@ def test_player_shoot_delay(mock_bullet_class, player_instance, mock_sounds_dict
     new_bullets = player_instance.shoot()
 
     assert len(new_bullets) == 0
-    mock_bullet_class.assert_not_called()
+    mock_bullet_pool.acquire.assert_not_called()
     mock_sounds_dict['player_shoot'].play.assert_not_called()
 
 def test_player_activate_powerup_bomb(player_instance, mock_sounds_dict):
@@ -328,12 +328,14 @@ def test_player_use_bomb_no_bombs(player_instance, mock_groups_dict, mock_sounds
 @patch('pygame.draw.circle')
 @patch('pygame.Surface', spec=True) # Patch the CLASS pygame.Surface
 def test_player_draw_shield_when_active(mock_surface_class, mock_draw_circle, player_instance, mocker):
-    """Test that the shield is drawn only when active."""
+    """Test that the shield is drawn only when active, from an overlay built once per radius and color."""
+    mocker.patch.dict('game.player._shield_overlays', clear=True)
 
     # --- Configure the MOCK INSTANCE that the patched Surface CLASS will return ---
     mock_shield_surface_instance = mock_surface_class.return_value
-    mock_temp_rect = MagicMock(spec=pygame.Rect) # Mock the rect returned by get_rect
-    mock_shield_surface_instance.get_rect.return_value = mock_temp_rect
+    expected_diameter = max(1, player_instance.shield_visual_radius * 2)
+    mock_shield_surface_instance.get_width.return_value = expected_diameter
+    mock_shield_surface_instance.get_height.return_value = expected_diameter
 
     # Mock the target surface to draw onto
     # REMOVED spec=pygame.Surface because pygame.Surface is already patched here
@@ -353,7 +355,6 @@ def test_player_draw_shield_when_active(mock_surface_class, mock_draw_circle, pl
     mock_draw_circle.reset_mock()
     mock_surface_class.reset_mock()
     mock_target_surface.blit.reset_mock() # Reset blit on target
-    mock_shield_surface_instance.get_rect.reset_mock()
 
 
     # --- Test Case 2: Shield IS active ---
@@ -366,7 +367,6 @@ def test_player_draw_shield_when_active(mock_surface_class, mock_draw_circle, pl
     # --- Assertions ---
     # 1. Assert the Surface CLASS was called correctly
     expected_radius = player_instance.shield_visual_radius
-    expected_diameter = max(1, expected_radius * 2)
     mock_surface_class.assert_called_once_with(
         (expected_diameter, expected_diameter), pygame.SRCALPHA
     )
@@ -379,12 +379,15 @@ def test_player_draw_shield_when_active(mock_surface_class, mock_draw_circle, pl
         # Add width arg if needed: , shield_line_width
     )
 
-    # 3. Assert get_rect was called on the INSTANCE
-    mock_shield_surface_instance.get_rect.assert_called_once_with(
-        center=player_instance.rect.center
+    # 3. Assert blit was called on the TARGET surface, centred on the player
+    expected_topleft = (player_instance.rect.centerx - expected_diameter // 2,
+                        player_instance.rect.centery - expected_diameter // 2)
+    mock_target_surface.blit.assert_called_once_with(
+        mock_shield_surface_instance, expected_topleft
     )
 
-    # 4. Assert blit was called on the TARGET surface
-    mock_target_surface.blit.assert_called_once_with(
-        mock_shield_surface_instance, mock_temp_rect
-    )
\ No newline at end of file
+    # 4. Later frames reuse the overlay: no new Surface, no redraw
+    player_instance.draw_shield(mock_target_surface)
+    mock_surface_class.assert_called_once()
+    mock_draw_circle.assert_called_once()
+    assert mock_target_surface.blit.call_count == 2
\ No newline at end of file
@@ -0,0 +1,72 @@
+# tests/game/test_player_perf.py
+# Per-frame allocation checks for Player (update + shield) with real pygame surfaces.
+# Kept apart from test_player.py, whose fixtures mock the player image.
+import os
+import pygame
+import pytest
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+pygame.init()
+
+from game.player import Player
+from game.settings import SCREEN_HEIGHT, SCREEN_WIDTH
+
+FRAMES = 1000
+RealSurface = pygame.Surface
+
+
+class CountingSurface(RealSurface):
+    """pygame.Surface that counts constructions and copies."""
+    created = 0
+    copies = 0
+
+    def __init__(self, *args, **kwargs):
+        CountingSurface.created += 1
+        super().__init__(*args, **kwargs)
+
+    def copy(self):
+        CountingSurface.copies += 1
+        return super().copy()
+
+# test_player.py's init fallback swaps these pygame attributes for mocks for the rest of the session
+_REAL_PYGAME = {name: getattr(pygame, name) for name in ("Rect", "sprite", "time", "mouse", "draw")}
+
+@pytest.fixture
+def counting_surfaces(monkeypatch):
+    for name, value in _REAL_PYGAME.items():
+        monkeypatch.setattr(pygame, name, value)
+    pygame.init() # test_player.py calls pygame.quit() in its module teardown
+    monkeypatch.setattr(pygame, "Surface", CountingSurface)
+    monkeypatch.setattr("game.player._shield_overlays", {})
+    CountingSurface.created = CountingSurface.copies = 0
+    return CountingSurface
+
+def _run_frames(player, screen, frames):
+    for _ in range(frames):
+        player.update()
+        player.draw_shield(screen)
+
+def test_player_frames_allocate_no_surfaces(counting_surfaces):
+    """Test that, once warmed up, update() + draw_shield() allocate no surfaces at all."""
+    screen = RealSurface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    player = Player(CountingSurface((55, 45)), None, None, None, None, None)
+    player.activate_powerup('shield')
+    _run_frames(player, screen, 1) # Builds the shield overlay for this radius/color
+    counting_surfaces.created = counting_surfaces.copies = 0
+
+    _run_frames(player, screen, FRAMES)
+
+    assert player.shield_active
+    assert counting_surfaces.created == 0, "new Surface per frame"
+    assert counting_surfaces.copies == 0, "image copy per frame"
+
+def test_shield_overlay_shared_between_players(counting_surfaces):
+    """Test one overlay per (radius, color) for the whole game, not per Player or per frame."""
+    screen = RealSurface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    players = [Player(CountingSurface((55, 45)), None, None, None, None, None) for _ in range(3)]
+    counting_surfaces.created = 0
+    for player in players:
+        player.activate_powerup('shield')
+        player.draw_shield(screen)
+    assert counting_surfaces.created == 1
+    assert screen.get_at(players[0].rect.center) != (0, 0, 0, 255)
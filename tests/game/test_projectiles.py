@@ -0,0 +1,109 @@
+# tests/game/test_projectiles.py
+import os
+import random
+import pygame
+import pytest
+from pygame.math import Vector2
+
+np = pytest.importorskip("numpy")
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+pygame.init()
+
+from game.bullet import Bullet, EnemyBullet
+from game.projectiles import ProjectileManager
+from game.settings import BULLET_SPEED, ENEMY_BULLET_COLOR, SCREEN_HEIGHT, SCREEN_WIDTH, YELLOW
+
+
+# test_player.py's init fallback swaps these pygame attributes for mocks for the rest of the session
+_REAL_PYGAME = {name: getattr(pygame, name) for name in ("Surface", "Rect", "sprite", "draw")}
+
+@pytest.fixture(autouse=True)
+def real_pygame(monkeypatch):
+    for name, value in _REAL_PYGAME.items():
+        monkeypatch.setattr(pygame, name, value)
+
+
+class Box(pygame.sprite.Sprite):
+    def __init__(self, x, y, w, h):
+        super().__init__()
+        self.rect = pygame.Rect(x, y, w, h)
+
+def test_update_moves_and_culls_off_screen():
+    manager = ProjectileManager(capacity=1) # Also exercises growing the arrays
+    manager.fire_player(100, 300)
+    manager.fire_player(200, 5)
+    manager.fire_enemy(50, SCREEN_HEIGHT - 5)
+    manager.fire_enemy(SCREEN_WIDTH - 30, 100, direction=Vector2(1, 0))
+    manager.update()
+    assert manager.player_shots.bounds()[0, :2].tolist() == [100 - 2, 300 - 6 - BULLET_SPEED]
+    assert len(manager.player_shots) == 2 # The second is still partly on screen
+    assert len(manager.enemy_shots) == 1 # The bottom one left the screen
+    for _ in range(3):
+        manager.update()
+    assert len(manager.player_shots) == 1
+    assert len(manager.enemy_shots) == 0
+
+def test_enemy_shot_placement_matches_enemy_bullet():
+    """Test that a vectorized shot starts and moves exactly like the EnemyBullet sprite."""
+    direction = Vector2(3, 4).normalize()
+    sprite = EnemyBullet(400, 120, direction=direction)
+    manager = ProjectileManager()
+    manager.fire_enemy(400, 120, direction=direction)
+    left, top, right, bottom = manager.enemy_shots.bounds()[0]
+    assert (left, top, right, bottom) == tuple(map(float, (sprite.rect.left, sprite.rect.top,
+                                                           sprite.rect.right, sprite.rect.bottom)))
+    sprite.update()
+    manager.update()
+    left, top = manager.enemy_shots.pos[0]
+    assert abs(left - sprite.rect.left) <= 1 and abs(top - sprite.rect.top) <= 1
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_collide_enemies_matches_groupcollide(seed):
+    """Test same enemies killed, same shots consumed per enemy as groupcollide(enemies, bullets, True, True)."""
+    rng = random.Random(seed)
+    spots = [(rng.randint(0, 980), rng.randint(0, 580)) for _ in range(40)]
+    shots = [(rng.randint(0, 1000), rng.randint(0, 600)) for _ in range(300)]
+
+    sprite_enemies = pygame.sprite.Group(Box(x, y, 45, 35) for x, y in spots)
+    bullets = pygame.sprite.Group(Bullet(x, y) for x, y in shots)
+    expected = pygame.sprite.groupcollide(sprite_enemies, bullets, True, True)
+
+    enemies = pygame.sprite.Group(Box(x, y, 45, 35) for x, y in spots)
+    order = enemies.sprites()
+    manager = ProjectileManager()
+    for x, y in shots:
+        manager.fire_player(x, y)
+    actual = manager.collide_enemies(enemies)
+
+    assert expected
+    assert sorted((order.index(e), n) for e, n in actual.items()) == \
+           sorted((spots.index(e.rect.topleft), len(b)) for e, b in expected.items())
+    assert len(enemies) == len(sprite_enemies)
+    assert len(manager.player_shots) == len(bullets)
+
+def test_boss_and_player_hits_consume_shots():
+    manager = ProjectileManager()
+    boss = Box(100, 100, 120, 90)
+    for x in (110, 150, 400):
+        manager.fire_player(x, 150)
+    assert manager.collide_sprite(boss) == 2
+    assert len(manager.player_shots) == 1
+
+    player = Box(500, 500, 55, 45)
+    manager.fire_enemy(520, 490)
+    manager.fire_enemy(800, 100)
+    assert manager.hits_player(player) is True
+    assert manager.hits_player(player) is False
+    manager.clear_enemy_shots()
+    assert len(manager.enemy_shots) == 0
+
+def test_draw_blits_every_projectile():
+    surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    manager = ProjectileManager()
+    manager.fire_player(100, 100)
+    manager.fire_enemy(300, 300)
+    manager.draw(surface)
+    assert surface.get_at((100, 100))[:3] == YELLOW
+    assert surface.get_at((300, 305))[:3] == ENEMY_BULLET_COLOR
+    assert surface.get_at((200, 200))[:3] == (0, 0, 0)
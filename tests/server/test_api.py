@@ -1,6 +1,8 @@
 # tests/server/test_api.py
 import pytest
 import json
+from datetime import datetime, timedelta
+from flask import current_app, g
 from server.app import create_app # Adjust import based on your app factory location
 from server.extensions import db
 from server.models import User, Score
@@ -212,3 +214,339 @@ def test_api_submit_score_not_json(test_client_db):
     assert response.status_code == 415 # Unsupported Media Type
     assert "Request must be JSON" in response.get_json()['message']
 
+
+# ===================================
+# === /api/leaderboard Tests ===
+# ===================================
+
+def _add_players(db, count, level=1):
+    """Creates `count` users, each with one score on `level` (higher index = higher score)."""
+    users = [User(username=f"lb_player{i}", password_hash="x") for i in range(count)]
+    db.session.add_all(users)
+    db.session.commit()
+    db.session.add_all([Score(user_id=u.id, score_value=(i + 1) * 10, level=level) for i, u in enumerate(users)])
+    db.session.commit()
+
+def test_api_leaderboard_level_keyset_pagination(test_client_db):
+    """Test that pages chain via next_cursor with continuous ranks and no overlap."""
+    client, db, _ = test_client_db
+    _add_players(db, 5)
+
+    first = client.get('/api/leaderboard/level/1?limit=2').get_json()
+    assert first['success'] is True
+    assert [row['score'] for row in first['leaderboard']] == [50, 40]
+    assert [row['rank'] for row in first['leaderboard']] == [1, 2]
+    assert first['next_cursor']
+
+    second = client.get(f"/api/leaderboard/level/1?limit=2&cursor={first['next_cursor']}").get_json()
+    assert [row['score'] for row in second['leaderboard']] == [30, 20]
+    assert [row['rank'] for row in second['leaderboard']] == [3, 4]
+
+    third = client.get(f"/api/leaderboard/level/1?limit=2&cursor={second['next_cursor']}").get_json()
+    assert [row['score'] for row in third['leaderboard']] == [10]
+    assert third['next_cursor'] is None
+
+def test_api_leaderboard_overall_beyond_top_n(test_client_db):
+    """Test that the overall board can be paged past the 30-player web limit."""
+    client, db, _ = test_client_db
+    _add_players(db, 35)
+
+    first = client.get('/api/leaderboard?limit=30').get_json()
+    assert len(first['leaderboard']) == 30
+    rest = client.get(f"/api/leaderboard?limit=30&cursor={first['next_cursor']}").get_json()
+    assert len(rest['leaderboard']) == 5
+    assert rest['leaderboard'][-1]['rank'] == 35
+    assert rest['next_cursor'] is None
+
+def test_api_leaderboard_etag_not_modified(test_client_db):
+    """Test that a matching If-None-Match gets a 304 until a new score is written."""
+    client, db, test_user_id = test_client_db
+    _add_players(db, 2)
+
+    response = client.get('/api/leaderboard')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert response.headers.get('Last-Modified')
+
+    cached = client.get('/api/leaderboard', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+
+    db.session.add(Score(user_id=test_user_id, score_value=1, level=2))
+    db.session.commit()
+
+    refreshed = client.get('/api/leaderboard', headers={'If-None-Match': etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers['ETag'] != etag
+
+def test_api_leaderboard_if_modified_since_same_second_write(test_client_db):
+    """Test that a write in the same second as Last-Modified isn't hidden behind a 304."""
+    client, db, test_user_id = test_client_db
+    _add_players(db, 2)
+
+    last_modified = client.get('/api/leaderboard').headers['Last-Modified']
+    db.session.add(Score(user_id=test_user_id, score_value=99_999, level=1))
+    db.session.commit()
+
+    response = client.get('/api/leaderboard', headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 200
+    assert response.get_json()['leaderboard'][0]['score'] >= 99_999
+
+def test_api_leaderboard_invalid_params(test_client_db):
+    """Test that bad limit or cursor values are rejected with 400."""
+    client, db, _ = test_client_db
+    assert client.get('/api/leaderboard?limit=0').status_code == 400
+    assert client.get('/api/leaderboard?limit=abc').status_code == 400
+    assert client.get('/api/leaderboard?cursor=not-a-cursor').status_code == 400
+
+def test_api_leaderboard_period(test_client_db):
+    """Test that ?period= ranks only the current bucket and gets its own ETag."""
+    client, db, test_user_id = test_client_db
+    _add_players(db, 2) # Stamped now
+    db.session.add(Score(user_id=test_user_id, score_value=10_000, level=1,
+                         timestamp=datetime.utcnow() - timedelta(days=8)))
+    db.session.commit()
+
+    all_time = client.get('/api/leaderboard/level/1')
+    weekly = client.get('/api/leaderboard/level/1?period=weekly')
+    assert all_time.get_json()['leaderboard'][0]['score'] == 10_000
+    data = weekly.get_json()
+    assert data['period'] == "weekly"
+    assert [row['score'] for row in data['leaderboard']] == [20, 10]
+    assert weekly.headers['ETag'] != all_time.headers['ETag']
+    assert [row['score'] for row in client.get('/api/leaderboard?period=daily').get_json()['leaderboard']] == [20, 10]
+    assert client.get('/api/leaderboard?period=monthly').status_code == 400
+
+# ===================================
+# === /api/submit_scores Tests ===
+# ===================================
+
+@pytest.fixture(scope='function')
+def logged_in_client():
+    """Client with Flask-Login enabled and a session logged in as 'batch_user'."""
+    test_config = {
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "LOGIN_DISABLED": False,
+        "SECRET_KEY": "test-secret-key",
+        "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+    }
+    app = create_app(config_override=test_config)
+    with app.app_context():
+        db.create_all()
+        user = User(username="batch_user")
+        user.set_password("password")
+        db.session.add(user)
+        db.session.commit()
+        client = app.test_client()
+        response = client.post('/api/login', json={'username': 'batch_user', 'password': 'password'})
+        assert response.status_code == 200
+        yield client, user.id
+        db.session.remove()
+        db.drop_all()
+
+def test_api_submit_scores_batch_success(logged_in_client):
+    """Test that a batch is saved in one request with one result per entry."""
+    client, user_id = logged_in_client
+    payload = {"scores": [
+        {"score": 10, "level": 1, "client_timestamp": "2025-05-01T10:00:00"},
+        {"score": 20, "level": 2, "client_timestamp": "2025-05-01T10:05:00"},
+        {"score": 30, "level": 2},
+    ]}
+    response = client.post('/api/submit_scores', json=payload)
+    data = response.get_json()
+
+    assert response.status_code == 201
+    assert data['success'] is True
+    assert [r['index'] for r in data['results']] == [0, 1, 2]
+    assert all(r['success'] and isinstance(r['id'], int) for r in data['results'])
+    assert data['results'][0]['client_timestamp'] == "2025-05-01T10:00:00"
+    assert Score.query.filter_by(user_id=user_id).count() == 3
+
+    from server.models import BestScore
+    assert db.session.get(BestScore, (user_id, 2)).best_score == 30
+
+def test_api_submit_scores_partial_batch(logged_in_client):
+    """Test that invalid entries are reported per item while valid ones are saved."""
+    client, user_id = logged_in_client
+    payload = {"scores": [
+        {"score": 10, "level": 1},
+        {"score": "lots", "level": 1},
+        {"level": 1},
+    ]}
+    response = client.post('/api/submit_scores', json=payload)
+    data = response.get_json()
+
+    assert response.status_code == 207
+    assert data['success'] is False
+    assert data['results'][0]['success'] is True
+    assert data['results'][1]['message'] == "Invalid data types for score or level"
+    assert data['results'][2]['message'] == "Missing score or level"
+    assert Score.query.filter_by(user_id=user_id).count() == 1
+
+def test_api_submit_scores_rejects_bad_batches(logged_in_client):
+    """Test empty, oversized and fully invalid batches."""
+    client, user_id = logged_in_client
+    assert client.post('/api/submit_scores', json={"scores": []}).status_code == 400
+    too_many = {"scores": [{"score": 1, "level": 1}] * 51}
+    assert client.post('/api/submit_scores', json=too_many).status_code == 413
+    response = client.post('/api/submit_scores', json={"scores": [{"score": None, "level": 1}]})
+    assert response.status_code == 400
+    assert Score.query.count() == 0
+
+def test_api_submit_score_dedups_submission_id(logged_in_client):
+    """Test that retrying a submission with the same submission_id stores it only once."""
+    client, user_id = logged_in_client
+    payload = {"score": 70, "level": 1, "submission_id": "a1b2c3"}
+    first = client.post('/api/submit_score', json=payload)
+    retry = client.post('/api/submit_score', json=payload)
+
+    assert first.status_code == 201
+    assert retry.status_code == 201
+    assert retry.get_json()['duplicate'] is True
+    assert Score.query.filter_by(user_id=user_id).count() == 1
+
+def test_api_submit_scores_dedups_submission_ids(logged_in_client):
+    """Test that replayed batches skip entries already stored, including repeats within the batch."""
+    client, user_id = logged_in_client
+    client.post('/api/submit_score', json={"score": 5, "level": 1, "submission_id": "old"})
+    payload = {"scores": [
+        {"score": 5, "level": 1, "submission_id": "old"},
+        {"score": 6, "level": 1, "submission_id": "new"},
+        {"score": 6, "level": 1, "submission_id": "new"},
+        {"score": 7, "level": 1, "submission_id": 12},
+    ]}
+    response = client.post('/api/submit_scores', json=payload)
+    results = response.get_json()['results']
+
+    assert response.status_code == 207
+    assert [r.get('duplicate', False) for r in results[:3]] == [True, False, True]
+    assert results[1]['id'] == results[2]['id']
+    assert results[3]['message'] == "Invalid submission_id"
+    assert Score.query.filter_by(user_id=user_id).count() == 2
+
+def test_api_submit_score_idempotency_key_header(logged_in_client):
+    """Test that a repeated Idempotency-Key replays the original result without another INSERT."""
+    client, user_id = logged_in_client
+    headers = {'Idempotency-Key': 'retry-key-1'}
+    first = client.post('/api/submit_score', json={"score": 90, "level": 3}, headers=headers)
+    retry = client.post('/api/submit_score', json={"score": 90, "level": 3}, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.get_json()['message'] == first.get_json()['message']
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert 'Idempotent-Replayed' not in first.headers
+    assert Score.query.filter_by(user_id=user_id).count() == 1
+    assert Score.query.filter_by(user_id=user_id).one().submission_id == 'retry-key-1'
+
+def test_api_submit_score_rejects_bad_idempotency_key(logged_in_client):
+    """Test that oversized or conflicting keys are rejected before anything is written."""
+    client, user_id = logged_in_client
+    too_long = client.post('/api/submit_score', json={"score": 1, "level": 1},
+                           headers={'Idempotency-Key': 'x' * 65})
+    mismatch = client.post('/api/submit_score', json={"score": 1, "level": 1, "submission_id": "a"},
+                           headers={'Idempotency-Key': 'b'})
+
+    assert too_long.status_code == 400
+    assert mismatch.status_code == 400
+    assert Score.query.filter_by(user_id=user_id).count() == 0
+
+def test_api_logout_invalidates_cached_user(logged_in_client):
+    """Test that logging out drops the user from the user_loader cache."""
+    from server.extensions import user_cache
+    from server.models import load_user
+    client, user_id = logged_in_client
+    load_user(str(user_id)) # What Flask-Login does on the next authenticated request
+    assert user_cache.store.get(user_id) is not None
+
+    assert client.post('/api/logout').status_code == 200
+    assert user_cache.store.get(user_id) is None
+
+def test_api_bearer_token_authenticates_without_session(logged_in_client):
+    """Test that the token from /api/login works on a client with no session cookie."""
+    client, user_id = logged_in_client
+    login = client.post('/api/login', json={'username': 'batch_user', 'password': 'password'}).get_json()
+    assert login['token_type'] == "Bearer" and login['expires_in'] > 0
+
+    stateless = current_app.test_client() # Fresh cookie jar
+    g.pop('_login_user', None) # The fixture's shared app context still holds the session user
+    headers = {'Authorization': f"Bearer {login['token']}"}
+    response = stateless.post('/api/submit_score', json={"score": 33, "level": 2}, headers=headers)
+    assert response.status_code == 201
+    assert Score.query.filter_by(user_id=user_id, score_value=33).count() == 1
+
+def test_api_rejects_forged_or_missing_token(logged_in_client):
+    """Test that a tampered token or no credentials yields 401 (not a redirect)."""
+    client, user_id = logged_in_client
+    token = client.post('/api/login', json={'username': 'batch_user', 'password': 'password'}).get_json()['token']
+    stateless = current_app.test_client()
+    for headers in ({'Authorization': f"Bearer {token[:-2]}xx"}, {}):
+        g.pop('_login_user', None)
+        response = stateless.post('/api/submit_score', json={"score": 1, "level": 1}, headers=headers)
+        assert response.status_code == 401
+    assert Score.query.filter_by(user_id=user_id).count() == 0
+
+def test_api_token_expires(logged_in_client):
+    """Test that tokens older than API_TOKEN_MAX_AGE are refused."""
+    from server.tokens import issue_token, verify_token
+    user = db.session.get(User, logged_in_client[1])
+    token = issue_token(user)
+    assert verify_token(token).id == user.id
+    current_app.config['API_TOKEN_MAX_AGE'] = -1
+    assert verify_token(token) is None
+
+def test_api_token_refresh_issues_a_working_token(logged_in_client):
+    """Test that /api/token/refresh, called with a valid token, returns a new token that authenticates."""
+    client, user_id = logged_in_client
+    token = client.post('/api/login', json={'username': 'batch_user', 'password': 'password'}).get_json()['token']
+    stateless = current_app.test_client()
+    g.pop('_login_user', None)
+    refreshed = stateless.post('/api/token/refresh', headers={'Authorization': f"Bearer {token}"})
+    assert refreshed.status_code == 200
+    body = refreshed.get_json()
+    assert body['token_type'] == "Bearer" and body['expires_in'] > 0
+
+    g.pop('_login_user', None)
+    response = stateless.post('/api/submit_score', json={"score": 44, "level": 1},
+                              headers={'Authorization': f"Bearer {body['token']}"})
+    assert response.status_code == 201
+
+def test_api_token_refresh_refuses_deleted_user(logged_in_client):
+    """Test that a token of a deleted user cannot be renewed (it only lives until it expires)."""
+    client, user_id = logged_in_client
+    token = client.post('/api/login', json={'username': 'batch_user', 'password': 'password'}).get_json()['token']
+    db.session.delete(db.session.get(User, user_id))
+    db.session.commit()
+
+    stateless = current_app.test_client()
+    g.pop('_login_user', None)
+    response = stateless.post('/api/token/refresh', headers={'Authorization': f"Bearer {token}"})
+    assert response.status_code == 401
+    assert 'token' not in response.get_json()
+
+def test_api_rank_with_neighbours(logged_in_client):
+    """Test that /api/rank places the caller among the other players with their neighbours."""
+    client, user_id = logged_in_client
+    _add_players(db, 5) # Scores 10..50 on level 1
+    assert client.post('/api/submit_score', json={"score": 25, "level": 1}).status_code == 201
+
+    response = client.get('/api/rank?level=1')
+    assert response.status_code == 200
+    assert 'private' in response.headers['Cache-Control']
+    data = response.get_json()
+    assert (data['rank'], data['score'], data['total_players']) == (4, 25, 6)
+    assert data['percentile'] == 50.0
+    assert [(row['rank'], row['score']) for row in data['above']] == [(2, 40), (3, 30)]
+    assert [(row['rank'], row['score']) for row in data['below']] == [(5, 20), (6, 10)]
+
+    overall = client.get('/api/rank?neighbours=0').get_json()
+    assert overall['level'] is None and overall['rank'] == 4
+    assert overall['above'] == overall['below'] == []
+
+def test_api_rank_errors(logged_in_client):
+    """Test 404 without a score on the level and 400 for bad arguments."""
+    client, user_id = logged_in_client
+    assert client.get('/api/rank?level=1').status_code == 404
+    assert client.get('/api/rank?level=abc').status_code == 400
+    assert client.get('/api/rank?level=0').status_code == 400
+    assert client.get('/api/rank?level=1&neighbours=99').status_code == 400
@@ -0,0 +1,65 @@
+# tests/server/test_bench.py
+import json
+
+from server import bench
+
+
+def test_percentile_nearest_rank():
+    samples = list(range(1, 101))
+    assert bench.percentile(samples, 50) == 50
+    assert bench.percentile(samples, 99) == 99
+    assert bench.percentile([5], 95) == 5
+    assert bench.percentile([], 50) is None
+
+def test_benchmark_report_shape(tmp_path):
+    """Test a tiny end-to-end run: data is generated consistently and every call is reported."""
+    output = tmp_path / "report.json"
+    database_url = f"sqlite:///{tmp_path / 'bench.db'}"
+    assert bench.main(["--database-url", database_url, "--users", "30", "--levels", "3",
+                       "--submissions", "5", "--repeat", "3", "--submit-requests", "5",
+                       "--raw-paths", "--output", str(output)]) == 0
+    report = json.loads(output.read_text())
+
+    assert report["database"] == "sqlite"
+    assert report["dataset"]["users"] == 30
+    assert report["dataset"]["scores"] >= 30
+    names = [r["name"] for r in report["results"]]
+    assert "get_overall_leaderboard" in names
+    assert "get_distinct_levels" in names
+    assert "get_overall_leaderboard_from_scores[window]" in names
+    assert "get_overall_leaderboard_from_scores[fallback]" in names
+    submit = report["results"][-1]
+    assert submit["name"] == "api_submit_score"
+    assert submit["failures"] == 0
+    for result in report["results"]:
+        assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+    overall = report["results"][0]
+    assert overall["queries"] and overall["queries"][0]["plan"] # SQLite EXPLAIN QUERY PLAN lines
+
+def test_generated_best_scores_match_raw_scores(tmp_path):
+    """Test that the bulk-generated best_scores rows equal what the after_flush upsert would produce."""
+    from sqlalchemy import func
+    from server.app import create_app
+    from server.config import Config
+    from server.extensions import db
+    from server.models import BestScore, Score
+
+    app = create_app(Config, config_override={"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'g.db'}"})
+    with app.app_context():
+        db.create_all()
+        bench.generate_dataset(db, users=20, levels=4, submissions=10)
+        expected = dict(((u, l), m) for u, l, m in db.session.query(
+            Score.user_id, Score.level, func.max(Score.score_value)).group_by(Score.user_id, Score.level))
+        actual = {(b.user_id, b.level): b.best_score for b in BestScore.query.all()}
+        assert actual == expected
+        db.session.remove()
+
+def test_concurrency_benchmark_before_and_after(tmp_path):
+    """Test that the concurrent read/write run compares SQLite's default journal with WAL."""
+    result = bench.run_concurrency_benchmark(f"sqlite:///{tmp_path / 'c.db'}", readers=2, writers=1,
+                                             duration=0.3, users=20, levels=3, submissions=3)
+    assert result["before"]["journal_mode"] == "delete"
+    assert result["after"]["journal_mode"] == "wal"
+    for run in (result["before"], result["after"]):
+        assert run["read"]["ops"] > 0 and run["write"]["ops"] > 0
+    assert result["write_speedup"] > 0
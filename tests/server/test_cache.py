@@ -0,0 +1,161 @@
+# tests/server/test_cache.py
+import pytest
+from server.app import create_app
+from server.extensions import db, leaderboard_cache, user_cache
+from server.models import User, Score, load_user
+from server.cache import TTLLRUCache
+from server.leaderboard_service import (
+    get_cached_leaderboard_by_level,
+    get_cached_overall_leaderboard,
+    get_cached_distinct_levels,
+)
+
+# --- TTLLRUCache unit tests (no app needed) ---
+
+class FakeClock:
+    """Manually advanced replacement for time.monotonic."""
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+def test_cache_hit_and_miss_counters():
+    cache = TTLLRUCache(max_entries=4, ttl_seconds=10)
+    assert cache.get('a') is None
+    cache.set('a', 1)
+    assert cache.get('a') == 1
+    assert cache.get('a') == 1
+    stats = cache.stats()
+    assert stats['hits'] == 2
+    assert stats['misses'] == 1
+    assert stats['hit_ratio'] == pytest.approx(2 / 3)
+
+def test_cache_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLLRUCache(max_entries=4, ttl_seconds=5, clock=clock)
+    cache.set('a', 1)
+    clock.now = 4.9
+    assert cache.get('a') == 1
+    clock.now = 5.1
+    assert cache.get('a') is None
+    assert len(cache) == 0 # Expired entry is dropped on access
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLLRUCache(max_entries=2, ttl_seconds=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')      # 'b' is now least recently used
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+# --- LeaderboardCache integration tests ---
+
+@pytest.fixture(scope='function')
+def cache_app():
+    """App with an in-memory DB and one user with a level 1 score."""
+    test_config = {
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "SECRET_KEY": "test-secret-key",
+        "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+        "LEADERBOARD_CACHE_TTL": 60,
+    }
+    app = create_app(config_override=test_config)
+    with app.app_context():
+        db.create_all()
+        user = User(username="cacheuser"); user.set_password("p")
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(Score(user_id=user.id, score_value=100, level=1))
+        db.session.commit()
+        yield user.id
+        db.session.remove()
+        db.drop_all()
+
+def test_cached_leaderboard_served_from_cache(cache_app):
+    """A second read within the TTL is a cache hit."""
+    first = get_cached_leaderboard_by_level(1)
+    second = get_cached_leaderboard_by_level(1)
+    assert first == second
+    stats = leaderboard_cache.stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 1
+
+def test_committed_score_invalidates_level(cache_app):
+    """Committing a new score drops the cached level, overall and levels entries."""
+    user_id = cache_app
+    assert get_cached_leaderboard_by_level(1)[0]['score'] == 100
+    assert get_cached_overall_leaderboard()[0]['score'] == 100
+    assert get_cached_distinct_levels() == [1]
+
+    db.session.add(Score(user_id=user_id, score_value=250, level=1))
+    db.session.add(Score(user_id=user_id, score_value=10, level=2))
+    db.session.commit()
+
+    assert get_cached_leaderboard_by_level(1)[0]['score'] == 250
+    assert get_cached_overall_leaderboard()[0]['score'] == 260
+    assert get_cached_distinct_levels() == [1, 2]
+
+def test_rolled_back_score_keeps_cache(cache_app):
+    """A rolled-back insert must not invalidate anything."""
+    user_id = cache_app
+    get_cached_leaderboard_by_level(1)
+    db.session.add(Score(user_id=user_id, score_value=999, level=1))
+    db.session.flush()
+    db.session.rollback()
+
+    assert get_cached_leaderboard_by_level(1)[0]['score'] == 100
+    assert leaderboard_cache.stats()['invalidations'] == 0
+
+
+# --- UserCache (Flask-Login user_loader) ---
+
+def test_load_user_served_from_cache_without_query(cache_app):
+    """Test that a repeated user_loader call is a cache hit and issues no SQL."""
+    from sqlalchemy import event
+    db.session.remove()
+    assert load_user(str(cache_app)).username == "cacheuser" # Miss: loads and caches
+    db.session.remove() # New request, empty identity map
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        user = load_user(str(cache_app))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert user.username == "cacheuser"
+    assert user in db.session # Attached, so relationships still work
+    assert statements == []
+    assert user_cache.stats()['hits'] == 1
+    assert user.scores.count() == 1
+
+def test_cached_user_excludes_password_hash(cache_app):
+    """Test that the hash is never held in the cache but still loads on a cache hit."""
+    load_user(str(cache_app))
+    assert 'password_hash' not in user_cache.store.get(cache_app)
+    db.session.remove()
+
+    user = load_user(str(cache_app))
+    assert user_cache.stats()['misses'] == 1 # Served from the cache
+    assert user.check_password("p")
+
+def test_password_change_invalidates_cached_user(cache_app):
+    """Test that committing a password change drops the cached user."""
+    load_user(str(cache_app))
+    user = db.session.get(User, cache_app)
+    user.set_password("new-password")
+    db.session.commit()
+    db.session.remove()
+
+    reloaded = load_user(str(cache_app))
+    assert reloaded.check_password("new-password")
+    assert user_cache.stats()['invalidations'] == 1
+
+def test_load_user_unknown_id_is_not_cached(cache_app):
+    assert load_user("9999") is None
+    assert user_cache.stats()['size'] == 0
@@ -0,0 +1,65 @@
+# tests/server/test_database.py
+import pytest
+from sqlalchemy import text
+
+from server.app import create_app
+from server.database import build_engine_options, sqlite_pragmas
+from server.extensions import db
+
+def _make_app(uri, **overrides):
+    test_config = {
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": uri,
+        "SECRET_KEY": "test-secret-key",
+        "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+    }
+    test_config.update(overrides)
+    return create_app(config_override=test_config)
+
+def _pragma(name):
+    return db.session.execute(text(f"PRAGMA {name}")).scalar()
+
+def test_engine_options_from_config():
+    """Test that pool sizing applies to file/server databases but not to in-memory SQLite."""
+    config = {"SQLALCHEMY_DATABASE_URI": "postgresql://u:p@db/planewar", "DB_POOL_SIZE": 5,
+              "DB_MAX_OVERFLOW": 7, "DB_POOL_TIMEOUT": 3, "DB_POOL_RECYCLE": 600, "DB_POOL_PRE_PING": False}
+    assert build_engine_options(config) == {"pool_size": 5, "max_overflow": 7, "pool_timeout": 3,
+                                            "pool_recycle": 600, "pool_pre_ping": False}
+    memory = build_engine_options({"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    assert "pool_size" not in memory and memory["pool_pre_ping"] is True
+
+def test_explicit_engine_options_win(tmp_path):
+    """Test that SQLALCHEMY_ENGINE_OPTIONS entries override the DB_POOL_* defaults."""
+    app = _make_app(f"sqlite:///{tmp_path / 'o.db'}", DB_POOL_SIZE=3,
+                    SQLALCHEMY_ENGINE_OPTIONS={"pool_size": 2})
+    assert app.config["SQLALCHEMY_ENGINE_OPTIONS"]["pool_size"] == 2
+    with app.app_context():
+        assert db.engine.pool.size() == 2
+
+def test_sqlite_file_connections_get_pragmas(tmp_path):
+    """Test WAL, synchronous=NORMAL, busy_timeout and mmap_size on every new SQLite connection."""
+    app = _make_app(f"sqlite:///{tmp_path / 'p.db'}", SQLITE_BUSY_TIMEOUT_MS=1234, SQLITE_MMAP_SIZE=1 << 20)
+    with app.app_context():
+        assert _pragma("journal_mode") == "wal"
+        assert _pragma("synchronous") == 1 # NORMAL
+        assert _pragma("busy_timeout") == 1234
+        assert _pragma("mmap_size") == 1 << 20
+        db.session.remove()
+        db.engine.dispose()
+
+def test_sqlite_pragmas_can_be_disabled(tmp_path):
+    """Test that SQLITE_PRAGMAS_ENABLED=False leaves SQLite's defaults alone."""
+    app = _make_app(f"sqlite:///{tmp_path / 'd.db'}", SQLITE_PRAGMAS_ENABLED=False)
+    with app.app_context():
+        assert _pragma("journal_mode") == "delete"
+        assert _pragma("synchronous") == 2 # FULL
+        db.session.remove()
+        db.engine.dispose()
+
+def test_invalid_pragma_values_rejected():
+    """Test that journal/synchronous modes are validated rather than interpolated into SQL blindly."""
+    with pytest.raises(ValueError):
+        sqlite_pragmas({"SQLITE_JOURNAL_MODE": "wal; DROP TABLE users"})
+    with pytest.raises(ValueError):
+        sqlite_pragmas({"SQLITE_SYNCHRONOUS": "sometimes"})
+    assert sqlite_pragmas({})[0] == "PRAGMA journal_mode=WAL"
@@ -0,0 +1,128 @@
+# tests/server/test_ingest.py
+import pytest
+from server.app import create_app
+from server.extensions import db, score_ingest
+from server.models import User, Score, BestScore
+from server.ingest import ScoreIngestWorker
+
+@pytest.fixture(scope='function')
+def ingest_app():
+    """App in write-behind mode with a logged-in client."""
+    test_config = {
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "LOGIN_DISABLED": False,
+        "SECRET_KEY": "test-secret-key",
+        "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+        "SCORE_INGEST_ASYNC": True,
+        "SCORE_INGEST_BATCH_SIZE": 10,
+        "SCORE_INGEST_FLUSH_INTERVAL": 0.05,
+    }
+    app = create_app(config_override=test_config)
+    with app.app_context():
+        db.create_all()
+        user = User(username="ingest_user")
+        user.set_password("password")
+        db.session.add(user)
+        db.session.commit()
+        client = app.test_client()
+        client.post('/api/login', json={'username': 'ingest_user', 'password': 'password'})
+        yield app, client, user.id
+        app.extensions['score_ingest'].stop()
+        db.session.remove()
+        db.drop_all()
+
+def test_submit_score_is_queued_and_flushed(ingest_app):
+    """Test that submissions return 202 and are committed once drained."""
+    app, client, user_id = ingest_app
+    for value in (10, 40, 20):
+        response = client.post('/api/submit_score', json={'score': value, 'level': 1})
+        assert response.status_code == 202
+        assert response.get_json()['success'] is True
+
+    worker = app.extensions['score_ingest']
+    worker.stop() # Drains everything still queued
+    db.session.expire_all()
+
+    assert Score.query.filter_by(user_id=user_id).count() == 3
+    assert db.session.get(BestScore, (user_id, 1)).best_score == 40
+    stats = score_ingest.stats()
+    assert stats['accepted'] == 3
+    assert stats['flushed'] == 3
+    assert stats['queue_depth'] == 0
+
+def test_submit_score_validation_still_synchronous(ingest_app):
+    """Test that invalid payloads are rejected before queueing."""
+    app, client, _ = ingest_app
+    response = client.post('/api/submit_score', json={'score': 'abc', 'level': 1})
+    assert response.status_code == 400
+    assert score_ingest.stats()['accepted'] == 0
+
+def test_full_queue_applies_back_pressure(ingest_app):
+    """Test that a full queue refuses submissions with 503 and Retry-After."""
+    app, client, user_id = ingest_app
+    # Swap in a tiny queue that nobody drains
+    worker = ScoreIngestWorker(app, max_queue_size=1)
+    worker.start = lambda: None
+    app.extensions['score_ingest'] = worker
+
+    assert client.post('/api/submit_score', json={'score': 1, 'level': 1}).status_code == 202
+    response = client.post('/api/submit_score', json={'score': 2, 'level': 1})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert worker.stats()['rejected'] == 1
+
+def test_worker_flushes_in_batches(ingest_app):
+    """Test that the worker commits at most batch_size scores per transaction."""
+    app, _, user_id = ingest_app
+    worker = ScoreIngestWorker(app, batch_size=4, flush_interval=0)
+    for i in range(10):
+        assert worker.submit(user_id, i, 2)
+    worker.stop()
+    assert worker.stats()['batches'] == 3
+    assert Score.query.filter_by(level=2).count() == 10
+
+def test_worker_skips_duplicate_submission_ids(ingest_app):
+    """Test that a batch containing an already stored submission_id still saves the others."""
+    app, client, user_id = ingest_app
+    db.session.add(Score(user_id=user_id, score_value=1, level=1, submission_id="dup"))
+    db.session.commit()
+
+    worker = ScoreIngestWorker(app, batch_size=10, flush_interval=0)
+    worker.submit(user_id, 2, 1, "dup")
+    worker.submit(user_id, 3, 1, "fresh")
+    worker.stop()
+    db.session.expire_all()
+
+    assert Score.query.filter_by(user_id=user_id).count() == 2
+    assert worker.stats()['duplicates'] == 1
+    assert worker.stats()['flushed'] == 1
+
+def test_worker_counts_other_integrity_errors_as_failed(ingest_app, caplog):
+    """Test that a constraint violation other than a stored submission_id is failed and logged, not a duplicate."""
+    app, client, user_id = ingest_app
+    worker = ScoreIngestWorker(app, batch_size=10, flush_interval=0)
+    worker.submit(user_id, 2, None, "broken") # NOT NULL violation, id never stored
+    worker.submit(user_id, 3, 1, "fresh")
+    worker.stop()
+
+    stats = worker.stats()
+    assert (stats['flushed'], stats['failed'], stats['duplicates']) == (1, 1, 0)
+    assert "failed to commit score" in caplog.text
+
+def test_counters_are_exact_under_concurrent_submits(ingest_app):
+    """Test that accepted/rejected stay exact when many request threads submit at once."""
+    import threading
+    app, _, user_id = ingest_app
+    worker = ScoreIngestWorker(app, max_queue_size=1000, batch_size=100, flush_interval=0)
+    def submit_many():
+        for i in range(200):
+            worker.submit(user_id, i, 3)
+    threads = [threading.Thread(target=submit_many) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = worker.stats()
+    assert (stats['accepted'], stats['rejected']) == (1000, 600)
@@ -0,0 +1,102 @@
+# tests/server/test_instrumentation.py
+import json
+import logging
+import pytest
+from server.app import create_app
+from server.extensions import db
+from server.models import User, Score
+from server.instrumentation import JsonFormatter
+from server.leaderboard_service import get_leaderboard_by_level
+
+def _make_app(**overrides):
+    test_config = {
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "SECRET_KEY": "test-secret-key",
+        "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+        "SQL_SLOW_QUERY_MS": 10_000,
+    }
+    test_config.update(overrides)
+    return create_app(config_override=test_config)
+
+@pytest.fixture(scope='function')
+def instrumented_app():
+    """Factory for apps with instrumentation overrides; one user with a level 1 score."""
+    contexts = []
+    def make(**overrides):
+        app = _make_app(**overrides)
+        ctx = app.app_context()
+        ctx.push()
+        contexts.append(ctx)
+        db.create_all()
+        user = User(username="timed_user", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(Score(user_id=user.id, score_value=10, level=1))
+        db.session.commit()
+        return app
+    yield make
+    for ctx in reversed(contexts):
+        db.session.remove()
+        db.drop_all()
+        ctx.pop()
+
+def _request_records(caplog):
+    return [r for r in caplog.records if r.name == 'server.instrumentation' and r.getMessage() == 'request']
+
+def test_request_log_has_timing_and_sql_counts(instrumented_app, caplog):
+    """Test one structured record per request with endpoint, status and SQL statement count/time."""
+    app = instrumented_app()
+    caplog.set_level(logging.INFO, logger='server')
+    response = app.test_client().get('/api/leaderboard/level/1')
+    assert response.status_code == 200
+    assert response.headers['Server-Timing'].startswith('app;dur=')
+
+    (record,) = _request_records(caplog)
+    assert record.fields['endpoint'] == 'api.api_get_level_leaderboard'
+    assert record.fields['status'] == 200
+    assert record.fields['path'] == '/api/leaderboard/level/1'
+    assert record.fields['sql_count'] >= 1
+    assert record.fields['duration_ms'] >= record.fields['sql_ms'] >= 0
+
+def test_request_log_sampling_keeps_slow_requests(instrumented_app, caplog):
+    """Test that a 0 sample rate silences ordinary requests but slow ones are still logged as warnings."""
+    app = instrumented_app(REQUEST_LOG_SAMPLE_RATE=0.0)
+    caplog.set_level(logging.INFO, logger='server')
+    app.test_client().get('/api/leaderboard')
+    assert _request_records(caplog) == []
+
+    app.extensions['request_instrumentation']['slow_request_ms'] = 0
+    app.test_client().get('/api/leaderboard')
+    (record,) = _request_records(caplog)
+    assert record.levelno == logging.WARNING
+    assert record.fields['slow'] is True
+
+def test_slow_queries_are_flagged(instrumented_app, caplog):
+    """Test that statements over SQL_SLOW_QUERY_MS are logged with their (whitespace-collapsed) SQL."""
+    app = instrumented_app(SQL_SLOW_QUERY_MS=0)
+    caplog.set_level(logging.INFO, logger='server')
+    app.test_client().get('/api/leaderboard/level/1')
+    slow = [r for r in caplog.records if r.getMessage() == 'slow_query']
+    assert slow
+    assert any('best_scores' in r.fields['statement'] for r in slow)
+    assert all('\n' not in r.fields['statement'] for r in slow)
+    assert slow[-1].fields['endpoint'] == 'api.api_get_level_leaderboard'
+
+def test_json_formatter_emits_one_object_per_line():
+    """Test that records render as JSON with the extra fields merged in."""
+    record = logging.LogRecord('server.test', logging.INFO, __file__, 1, 'hello %s', ('world',), None)
+    record.fields = {'status': 200, 'duration_ms': 1.5}
+    line = JsonFormatter().format(record)
+    assert '\n' not in line
+    payload = json.loads(line)
+    assert payload['message'] == 'hello world'
+    assert payload['level'] == 'INFO'
+    assert payload['status'] == 200 and payload['duration_ms'] == 1.5
+
+def test_leaderboard_read_no_longer_prints(instrumented_app, capsys):
+    """Test that the per-level leaderboard does not dump its rows to stdout on every call."""
+    instrumented_app()
+    capsys.readouterr()
+    assert get_leaderboard_by_level(1)[0]['username'] == "timed_user"
+    assert capsys.readouterr().out == ''
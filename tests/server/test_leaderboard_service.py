@@ -182,3 +182,194 @@ def test_get_overall_leaderboard_tiebreak(leaderboard_db):
     assert leaderboard[2]['username'] == "player3"
     assert leaderboard[2]['score'] == 230
 
+
+
+# --- Query plan tests (composite covering indexes) ---
+
+def _plans_for(call):
+    """EXPLAIN QUERY PLAN detail lines for every statement `call` issues (SQLite)."""
+    from server.bench import capture_statements, explain
+    with capture_statements(db.engine) as statements:
+        call()
+    return [explain(db.engine, statement, parameters) for statement, parameters in statements]
+
+def test_level_leaderboard_is_an_index_only_range_scan(leaderboard_db):
+    """Test that the per-level leaderboard is read from ix_best_scores_level_rank alone, already ordered."""
+    (plan,) = _plans_for(lambda: get_leaderboard_by_level(1))
+    best_scores_steps = [step for step in plan if 'best_scores' in step]
+    assert best_scores_steps == ['SEARCH best_scores USING COVERING INDEX ix_best_scores_level_rank (level=?)']
+    assert not any('TEMP B-TREE' in step for step in plan) # user_id tie-break comes from the index too
+
+def test_overall_leaderboard_aggregates_from_covering_index(leaderboard_db):
+    """Test that the overall leaderboard's GROUP BY reads ix_best_scores_user_totals, not the table."""
+    (plan,) = _plans_for(get_overall_leaderboard)
+    assert 'SCAN best_scores USING COVERING INDEX ix_best_scores_user_totals' in plan
+
+def test_raw_score_level_aggregation_uses_composite_index(leaderboard_db):
+    """Test the per-level "max score per user, earliest time" aggregation over raw scores."""
+    from sqlalchemy import func
+    query = db.session.query(Score.user_id, func.max(Score.score_value), func.min(Score.timestamp))\
+                      .filter(Score.level == 1)\
+                      .group_by(Score.user_id)
+    (plan,) = _plans_for(query.all)
+    assert plan == ['SEARCH scores USING COVERING INDEX ix_scores_level_user_score_ts (level=?)']
+
+
+# --- Daily / weekly leaderboards ---
+
+def _add_week_of_scores():
+    """Scores for the week of Monday 2025-03-03 (clear of the fixture's recent scores), plus one the week before."""
+    from datetime import date
+    users = {u.username: u.id for u in User.query.all()}
+    monday = datetime(2025, 3, 3, 9, 0)
+    db.session.add_all([
+        Score(user_id=users['player3'], score_value=300, level=1, timestamp=monday),
+        Score(user_id=users['player1'], score_value=250, level=1, timestamp=monday + timedelta(days=2)),
+        Score(user_id=users['player1'], score_value=100, level=2, timestamp=monday + timedelta(days=2)),
+        Score(user_id=users['player2'], score_value=999, level=1, timestamp=monday - timedelta(days=1)),
+    ])
+    db.session.commit()
+    return date(2025, 3, 3), date(2025, 3, 5)
+
+def test_period_leaderboards_only_rank_their_bucket(leaderboard_db):
+    """Test that daily/weekly leaderboards rank the bucket's scores, per level and overall."""
+    from server.leaderboard_service import get_period_leaderboard
+    week, wednesday = _add_week_of_scores()
+
+    weekly_level_1 = get_period_leaderboard('weekly', 1, start=week)
+    assert [(r['rank'], r['username'], r['score']) for r in weekly_level_1] == [(1, 'player3', 300), (2, 'player1', 250)]
+    weekly_overall = get_period_leaderboard('weekly', start=week)
+    assert [(r['username'], r['score']) for r in weekly_overall] == [('player1', 350), ('player3', 300)]
+    daily = get_period_leaderboard('daily', 1, start=wednesday)
+    assert [r['username'] for r in daily] == ['player1']
+    assert get_period_leaderboard('weekly', 3, start=week) == []
+
+def test_period_leaderboard_reads_rollup_index(leaderboard_db):
+    """Test that a bucket's level leaderboard is an index-only range scan, like the all-time one."""
+    from server.leaderboard_service import get_period_leaderboard
+    week, _ = _add_week_of_scores()
+    (plan,) = _plans_for(lambda: get_period_leaderboard('weekly', 1, start=week))
+    steps = [step for step in plan if 'period_best_scores' in step]
+    assert steps == ['SEARCH period_best_scores USING COVERING INDEX ix_period_best_scores_rank '
+                     '(period=? AND period_start=? AND level=?)']
+    assert not any('TEMP B-TREE' in step for step in plan)
+
+def test_prune_period_best_scores(leaderboard_db):
+    """Test that the retention job drops only buckets older than the configured window."""
+    from flask import current_app
+    from server.models import PeriodBestScore
+    from server.leaderboard_service import prune_period_best_scores
+    week, _ = _add_week_of_scores()
+    current_app.config.update(LEADERBOARD_DAILY_RETENTION=3, LEADERBOARD_WEEKLY_RETENTION=2)
+
+    # "Now" is the following Sunday: keep days from Friday 7th, weeks from 24 February
+    deleted = prune_period_best_scores(now=datetime(2025, 3, 9, 12, 0))
+
+    assert deleted['weekly'] == 0
+    assert deleted['daily'] == 4
+    remaining = {(r.period, r.period_start.isoformat()) for r in PeriodBestScore.query.all()
+                 if r.period_start < week + timedelta(days=7)}
+    assert remaining == {('weekly', '2025-03-03'), ('weekly', '2025-02-24')}
+
+
+# --- Single-player rank lookup ---
+
+def test_player_rank_matches_full_leaderboard(leaderboard_db):
+    """Test that every player's rank lookup agrees with the full ranking, ties included."""
+    from server.leaderboard_service import get_player_rank_by_level, get_player_rank_overall
+    users = {u.username: u.id for u in User.query.all()}
+    boards = [(level, get_leaderboard_by_level(level)) for level in get_distinct_levels()]
+    boards.append((None, get_overall_leaderboard()))
+    for level, board in boards:
+        for row in board:
+            if level is None:
+                result = get_player_rank_overall(users[row['username']], neighbours=1)
+            else:
+                result = get_player_rank_by_level(users[row['username']], level, neighbours=1)
+            assert (result['rank'], result['score'], result['total_players']) == (row['rank'], row['score'], len(board))
+            assert result['above'] == board[max(0, row['rank'] - 2):row['rank'] - 1]
+            assert result['below'] == board[row['rank']:row['rank'] + 1]
+    assert get_player_rank_by_level(users['player3'], 3) is None
+    assert get_player_rank_overall(users['player4_no_scores']) is None
+
+def test_player_rank_counts_with_index_seeks(leaderboard_db):
+    """Test that counting the players ahead seeks into ix_best_scores_level_rank instead of scanning the level."""
+    from server.leaderboard_service import get_player_rank_by_level
+    player3 = User.query.filter_by(username="player3").first()
+    plans = _plans_for(lambda: get_player_rank_by_level(player3.id, 1, neighbours=0))
+    steps = [step for plan in plans for step in plan]
+    assert 'SEARCH best_scores USING COVERING INDEX ix_best_scores_level_rank (level=? AND best_score>?)' in steps
+    assert 'SEARCH best_scores USING COVERING INDEX ix_best_scores_level_rank (level=? AND best_score=?)' in steps
+
+def test_player_rank_overall_counts_with_index_seeks(leaderboard_db):
+    """Test that the overall rank counts on ix_user_totals_rank instead of aggregating best_scores."""
+    from server.leaderboard_service import get_player_rank_overall
+    player3 = User.query.filter_by(username="player3").first()
+    plans = _plans_for(lambda: get_player_rank_overall(player3.id, neighbours=0))
+    steps = [step for plan in plans for step in plan]
+    assert 'SEARCH user_totals USING COVERING INDEX ix_user_totals_rank (total_score>?)' in steps
+    assert 'SEARCH user_totals USING COVERING INDEX ix_user_totals_rank (total_score=?)' in steps
+    assert not any('best_scores' in step for step in steps)
+
+def test_user_totals_follow_new_bests(leaderboard_db):
+    """Test that user_totals equals the best_scores aggregate after bests are raised and added."""
+    from sqlalchemy import func
+    from server.models import BestScore, UserTotal
+    player1 = User.query.filter_by(username="player1").first()
+    player4 = User.query.filter_by(username="player4_no_scores").first()
+    db.session.add_all([
+        Score(user_id=player1.id, score_value=500, level=1), # Raises a best: its achieved_at moves later
+        Score(user_id=player4.id, score_value=40, level=2),  # First score: new user_totals row
+    ])
+    db.session.commit()
+
+    expected = {user_id: (total, earliest) for user_id, total, earliest in db.session.query(
+        BestScore.user_id, func.sum(BestScore.best_score), func.min(BestScore.achieved_at)
+    ).group_by(BestScore.user_id)}
+    actual = {t.user_id: (t.total_score, t.achieved_at) for t in UserTotal.query.all()}
+    assert actual == expected
+    assert actual[player4.id][0] == 40
+
+
+# --- Leaderboards computed from raw scores (window functions vs fallback) ---
+
+@pytest.mark.parametrize("use_window", [True, False])
+def test_raw_score_leaderboards_match_best_scores(leaderboard_db, use_window):
+    """Test that both from-raw-scores plans rank exactly like the served best_scores path."""
+    from server.leaderboard_service import (
+        get_leaderboard_by_level_from_scores, get_overall_leaderboard_from_scores
+    )
+    for level in get_distinct_levels():
+        assert get_leaderboard_by_level_from_scores(level, use_window=use_window) == get_leaderboard_by_level(level)
+    assert get_overall_leaderboard_from_scores(use_window=use_window) == get_overall_leaderboard()
+    assert get_leaderboard_by_level_from_scores(1, limit=2, use_window=use_window) == get_leaderboard_by_level(1)[:2]
+
+def test_window_leaderboard_is_a_single_statement(leaderboard_db):
+    """Test that the window-function plan ranks in SQL: one statement, no self-join back to scores."""
+    from server.leaderboard_service import get_leaderboard_by_level_from_scores
+    with_window = _plans_for(lambda: get_leaderboard_by_level_from_scores(1, use_window=True))
+    fallback = _plans_for(lambda: get_leaderboard_by_level_from_scores(1, use_window=False))
+    assert len(with_window) == 1
+    count_scores = lambda plan: sum(1 for step in plan if ' scores ' in f' {step} ')
+    assert count_scores(with_window[0]) == 1
+    assert count_scores(fallback[0]) == 2
+
+@pytest.mark.parametrize("use_window", [True, False])
+def test_rebuild_best_scores_repairs_table(leaderboard_db, use_window):
+    """Test that rebuild_best_scores recomputes best_scores after raw scores change behind the ORM."""
+    from server.models import BestScore
+    from server.leaderboard_service import get_player_rank_overall, rebuild_best_scores
+    expected = get_overall_leaderboard()
+    player1 = User.query.filter_by(username="player1").first()
+    # Bulk delete skips the after_flush hook, so best_scores goes stale
+    db.session.execute(db.delete(Score).where(Score.user_id == player1.id, Score.level == 1))
+    db.session.execute(db.update(BestScore).values(best_score=0).where(BestScore.user_id != player1.id))
+    db.session.commit()
+
+    written = rebuild_best_scores(use_window=use_window)
+
+    assert written == BestScore.query.count() == 6 # player1 no longer has a level 1 score
+    assert BestScore.query.filter_by(user_id=player1.id, level=1).first() is None
+    totals = {row['username']: row['score'] for row in get_overall_leaderboard()}
+    assert totals == {**{row['username']: row['score'] for row in expected}, 'player1': 700}
+    assert get_player_rank_overall(player1.id)['score'] == 700 # user_totals rebuilt too
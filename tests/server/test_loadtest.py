@@ -0,0 +1,52 @@
+# tests/server/test_loadtest.py
+import threading
+import pytest
+from werkzeug.serving import make_server
+
+from server import loadtest
+from server.app import create_app
+from server.config import Config
+
+
+def test_endpoint_stats_histogram_and_errors():
+    stats = loadtest.EndpointStats()
+    stats.record(0.004, 200)
+    stats.record(0.030, 201)
+    stats.record(9.0, 503)
+    stats.record(0.2, "ConnectionError")
+    report = stats.report(elapsed=2.0)
+
+    assert report["requests"] == 4
+    assert report["errors"] == 2
+    assert report["error_rate"] == 0.5
+    assert report["requests_per_second"] == 2.0
+    assert report["histogram_ms"]["5"] == 1
+    assert report["histogram_ms"]["50"] == 1
+    assert report["histogram_ms"]["250"] == 1
+    assert report["histogram_ms"]["+Inf"] == 1
+    assert report["status_counts"]["ConnectionError"] == 1
+
+def test_parse_mix_rejects_unknown_endpoints():
+    assert loadtest._parse_mix("submit_score=2,api_leaderboard") == {"submit_score": 2.0, "api_leaderboard": 1.0}
+    with pytest.raises(Exception):
+        loadtest._parse_mix("delete_everything=1")
+
+def test_run_load_against_local_server(tmp_path):
+    """Test a short run against an in-process server seeded with benchmark users."""
+    database_url = f"sqlite:///{tmp_path / 'load.db'}"
+    loadtest.seed_database(database_url, users=3, levels=2, submissions=2)
+    app = create_app(Config, config_override={"SQLALCHEMY_DATABASE_URI": database_url,
+                                              "SECRET_KEY": "load-secret"})
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        report = loadtest.run_load(f"http://127.0.0.1:{server.server_port}", clients=2, duration=1.0,
+                                   think_time=0.05, users=3, levels=2)
+    finally:
+        server.shutdown()
+
+    assert report["endpoints"]["login"]["requests"] == 2
+    assert report["endpoints"]["login"]["errors"] == 0
+    assert report["requests"] > 2
+    assert report["endpoints"]["submit_score"]["status_counts"].get("201", 0) > 0
@@ -0,0 +1,143 @@
+# tests/server/test_login_guard.py
+import threading
+import pytest
+
+from server.app import create_app
+from server.extensions import db, login_guard
+from server.login_guard import AttemptThrottle, PasswordVerifier, PasswordVerifierBusy
+from server.models import User
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def guarded_client():
+    """Client with Flask-Login enabled and tight login throttles."""
+    test_config = {
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "LOGIN_DISABLED": False,
+        "SECRET_KEY": "test-secret-key",
+        "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+        "LOGIN_THROTTLE_MAX_PER_USERNAME": 3,
+        "LOGIN_THROTTLE_MAX_PER_IP": 10,
+        "LOGIN_VERIFY_MAX_CONCURRENCY": 1,
+        "LOGIN_VERIFY_QUEUE_TIMEOUT": 0.05,
+    }
+    app = create_app(config_override=test_config)
+    with app.app_context():
+        db.create_all()
+        user = User(username="guarded_user")
+        user.set_password("password")
+        db.session.add(user)
+        db.session.commit()
+        yield app, app.test_client()
+        db.session.remove()
+        db.drop_all()
+
+
+def test_verifier_rejects_when_all_slots_are_busy():
+    """Test that a check waiting longer than the queue timeout raises PasswordVerifierBusy."""
+    verifier = PasswordVerifier(max_concurrency=1, queue_timeout=0.05)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_check(password_hash, password):
+        started.set()
+        release.wait(5)
+        return True
+
+    holder = threading.Thread(target=verifier.verify, args=(slow_check, "h", "p"))
+    holder.start()
+    started.wait(5)
+    with pytest.raises(PasswordVerifierBusy):
+        verifier.verify(lambda h, p: True, "h", "p")
+    release.set()
+    holder.join(5)
+
+    stats = verifier.stats()
+    assert stats['rejected'] == 1
+    assert stats['hash_count'] == 1
+    assert stats['in_flight'] == 0
+    assert verifier.verify(lambda h, p: h == p, "same", "same") is True
+
+def test_verifier_records_latency_buckets():
+    """Test that hash latency lands in the cumulative histogram."""
+    clock = FakeClock()
+    verifier = PasswordVerifier(clock=clock)
+
+    def check_taking(seconds):
+        def check(password_hash, password):
+            clock.now += seconds
+            return False
+        return check
+
+    verifier.verify(check_taking(0.2), "h", "p")
+    verifier.verify(check_taking(3.0), "h", "p")
+    stats = verifier.stats()
+    assert stats['hash_count'] == 2
+    assert stats['hash_seconds_max'] == pytest.approx(3.0)
+    assert stats['hash_seconds_buckets'][0.25] == 1
+    assert stats['hash_seconds_buckets'][2.5] == 1 # The 3s check is only in the implicit +Inf bucket
+
+def test_throttle_sliding_window():
+    """Test that failures expire after the window and reset() clears a key."""
+    clock = FakeClock()
+    throttle = AttemptThrottle(max_attempts=2, window_seconds=60, clock=clock)
+    throttle.record_failure("bob")
+    clock.now += 10
+    throttle.record_failure("bob")
+    assert throttle.retry_after("bob") == pytest.approx(50)
+
+    clock.now += 51
+    assert throttle.retry_after("bob") == 0
+    throttle.record_failure("bob")
+    throttle.reset("bob")
+    assert throttle.retry_after("bob") == 0
+
+def test_throttle_bounds_tracked_keys():
+    """Test that spraying distinct keys cannot grow the table without bound."""
+    throttle = AttemptThrottle(max_attempts=5, window_seconds=60, max_keys=3, clock=FakeClock())
+    for i in range(10):
+        throttle.record_failure(f"ip-{i}")
+    assert len(throttle) == 3
+
+def test_api_login_throttles_repeated_failures(guarded_client):
+    """Test that a username is refused with 429 after too many failures, even with the right password."""
+    app, client = guarded_client
+    for _ in range(3):
+        response = client.post('/api/login', json={'username': 'guarded_user', 'password': 'wrong'})
+        assert response.status_code == 401
+
+    response = client.post('/api/login', json={'username': 'guarded_user', 'password': 'password'})
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) > 0
+    assert login_guard.stats()['throttled'] == 1
+    assert login_guard.stats()['hash_count'] == 3 # The throttled attempt never hashed
+
+def test_api_login_success_clears_username_failures(guarded_client):
+    """Test that a successful login resets the username's failure count."""
+    app, client = guarded_client
+    for _ in range(2):
+        client.post('/api/login', json={'username': 'guarded_user', 'password': 'wrong'})
+    assert client.post('/api/login', json={'username': 'guarded_user', 'password': 'password'}).status_code == 200
+    for _ in range(2):
+        client.post('/api/login', json={'username': 'guarded_user', 'password': 'wrong'})
+    assert client.post('/api/login', json={'username': 'guarded_user', 'password': 'password'}).status_code == 200
+
+def test_api_login_busy_verifier_returns_503(guarded_client):
+    """Test that a login storm is shed with 503 instead of queueing forever."""
+    app, client = guarded_client
+    verifier = app.extensions['login_guard'].verifier
+    assert verifier._slots.acquire(timeout=1) # Occupy the only slot
+    try:
+        response = client.post('/api/login', json={'username': 'guarded_user', 'password': 'password'})
+    finally:
+        verifier._slots.release()
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
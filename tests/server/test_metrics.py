@@ -0,0 +1,102 @@
+# tests/server/test_metrics.py
+import re
+import pytest
+from server.app import create_app
+from server.extensions import db
+from server.models import User, Score
+
+@pytest.fixture(scope='function')
+def metrics_client():
+    """Logged-in API client on an app with /metrics enabled."""
+    test_config = {
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "SECRET_KEY": "test-secret-key",
+        "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+        "LOGIN_DISABLED": False,
+    }
+    app = create_app(config_override=test_config)
+    with app.app_context():
+        db.create_all()
+        user = User(username="metrics_user")
+        user.set_password("password")
+        db.session.add(user)
+        db.session.commit()
+        client = app.test_client()
+        assert client.post('/api/login', json={'username': 'metrics_user', 'password': 'password'}).status_code == 200
+        yield app, client, user.id
+        db.session.remove()
+        db.drop_all()
+
+def _samples(text):
+    """Parses exposition lines into {'name{labels}': float}."""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            series, value = line.rsplit(' ', 1)
+            samples[series] = float(value)
+    return samples
+
+def test_metrics_exposes_request_counters_and_histograms(metrics_client):
+    """Test per-endpoint counters and a consistent latency histogram after some traffic."""
+    app, client, _ = metrics_client
+    for _ in range(3):
+        client.get('/api/leaderboard')
+    client.get('/no/such/page')
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    samples = _samples(response.get_data(as_text=True))
+
+    endpoint = 'api.api_get_overall_leaderboard'
+    assert samples[f'planewar_http_requests_total{{endpoint="{endpoint}",method="GET",status="200"}}'] == 3
+    assert samples['planewar_http_requests_total{endpoint="unmatched",method="GET",status="404"}'] == 1
+    assert samples[f'planewar_http_request_duration_seconds_count{{endpoint="{endpoint}"}}'] == 3
+    assert samples[f'planewar_http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}}'] == 3
+    buckets = [v for k, v in samples.items()
+               if k.startswith(f'planewar_http_request_duration_seconds_bucket{{endpoint="{endpoint}"')]
+    assert buckets == sorted(buckets) # Cumulative
+    assert samples['planewar_http_requests_in_flight'] == 1 # The scrape itself
+
+def test_pool_checkout_wait_survives_engine_dispose(metrics_client):
+    """Test that checkouts are still timed after engine.dispose() replaces the pool."""
+    from sqlalchemy import text
+    app, client, _ = metrics_client
+    def checkouts():
+        return _samples(client.get('/metrics').get_data(as_text=True))['planewar_db_pool_checkout_wait_seconds_count']
+
+    before = checkouts()
+    db.session.remove()
+    db.engine.dispose()
+    db.session.execute(text("SELECT 1"))
+    db.session.remove()
+    assert checkouts() == before + 1
+
+def test_metrics_covers_ingest_caches_pool_and_bcrypt(metrics_client):
+    """Test the saturation series: scores stored, cache hit ratio, pool checkout wait and bcrypt time."""
+    app, client, user_id = metrics_client
+    assert client.post('/api/submit_score', json={"score": 10, "level": 1}).status_code == 201
+    db.session.add(Score(user_id=user_id, score_value=5, level=1))
+    db.session.rollback() # Never committed: not counted
+    client.get('/leaderboard') # Fills the overall leaderboard cache entry...
+    client.get('/leaderboard') # ...and hits it
+    samples = _samples(client.get('/metrics').get_data(as_text=True))
+
+    assert samples['planewar_scores_stored_total'] == 1
+    assert samples['planewar_cache_hits_total{cache="leaderboard"}'] >= 1
+    assert 0 < samples['planewar_cache_hit_ratio{cache="leaderboard"}'] <= 1
+    assert 'planewar_cache_entries{cache="user"}' in samples
+    assert samples['planewar_db_pool_checkout_wait_seconds_count'] >= 1
+    assert samples['planewar_password_verify_seconds_count'] == 1
+    assert samples['planewar_password_verify_seconds_sum'] > 0
+    assert samples['planewar_password_verify_max_concurrency'] == app.config['LOGIN_VERIFY_MAX_CONCURRENCY']
+
+def test_metrics_bearer_token(metrics_client):
+    """Test that METRICS_BEARER_TOKEN protects the endpoint."""
+    app, client, _ = metrics_client
+    app.config['METRICS_BEARER_TOKEN'] = 's3cret'
+    assert client.get('/metrics').status_code == 401
+    response = client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+    assert response.status_code == 200
+    assert re.search(r'^# TYPE planewar_http_requests_total counter$', response.get_data(as_text=True), re.M)
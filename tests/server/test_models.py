@@ -2,7 +2,7 @@
 import pytest
 from server.app import create_app # Adjust import based on your app factory location
 from server.extensions import db
-from server.models import User, Score
+from server.models import User, Score, BestScore, PeriodBestScore, period_start
 # --- MODIFIED IMPORT ---
 from datetime import datetime, timedelta, UTC # Import UTC
 
@@ -163,3 +163,109 @@ def test_user_score_cascade_delete(test_app_db):
     # Assert scores associated with the user are also deleted
     assert User.query.filter_by(username="deleteuser").first() is None
     assert Score.query.count() == 0 # Verify cascade delete worked
+
+# --- BestScore (materialized personal best) Tests ---
+
+def test_best_score_tracks_highest_score(test_app_db):
+    """Test that inserting Scores keeps one best_scores row per user and level."""
+    app, db = test_app_db
+    user = User(username="bestuser")
+    user.set_password("pw")
+    db.session.add(user)
+    db.session.commit()
+
+    db.session.add_all([
+        Score(user_id=user.id, score_value=50, level=1),
+        Score(user_id=user.id, score_value=120, level=1),
+        Score(user_id=user.id, score_value=80, level=1),
+        Score(user_id=user.id, score_value=30, level=2),
+    ])
+    db.session.commit()
+
+    best_l1 = db.session.get(BestScore, (user.id, 1))
+    best_l2 = db.session.get(BestScore, (user.id, 2))
+    assert best_l1.best_score == 120
+    assert best_l2.best_score == 30
+    assert BestScore.query.count() == 2
+
+    # A lower score in a later transaction must not overwrite the best
+    db.session.add(Score(user_id=user.id, score_value=10, level=1))
+    db.session.commit()
+    db.session.expire_all()
+    assert db.session.get(BestScore, (user.id, 1)).best_score == 120
+
+def test_best_score_keeps_earliest_timestamp_on_tie(test_app_db):
+    """Test that an equal score keeps the earliest achieved_at for tie-breaking."""
+    app, db = test_app_db
+    user = User(username="tieuser")
+    user.set_password("pw")
+    db.session.add(user)
+    db.session.commit()
+
+    now = datetime.now(UTC).replace(tzinfo=None)
+    db.session.add(Score(user_id=user.id, score_value=100, level=1, timestamp=now - timedelta(hours=1)))
+    db.session.commit()
+    db.session.add(Score(user_id=user.id, score_value=100, level=1, timestamp=now))
+    db.session.add(Score(user_id=user.id, score_value=100, level=1, timestamp=now - timedelta(hours=2)))
+    db.session.commit()
+    db.session.expire_all()
+
+    best = db.session.get(BestScore, (user.id, 1))
+    assert best.best_score == 100
+    assert best.achieved_at == now - timedelta(hours=2)
+
+def test_best_score_cascade_delete(test_app_db):
+    """Test that deleting a User also removes their best_scores rows."""
+    app, db = test_app_db
+    user = User(username="bestdelete")
+    user.set_password("pw")
+    db.session.add(user)
+    db.session.commit()
+    db.session.add(Score(user_id=user.id, score_value=10, level=1))
+    db.session.commit()
+    assert BestScore.query.count() == 1
+
+    db.session.delete(user)
+    db.session.commit()
+    assert BestScore.query.count() == 0
+
+
+# --- PeriodBestScore (daily / weekly rollup) Tests ---
+
+def test_period_start_buckets():
+    """Test that days start at midnight and weeks on Monday."""
+    saturday = datetime(2026, 10, 17, 23, 59)
+    assert period_start('daily', saturday) == saturday.date()
+    assert period_start('weekly', saturday) == datetime(2026, 10, 12).date()
+    assert period_start('weekly', datetime(2026, 10, 12, 0, 0)) == datetime(2026, 10, 12).date()
+    with pytest.raises(KeyError):
+        period_start('monthly', saturday)
+
+def test_period_best_scores_roll_up_per_bucket(test_app_db):
+    """Test that each score raises the best of its day and its week, independently of other buckets."""
+    app, db = test_app_db
+    user = User(username="rollupuser")
+    user.set_password("pw")
+    db.session.add(user)
+    db.session.commit()
+
+    monday = datetime(2026, 10, 12, 10, 0)
+    db.session.add_all([
+        Score(user_id=user.id, score_value=50, level=1, timestamp=monday),
+        Score(user_id=user.id, score_value=80, level=1, timestamp=monday + timedelta(days=1)),
+        Score(user_id=user.id, score_value=70, level=1, timestamp=monday + timedelta(days=1, hours=2)),
+        Score(user_id=user.id, score_value=30, level=1, timestamp=monday + timedelta(days=7)),
+    ])
+    db.session.commit()
+
+    rows = {(r.period, r.period_start.isoformat()): (r.best_score, r.achieved_at)
+            for r in PeriodBestScore.query.filter_by(user_id=user.id, level=1).all()}
+    assert rows == {
+        ('daily', '2026-10-12'): (50, monday),
+        ('daily', '2026-10-13'): (80, monday + timedelta(days=1)),
+        ('daily', '2026-10-19'): (30, monday + timedelta(days=7)),
+        ('weekly', '2026-10-12'): (80, monday + timedelta(days=1)),
+        ('weekly', '2026-10-19'): (30, monday + timedelta(days=7)),
+    }
+    # The all-time best is unaffected by bucketing
+    assert db.session.get(BestScore, (user.id, 1)).best_score == 80
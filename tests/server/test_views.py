@@ -132,6 +132,21 @@ def test_leaderboard_level_1_logged_in(view_test_client_db):
         # Check ranking order if possible/reliable in test data
         # This might require more specific checks on table row order
 
+def test_leaderboard_period_filter(view_test_client_db):
+    """Test '/leaderboard?period=weekly' renders the current week's ranking with the period buttons."""
+    client, app, user = view_test_client_db
+    with app.app_context():
+        login(client, user.username, "password")
+        response = client.get(url_for('views.leaderboard', level_num=1, period='weekly'))
+        assert response.status_code == 200
+        assert b"Leaderboard - Level 1" in response.data
+        assert b"This Week" in response.data
+        assert b"Today" in response.data
+        # An unknown period falls back to all-time
+        response = client.get(url_for('views.leaderboard', period='yearly'))
+        assert response.status_code == 200
+        assert b"Overall Leaderboard (Top 2)" in response.data
+
 def test_leaderboard_invalid_level_redirect(view_test_client_db):
     """Test accessing leaderboard for a non-existent level redirects."""
     client, app, user = view_test_client_db